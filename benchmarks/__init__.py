@@ -0,0 +1 @@
+# Benchmarks for the report and messaging utilities (run with python -m benchmarks.<name>)
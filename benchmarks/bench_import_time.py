@@ -0,0 +1,137 @@
+"""
+Cold-start import cost of the utils package, measured with
+`python -X importtime` in fresh interpreters.
+
+Fails (exit status 1) when a module got slower than the recorded baseline
+allows, or when it pulls in a dependency it must only load on first use
+(ReportLab, pyautogui, win32, ...).
+
+    python -m benchmarks.bench_import_time [--runs 5]
+    python -m benchmarks.bench_import_time --update-baseline
+
+Timings are machine-specific: refresh the baseline with --update-baseline
+when moving to a different machine, and review the diff.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'import_time_baseline.json')
+
+# Allowed growth over the baseline before the run fails
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_SLACK_US = 5000
+
+HEAVY = ('reportlab', 'PIL', 'pyautogui', 'pywhatkit', 'win32clipboard', 'pyperclip')
+REPORTLAB_EXTRAS = ('reportlab.graphics.charts', 'reportlab.graphics.barcode')
+
+# module -> packages that importing it must not load
+TARGETS = {
+    'utils': HEAVY,
+    'utils.recipients': HEAVY,
+    'utils.report_data': HEAVY,
+    'utils.subject_catalog': HEAVY + ('flask', 'sqlalchemy'),
+    'utils.attendance_index': HEAVY,
+    'utils.report_cache': HEAVY,
+    'utils.prerender': HEAVY,
+    'utils.export_jobs': HEAVY,
+    'utils.qr_cache': HEAVY,
+    'utils.verification': HEAVY,
+    'utils.whatsapp_sender': HEAVY,
+    'utils.whatsapp_queue': HEAVY,
+    'utils.whatsapp_cloud': HEAVY,
+    'utils.pdf_generator': REPORTLAB_EXTRAS,
+    'utils.batch_reports': REPORTLAB_EXTRAS,
+    'utils.compendium': REPORTLAB_EXTRAS + ('pypdf',),
+    'utils.cohort_export': HEAVY + ('openpyxl', 'pyarrow'),
+}
+
+
+def measure(module):
+    """(cumulative import time in microseconds, set of modules imported) for one cold import"""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    cumulative = None
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cum, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if not cum.strip().isdigit():
+            continue  # header line
+        loaded.add(name)
+        if name == module:
+            cumulative = int(cum)
+    return cumulative, loaded
+
+
+def forbidden_loaded(loaded, forbidden):
+    return sorted(name for name in loaded
+                  if any(name == prefix or name.startswith(prefix + '.') for prefix in forbidden))
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {'tolerance': DEFAULT_TOLERANCE, 'slack_us': DEFAULT_SLACK_US, 'modules': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='cold imports per module (the fastest counts)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('modules', nargs='*', help='modules to measure (default: all tracked)')
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    tolerance = baseline.get('tolerance', DEFAULT_TOLERANCE)
+    slack = baseline.get('slack_us', DEFAULT_SLACK_US)
+    failures = []
+    measured = {}
+
+    for module in args.modules or TARGETS:
+        runs = [measure(module) for _ in range(max(1, args.runs))]
+        best = min(cumulative for cumulative, _ in runs)
+        measured[module] = best
+        leaked = forbidden_loaded(runs[0][1], TARGETS.get(module, HEAVY))
+
+        limit = None
+        if module in baseline['modules']:
+            limit = int(baseline['modules'][module] * (1 + tolerance) + slack)
+        status = 'ok'
+        if leaked:
+            status = 'LOADS ' + ', '.join(sorted({name.split('.')[0] for name in leaked}))
+            failures.append(f"{module} imports {', '.join(leaked[:5])}")
+        elif limit is not None and best > limit and not args.update_baseline:
+            status = 'REGRESSED'
+            failures.append(f"{module}: {best / 1000:.1f} ms > limit {limit / 1000:.1f} ms")
+        base_text = f"{baseline['modules'][module] / 1000:8.1f}" if module in baseline['modules'] else '       -'
+        print(f'{module:24s} {best / 1000:8.1f} ms  (baseline {base_text} ms)  {status}')
+
+    if args.update_baseline:
+        baseline['tolerance'] = tolerance
+        baseline['slack_us'] = slack
+        baseline['modules'].update(measured)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'baseline written to {args.baseline}')
+
+    if failures:
+        print('\nImport-time check failed:')
+        for failure in failures:
+            print(f'  - {failure}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
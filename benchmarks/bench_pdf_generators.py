@@ -0,0 +1,326 @@
+"""
+End-to-end benchmark of generate_student_report_pdf (default and
+compact profiles), generate_batch_report_pdf and generate_compendium_pdf
+on synthetic cohorts (see benchmarks.fixtures), with the CSV cohort
+export (utils.cohort_export) as the data-only counterpart of the batch
+report.
+
+For every scale it records wall time, peak RSS, pages per second and
+output bytes per report, writes the results as JSON and compares them
+with a baseline. Exits with status 1 when a case regressed.
+
+    python -m benchmarks.bench_pdf_generators [--scales 10,1000,10000] [--max-attendance 1000]
+    python -m benchmarks.bench_pdf_generators --scales 10,1000 --update-baseline
+    python -m benchmarks.bench_pdf_generators --baseline previous-run.json
+
+Each case runs in a fresh interpreter so peak RSS belongs to that case
+alone. The student and compendium generators render at most --sample
+reports per scale (it is per-student work; the DB still holds the whole
+cohort), the compact generator the same students as student, the compendium as one PDF so its per-report numbers compare
+directly with separate files; the batch and export generators always
+cover the whole cohort. One untimed warm-up report is
+built first so one-off setup (fonts, theme) is not counted. With
+--attendance-index the reports read attendance from utils.attendance_index
+(its one-off load is reported separately as index_load_seconds) and the
+cases are named e.g. batch@1000+index. With --photos the rendered
+students get synthetic photos (thumbnails are built before timing) and
+the cases are named e.g. compact@1000+photos; compare student and compact
+there for the size of WhatsApp attachments.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'pdf_generators_baseline.json')
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+DEFAULT_SCALES = (10, 1000, 10000)
+DEFAULT_TOLERANCE = 0.25
+GENERATORS = ('student', 'compact', 'compendium', 'batch', 'export')
+
+# metric -> True if bigger is worse
+TRACKED_METRICS = {
+    'seconds_per_report': True,
+    'pages_per_second': False,
+    'bytes_per_report': True,
+    'peak_rss_mb': True,
+}
+
+_PAGE_RE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+
+
+def count_pages(data):
+    return len(_PAGE_RE.findall(data))
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB"""
+    try:
+        import resource
+    except ImportError:
+        # Windows: PeakWorkingSetSize from GetProcessMemoryInfo
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage',
+                )
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+        )
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def batch_row(record):
+    """students_data entry for generate_batch_report_pdf from a report record"""
+    return {
+        'roll_number': record['umis'],
+        'name': record['name'],
+        'email': record['email'],
+        'department': record['department'],
+        'year': str(record['current_year']),
+        'attendance_pct': record['attendance']['percentage'],
+        'marks': [
+            {'subject': code, 'marks': marks, 'max_marks': max_marks}
+            for code, _, _, marks, max_marks, _, _, _ in record['academics']['subjects'] if marks is not None
+        ],
+    }
+
+
+# ===== CHILD: one case =====
+
+def run_case(generator, students, max_attendance, sample, seed, attendance_index=False, photos=False):
+    from benchmarks.fixtures import ensure_cohort_db, ensure_student_photos, install_fake_models
+    models = install_fake_models(ensure_cohort_db(students, max_attendance, seed))
+
+    index_load = None
+    if attendance_index:
+        from utils.attendance_index import init_attendance_index
+        start = time.perf_counter()
+        init_attendance_index()
+        index_load = time.perf_counter() - start
+
+    from utils import metrics
+    from utils.cohort_export import export_cohort
+    from utils.compendium import generate_compendium_pdf
+    from utils.pdf_generator import REPORT_PROFILES, generate_batch_report_pdf, generate_student_report_pdf
+    from utils.report_data import load_report_records
+
+    out_dir = tempfile.mkdtemp(prefix='sgac_bench_pdf_')
+    try:
+        query = models.Student.query.order_by(models.Student.umis)
+        if photos:
+            from utils.photo_cache import get_photo_thumbnail
+            umis_list = [umis for umis, in query.with_entities(models.Student.umis).limit(sample or None)]
+            os.chdir(ensure_student_photos(umis_list, seed))
+            for profile in REPORT_PROFILES.values():
+                for umis in umis_list:
+                    get_photo_thumbnail(umis, profile['photo_dpi'], profile['photo_quality'])
+        if generator in ('student', 'compact'):
+            profile = 'compact' if generator == 'compact' else 'default'
+            cohort = query.limit(sample).all() if sample else query.all()
+            generate_student_report_pdf(cohort[0], os.path.join(out_dir, 'warmup'), use_cache=False, profile=profile)
+
+            sink, = metrics.enable_metrics(metrics.MemorySink())
+            start = time.perf_counter()
+            paths = [generate_student_report_pdf(s, out_dir, use_cache=False, profile=profile) for s in cohort]
+            wall = time.perf_counter() - start
+        elif generator == 'compendium':
+            cohort = query.limit(sample).all() if sample else query.all()
+            generate_compendium_pdf(cohort[:1], output_path=os.path.join(out_dir, 'warmup', 'compendium.pdf'))
+
+            sink, = metrics.enable_metrics(metrics.MemorySink())
+            start = time.perf_counter()
+            paths = [generate_compendium_pdf(cohort, output_path=os.path.join(out_dir, 'compendium.pdf'))]
+            wall = time.perf_counter() - start
+        elif generator == 'export':
+            cohort = query.all()
+            export_cohort(os.path.join(out_dir, 'warmup', 'cohort.csv'), students=cohort[:1])
+
+            sink, = metrics.enable_metrics(metrics.MemorySink())
+            start = time.perf_counter()
+            paths = [export_cohort(os.path.join(out_dir, 'cohort.csv'))['path']]
+            wall = time.perf_counter() - start
+        else:
+            cohort = query.all()
+            generate_batch_report_pdf([batch_row(r) for r in load_report_records(cohort[:1])],
+                                      os.path.join(out_dir, 'warmup', 'batch.pdf'))
+
+            sink, = metrics.enable_metrics(metrics.MemorySink())
+            start = time.perf_counter()
+            students_data = [batch_row(r) for r in load_report_records(cohort)]
+            paths = [generate_batch_report_pdf(students_data, os.path.join(out_dir, 'batch_report.pdf'))]
+            wall = time.perf_counter() - start
+
+        metrics.disable_metrics()
+        pages = 0
+        total_bytes = 0
+        for path in paths:
+            with open(path, 'rb') as f:
+                data = f.read()
+            pages += count_pages(data)
+            total_bytes += len(data)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    reports = 1 if generator in ('batch', 'export') else len(cohort)
+    return {
+        'generator': generator,
+        'students': students,
+        'students_rendered': len(cohort),
+        'max_attendance': max_attendance,
+        'reports': reports,
+        'wall_seconds': wall,
+        'seconds_per_report': wall / reports,
+        'pages': pages,
+        'pages_per_second': pages / wall if wall else 0.0,
+        'bytes_total': total_bytes,
+        'bytes_per_report': total_bytes / reports,
+        'peak_rss_mb': peak_rss_mb(),
+        'index_load_seconds': index_load,
+        # seconds per utils.metrics span (nested spans overlap their parents)
+        'phases': sink.span_totals(),
+    }
+
+
+# ===== PARENT: orchestration and comparison =====
+
+def spawn_case(generator, students, args):
+    cmd = [sys.executable, '-m', 'benchmarks.bench_pdf_generators', '--case', generator,
+           '--students', str(students), '--max-attendance', str(args.max_attendance),
+           '--sample', str(args.sample), '--seed', str(args.seed)]
+    if args.attendance_index:
+        cmd.append('--attendance-index')
+    if args.photos:
+        cmd.append('--photos')
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{generator}@{students} failed:\n{proc.stderr.strip()}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """List of regression messages for cases present in both runs"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        for metric, bigger_is_worse in TRACKED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change if bigger_is_worse else -change) > tolerance:
+                regressions.append(f"{name} {metric}: {old:.4g} -> {new:.4g} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help='comma-separated cohort sizes')
+    parser.add_argument('--max-attendance', type=int, default=1000,
+                        help='each student gets a random 0..N attendance rows')
+    parser.add_argument('--sample', type=int, default=200,
+                        help='student reports rendered per scale (0 = the whole cohort)')
+    parser.add_argument('--generators', default=','.join(GENERATORS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--attendance-index', action='store_true',
+                        help='serve attendance from the in-memory index instead of the database')
+    parser.add_argument('--photos', action='store_true', help='give the rendered students synthetic photos')
+    parser.add_argument('--output', help='results JSON (default: benchmarks/results/pdf_generators-<time>.json)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, help=f'allowed relative change (default {DEFAULT_TOLERANCE})')
+    parser.add_argument('--update-baseline', action='store_true')
+    # Internal: run a single case in this process and print its JSON
+    parser.add_argument('--case', choices=GENERATORS, help=argparse.SUPPRESS)
+    parser.add_argument('--students', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.students, args.max_attendance, args.sample, args.seed,
+                                  args.attendance_index, args.photos)))
+        return
+
+    from benchmarks.fixtures import ensure_cohort_db
+
+    results = {}
+    for students in (int(s) for s in args.scales.split(',')):
+        print(f'preparing cohort of {students} students...', flush=True)
+        ensure_cohort_db(students, args.max_attendance, args.seed)
+        for generator in args.generators.split(','):
+            result = spawn_case(generator, students, args)
+            name = (f'{generator}@{students}' + ('+index' if args.attendance_index else '')
+                    + ('+photos' if args.photos else ''))
+            results[name] = result
+            print(f'{name:14s} {result["wall_seconds"]:8.2f} s  {result["seconds_per_report"] * 1000:9.1f} ms/report  '
+                  f'{result["pages_per_second"]:7.1f} pages/s  {result["bytes_per_report"] / 1024:8.1f} KiB/report  '
+                  f'peak RSS {result["peak_rss_mb"]:6.1f} MiB', flush=True)
+            print('               ' + '  '.join(
+                f'{phase} {seconds:.2f}s' for phase, seconds in sorted(result['phases'].items())), flush=True)
+
+    run = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'max_attendance': args.max_attendance,
+            'sample': args.sample,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"pdf_generators-{datetime.now():%Y%m%d-%H%M%S}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f'results written to {output}')
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    tolerance = args.tolerance if args.tolerance is not None else baseline.get('tolerance', DEFAULT_TOLERANCE)
+
+    if args.update_baseline:
+        baseline.setdefault('results', {}).update(results)
+        baseline['tolerance'] = tolerance
+        baseline['meta'] = run['meta']
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'baseline written to {args.baseline}')
+        return
+
+    regressions = compare(results, baseline, tolerance)
+    if regressions:
+        print(f'\nRegressions against {args.baseline} (tolerance {tolerance:.0%}):')
+        for regression in regressions:
+            print(f'  - {regression}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Per-report setup cost: compiling styles/table styles/static flowables
+from scratch (what every report paid before the theme registry) versus
+fetching them from the shared registry.
+
+    python -m benchmarks.bench_report_setup [--iterations 500]
+"""
+import argparse
+import time
+from datetime import date, timedelta
+from io import BytesIO
+
+from utils.pdf_generator import render_batch_report, render_student_report
+from utils.report_theme import BatchReportTheme, StudentReportTheme, get_theme
+
+
+def _per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def _cold_setup():
+    StudentReportTheme()
+    BatchReportTheme()
+
+
+def _warm_setup():
+    theme = get_theme('student')
+    theme.college_heading()
+    theme.line_table()
+    theme.report_title_table()
+    theme.footer_line_table()
+    get_theme('batch').college_header()
+
+
+def sample_record():
+    return {
+        'umis': 'BENCH0001', 'name': 'Bench Student', 'email': 'bench@example.com', 'phone': '9876543210',
+        'department_id': 1, 'department': 'Computer Science', 'current_year': 2, 'parents_num': '9876543210',
+        'attendance': {'total': 120, 'present': 90, 'absent': 20, 'leave': 10, 'percentage': 75.0},
+        'attendance_log': tuple((date(2026, 6, 1) + timedelta(days=i), 'Present') for i in range(20)),
+        'subjects': tuple((f'CS{i:02d}', f'Subject {i}') for i in range(6)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    cold = _per_call(_cold_setup, args.iterations)
+    get_theme('student'), get_theme('batch')
+    warm = _per_call(_warm_setup, args.iterations)
+    print(f'setup per report (compile every call): {cold:8.3f} ms')
+    print(f'setup per report (theme registry):     {warm:8.3f} ms')
+    print(f'speed-up:                              {cold / warm:8.1f}x')
+
+    record = sample_record()
+    rows = [{'roll_number': f'R{i}', 'name': f'Student {i}', 'email': 'x@example.com', 'department': 'CS',
+             'year': '2', 'attendance_pct': 80.0, 'marks': []} for i in range(50)]
+    renders = max(1, args.iterations // 10)
+    student = _per_call(lambda: render_student_report(record, BytesIO()), renders)
+    batch = _per_call(lambda: render_batch_report(rows, BytesIO()), renders)
+    print(f'full student report build:             {student:8.3f} ms')
+    print(f'full batch report build (50 rows):     {batch:8.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Throughput of the Cloud-API transport against the bundled local stub.
+
+    python -m benchmarks.bench_whatsapp_cloud [--recipients 300] [--latency 0.05]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from utils.whatsapp_cloud import CloudApiTransport
+from utils.whatsapp_stub_server import start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipients', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05, help='simulated server latency (seconds)')
+    parser.add_argument('--rate', type=float, default=1000.0, help='token bucket rate (messages/second)')
+    parser.add_argument('--pdf-kb', type=int, default=40)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency)
+    fd, pdf_path = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(b'%PDF-1.4\n' + os.urandom(args.pdf_kb * 1024))
+
+    numbers = [f'98{idx:08d}' for idx in range(args.recipients)]
+    try:
+        for concurrency in (1, 4, 16, 32):
+            transport = CloudApiTransport('1234', 'stub-token', base_url=base_url,
+                                          pool_size=concurrency, rate=args.rate, burst=concurrency)
+            start = time.perf_counter()
+            results = transport.send_bulk(numbers, 'Semester report attached', pdf_path)
+            elapsed = time.perf_counter() - start
+            failures = sum(1 for _, ok, _ in results if not ok)
+            print(f'concurrency {concurrency:3d}: {len(numbers) / elapsed:8.1f} msg/s  '
+                  f'uploads={transport.uploads} connections={transport.pool.connections_opened} '
+                  f'failures={failures}')
+            transport.close()
+    finally:
+        os.remove(pdf_path)
+        server.shutdown()
+    print(f'server received: {server.counts}')
+
+
+if __name__ == '__main__':
+    main()
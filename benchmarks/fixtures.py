@@ -0,0 +1,241 @@
+"""
+Synthetic cohorts for the benchmarks.
+
+The report code reads Student/Attendance/Subject/Marks through the app's
+`models` module, which is not part of this package. install_fake_models()
+registers a minimal stand-in with the same columns, bound to a SQLite
+file, and ensure_cohort_db() builds (once, then reuses) a deterministic
+synthetic cohort in such a file.
+
+    from benchmarks.fixtures import ensure_cohort_db, install_fake_models
+    models = install_fake_models(ensure_cohort_db(students=1000, max_attendance=1000))
+    students = models.Student.query.all()
+"""
+import os
+import random
+import sys
+import tempfile
+import types
+from datetime import date, timedelta
+
+FIXTURE_DIR = os.path.join(tempfile.gettempdir(), 'sgac_bench')
+
+# Bump when the schema or generated data changes so cached cohorts are rebuilt
+FIXTURE_VERSION = 2
+
+DEPARTMENTS = ('Computer Science', 'Mathematics', 'Physics', 'Chemistry', 'Commerce', 'English')
+SUBJECTS_PER_YEAR = 6
+YEARS = (1, 2, 3)
+
+# Status mix of generated attendance rows
+STATUS_WEIGHTS = (('Present', 0.8), ('Absent', 0.15), ('Leave', 0.05))
+
+_INSERT_BATCH = 20000
+
+# Synthetic student photos (see ensure_student_photos)
+PHOTO_FIXTURE_VERSION = 1
+PHOTO_SIZE = (960, 1280)
+
+
+def _define_models(db):
+    class Department(db.Model):
+        __tablename__ = 'department'
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(100), nullable=False)
+
+    class Student(db.Model):
+        __tablename__ = 'student'
+        umis = db.Column(db.String(50), primary_key=True)
+        name = db.Column(db.String(100), nullable=False)
+        email = db.Column(db.String(120))
+        phone = db.Column(db.String(20))
+        parents_num = db.Column(db.String(20))
+        department_id = db.Column(db.Integer, db.ForeignKey('department.id'))
+        current_year = db.Column(db.Integer)
+        department = db.relationship(Department)
+
+    class Subject(db.Model):
+        __tablename__ = 'subject'
+        id = db.Column(db.Integer, primary_key=True)
+        code = db.Column(db.String(20), nullable=False)
+        name = db.Column(db.String(100), nullable=False)
+        department_id = db.Column(db.Integer, db.ForeignKey('department.id'))
+        year = db.Column(db.Integer)
+
+    class Attendance(db.Model):
+        __tablename__ = 'attendance'
+        id = db.Column(db.Integer, primary_key=True)
+        student_umis = db.Column(db.String(50), db.ForeignKey('student.umis'), index=True)
+        date = db.Column(db.Date, nullable=False)
+        status = db.Column(db.String(10), nullable=False)
+
+    class Marks(db.Model):
+        __tablename__ = 'marks'
+        id = db.Column(db.Integer, primary_key=True)
+        student_umis = db.Column(db.String(50), db.ForeignKey('student.umis'), index=True)
+        subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'))
+        marks_obtained = db.Column(db.Float)
+        max_marks = db.Column(db.Float, default=100)
+        subject = db.relationship(Subject)
+
+    return Department, Student, Subject, Attendance, Marks
+
+
+def install_fake_models(db_path):
+    """
+    Register a stand-in `models` module (db, Department, Student, Subject,
+    Attendance, Marks) bound to the SQLite file at db_path, and push an app
+    context. Returns the module.
+    """
+    from flask import Flask
+    from flask_sqlalchemy import SQLAlchemy
+
+    app = Flask('sgac_bench')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath(db_path)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'sgac-bench'
+    db = SQLAlchemy(app)
+
+    models = types.ModuleType('models')
+    models.app = app
+    models.db = db
+    (models.Department, models.Student, models.Subject,
+     models.Attendance, models.Marks) = _define_models(db)
+    sys.modules['models'] = models
+
+    # Model setup: the summary hooks must be registered before any attendance write
+    from utils.attendance_summary import install_attendance_summary_hooks
+    install_attendance_summary_hooks()
+
+    app.app_context().push()
+    db.create_all()
+    return models
+
+
+def cohort_db_path(students, max_attendance, seed=0):
+    return os.path.join(FIXTURE_DIR, f'cohort_v{FIXTURE_VERSION}_{students}_{max_attendance}_{seed}.db')
+
+
+def _insert(db, model, rows):
+    for start in range(0, len(rows), _INSERT_BATCH):
+        db.session.execute(model.__table__.insert(), rows[start:start + _INSERT_BATCH])
+
+
+def populate_cohort(models, students, max_attendance, seed=0):
+    """Fill an empty fake-models database with a deterministic cohort"""
+    db = models.db
+    rng = random.Random(seed)
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+
+    _insert(db, models.Department, [{'id': idx, 'name': name} for idx, name in enumerate(DEPARTMENTS, 1)])
+    subjects = []
+    subject_ids = {}  # (department_id, year) -> subject ids
+    for dept_id in range(1, len(DEPARTMENTS) + 1):
+        for year in YEARS:
+            for idx in range(1, SUBJECTS_PER_YEAR + 1):
+                subject_ids.setdefault((dept_id, year), []).append(len(subjects) + 1)
+                subjects.append({
+                    'id': len(subjects) + 1,
+                    'code': f'D{dept_id}Y{year}S{idx:02d}',
+                    'name': f'{DEPARTMENTS[dept_id - 1]} Paper {year}.{idx}',
+                    'department_id': dept_id,
+                    'year': year,
+                })
+    _insert(db, models.Subject, subjects)
+
+    start_date = date(2025, 6, 2)
+    student_rows = []
+    attendance_rows = []
+    mark_rows = []
+    for idx in range(students):
+        umis = f'UMIS{idx:07d}'
+        department_id = idx % len(DEPARTMENTS) + 1
+        current_year = YEARS[idx // len(DEPARTMENTS) % len(YEARS)]
+        student_rows.append({
+            'umis': umis,
+            'name': f'Student {idx}',
+            'email': f'student{idx}@example.com',
+            'phone': f'9{rng.randrange(10 ** 9):09d}',
+            # Some siblings share a parent number, as in the real data
+            'parents_num': f'8{rng.randrange(students or 1):09d}',
+            'department_id': department_id,
+            'current_year': current_year,
+        })
+        # Marks for every year so far; about one in ten current-year papers not entered yet
+        for year in YEARS[:current_year]:
+            for subject_id in subject_ids[(department_id, year)]:
+                if year == current_year and rng.random() < 0.1:
+                    continue
+                mark_rows.append({'student_umis': umis, 'subject_id': subject_id,
+                                  'marks_obtained': float(min(100, max(0, round(rng.gauss(68, 15))))),
+                                  'max_marks': 100.0})
+        days = rng.randint(0, max_attendance)
+        for day, status in enumerate(rng.choices(statuses, weights, k=days)):
+            attendance_rows.append({'student_umis': umis, 'date': start_date + timedelta(days=day), 'status': status})
+        if len(attendance_rows) >= _INSERT_BATCH:
+            _insert(db, models.Attendance, attendance_rows)
+            attendance_rows = []
+    _insert(db, models.Student, student_rows)
+    _insert(db, models.Attendance, attendance_rows)
+    _insert(db, models.Marks, mark_rows)
+    db.session.commit()
+
+    from utils.attendance_summary import init_attendance_summary
+    init_attendance_summary(rebuild=True)
+
+
+def ensure_student_photos(umis_list, seed=0):
+    """
+    Working directory whose static/student_photos holds a synthetic
+    phone-camera-sized JPEG portrait for each UMIS (built once, then
+    reused). Run the reports from it so utils.photo_cache finds them.
+    """
+    from PIL import Image, ImageDraw
+
+    root = os.path.join(FIXTURE_DIR, f'photos_v{PHOTO_FIXTURE_VERSION}_{seed}')
+    photo_dir = os.path.join(root, 'static', 'student_photos')
+    os.makedirs(photo_dir, exist_ok=True)
+    for umis in umis_list:
+        path = os.path.join(photo_dir, f'{umis}.jpg')
+        if os.path.exists(path):
+            continue
+        rng = random.Random(f'{seed}:{umis}')
+        background = tuple(rng.randrange(120, 230) for _ in range(3))
+        img = Image.new('RGB', PHOTO_SIZE, background)
+        draw = ImageDraw.Draw(img)
+        width, height = PHOTO_SIZE
+        skin = tuple(rng.randrange(120, 220) for _ in range(3))
+        draw.ellipse((width * 0.25, height * 0.15, width * 0.75, height * 0.6), fill=skin)
+        draw.rectangle((width * 0.15, height * 0.65, width * 0.85, height), fill=tuple(rng.randrange(0, 120) for _ in range(3)))
+        # Coarse-grained noise survives the thumbnail downscale like real detail does
+        noise = Image.effect_noise((width // 6, height // 6), 48).resize(PHOTO_SIZE, Image.BICUBIC)
+        img = Image.blend(img, noise.convert('RGB'), 0.35)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        img.save(tmp_path, 'JPEG', quality=90)
+        os.replace(tmp_path, path)
+    return root
+
+
+def ensure_cohort_db(students, max_attendance, seed=0):
+    """Path of a SQLite file holding the synthetic cohort, building it on first use"""
+    path = cohort_db_path(students, max_attendance, seed)
+    if os.path.exists(path):
+        return path
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    # Build in a child so this process neither keeps the fake models nor the insert memory
+    import subprocess
+    subprocess.run(
+        [sys.executable, '-m', 'benchmarks.fixtures', tmp_path, str(students), str(max_attendance), str(seed)],
+        check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == '__main__':
+    _path, _students, _max_attendance, _seed = sys.argv[1:5]
+    if os.path.exists(_path):
+        os.remove(_path)
+    populate_cohort(install_fake_models(_path), int(_students), int(_max_attendance), int(_seed))
@@ -0,0 +1 @@
+"""pytest: this file puts the repository root on sys.path so tests can import utils"""
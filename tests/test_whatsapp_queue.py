@@ -0,0 +1,221 @@
+"""Tests for utils.whatsapp_queue, delivering through FakeTransport"""
+import time
+
+import pytest
+
+from utils.whatsapp_queue import FAILED, QUEUED, SENDING, SENT, WhatsAppQueue
+from utils.whatsapp_transport import FakeTransport
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'whatsapp_queue.db')
+
+
+def make_queue(db_path, transport=None, **kwargs):
+    return WhatsAppQueue(db_path, transport or FakeTransport(), **kwargs)
+
+
+def test_enqueue_returns_id_without_sending(db_path):
+    transport = FakeTransport(delay=5.0)
+    queue = make_queue(db_path, transport)
+
+    started = time.monotonic()
+    job_id = queue.enqueue_text('9876543210', 'Hello')
+
+    assert time.monotonic() - started < 1.0
+    assert transport.sent == []
+    job = queue.status(job_id)
+    assert job['status'] == QUEUED
+    assert job['attempts'] == 0
+    assert job['recipient'] == '9876543210'
+
+
+def test_drain_delivers_each_kind(db_path):
+    transport = FakeTransport()
+    queue = make_queue(db_path, transport)
+    text_id = queue.enqueue_text('111', 'text')
+    pdf_id = queue.enqueue_pdf('222', 'report', 'a.pdf')
+    pdfs_id = queue.enqueue_pdfs('333', 'reports', ['a.pdf', 'b.pdf'])
+    group_id = queue.enqueue_group('group-1', 'notice')
+
+    assert queue.drain() == 4
+
+    assert [(s['kind'], s['to']) for s in transport.sent] == [
+        ('text', '111'), ('pdf', '222'), ('pdfs', '333'), ('group', 'group-1'),
+    ]
+    assert transport.sent[2]['pdf_path'] == ['a.pdf', 'b.pdf']
+    for job_id in (text_id, pdf_id, pdfs_id, group_id):
+        job = queue.status(job_id)
+        assert job['status'] == SENT
+        assert job['attempts'] == 1
+        assert job['result'] == 'Message sent'
+
+
+def test_unknown_kind_is_rejected(db_path):
+    queue = make_queue(db_path)
+    with pytest.raises(ValueError):
+        queue.enqueue('fax', '111', 'Hello')
+
+
+def test_failed_send_is_retried_after_backoff(db_path):
+    transport = FakeTransport(fail_times={'111': 1})
+    queue = make_queue(db_path, transport, backoff_base=30)
+    job_id = queue.enqueue_text('111', 'Hello')
+
+    before = time.time()
+    assert queue.drain() == 1
+
+    job = queue.status(job_id)
+    assert job['status'] == QUEUED
+    assert job['attempts'] == 1
+    assert job['last_error'] == 'Simulated failure'
+    # 30 s base delay with +/-20% jitter; not ready again yet
+    assert before + 24 <= job['next_attempt_at'] <= time.time() + 36
+    assert queue.drain() == 0
+    assert transport.sent == []
+
+    queue.backoff_base = 0
+    with queue._connect() as conn:
+        conn.execute('UPDATE whatsapp_jobs SET next_attempt_at = 0 WHERE id = ?', (job_id,))
+    assert queue.drain() == 1
+
+    job = queue.status(job_id)
+    assert job['status'] == SENT
+    assert job['attempts'] == 2
+    assert job['last_error'] is None
+    assert len(transport.sent) == 1
+
+
+def test_job_fails_after_max_attempts(db_path):
+    transport = FakeTransport(fail_times={'111': 10})
+    queue = make_queue(db_path, transport, max_attempts=3, backoff_base=0)
+    job_id = queue.enqueue_text('111', 'Hello')
+
+    assert queue.drain() == 3
+
+    job = queue.status(job_id)
+    assert job['status'] == FAILED
+    assert job['attempts'] == 3
+    assert job['last_error'] == 'Simulated failure'
+    assert transport.sent == []
+    assert queue.stats()[FAILED] == 1
+
+    # A manual retry gets a fresh attempt budget
+    transport.fail_times.clear()
+    assert queue.retry(job_id)
+    assert not queue.retry(job_id)
+    assert queue.drain() == 1
+    assert queue.status(job_id)['status'] == SENT
+
+
+def test_transport_exception_counts_as_failure(db_path):
+    class BrokenTransport(FakeTransport):
+        def send_text(self, phone_number, message):
+            raise RuntimeError('browser closed')
+
+    queue = make_queue(db_path, BrokenTransport(), max_attempts=1)
+    job_id = queue.enqueue_text('111', 'Hello')
+
+    assert queue.drain() == 1
+
+    job = queue.status(job_id)
+    assert job['status'] == FAILED
+    assert job['last_error'] == 'browser closed'
+
+
+def test_duplicate_idempotency_key_returns_existing_job(db_path):
+    transport = FakeTransport()
+    queue = make_queue(db_path, transport)
+    first = queue.enqueue_pdf('111', 'report', 'a.pdf', idempotency_key='report:1:a.pdf')
+    second = queue.enqueue_pdf('111', 'report', 'a.pdf', idempotency_key='report:1:a.pdf')
+    assert second == first
+
+    queue.drain()
+    # Still the same job once it has been sent, and nothing is sent again
+    third = queue.enqueue_pdf('111', 'report', 'a.pdf', idempotency_key='report:1:a.pdf')
+    assert third == first
+    assert queue.drain() == 0
+    assert len(transport.sent) == 1
+
+    # Jobs without a key are never merged
+    assert queue.enqueue_text('111', 'Hello') != queue.enqueue_text('111', 'Hello')
+
+
+def test_recover_requeues_jobs_claimed_by_crashed_process(db_path):
+    crashed = make_queue(db_path)
+    job_id = crashed.enqueue_text('111', 'Hello')
+    # Claimed but never finished, as if the process died mid-send
+    assert crashed._claim()['id'] == job_id
+    assert crashed.status(job_id)['status'] == SENDING
+
+    transport = FakeTransport()
+    queue = make_queue(db_path, transport)
+    assert queue.drain() == 0
+    assert queue.recover() == 1
+
+    job = queue.status(job_id)
+    assert job['status'] == QUEUED
+    assert queue.drain() == 1
+    assert queue.status(job_id)['status'] == SENT
+    assert queue.status(job_id)['attempts'] == 2
+    assert transport.sent == [{'kind': 'text', 'to': '111', 'message': 'Hello', 'pdf_path': None}]
+    assert queue.recover() == 0
+
+
+def test_workers_deliver_in_background(db_path):
+    transport = FakeTransport()
+    queue = make_queue(db_path, transport, workers=2)
+    queue.start()
+    try:
+        job_ids = [queue.enqueue_text(str(n), 'Hello') for n in range(5)]
+        deadline = time.monotonic() + 10
+        while queue.stats()[SENT] < 5 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        queue.stop(timeout=5)
+
+    assert all(queue.status(job_id)['status'] == SENT for job_id in job_ids)
+    assert sorted(s['to'] for s in transport.sent) == ['0', '1', '2', '3', '4']
+
+
+def test_status_and_stats(db_path):
+    queue = make_queue(db_path, FakeTransport(fail_times={'222': 1}), max_attempts=1)
+    assert queue.status(12345) is None
+    assert queue.stats() == {QUEUED: 0, SENDING: 0, SENT: 0, FAILED: 0}
+
+    sent_id = queue.enqueue_text('111', 'Hello')
+    failed_id = queue.enqueue_text('222', 'Hello')
+    queue.drain()
+    queue.enqueue_text('333', 'Hello')
+
+    assert queue.stats() == {QUEUED: 1, SENDING: 0, SENT: 1, FAILED: 1}
+    job = queue.status(sent_id)
+    assert job['id'] == sent_id
+    assert job['kind'] == 'text'
+    assert job['message'] == 'Hello'
+    assert job['created_at'] <= job['updated_at']
+    assert queue.status(failed_id)['status'] == FAILED
+
+
+def test_resubmitted_parent_broadcast_is_not_sent_twice(db_path, capsys):
+    from utils.recipients import plan_parent_broadcast, send_parent_broadcast
+
+    transport = FakeTransport()
+    queue = make_queue(db_path, transport)
+    reports = [
+        {'umis': '1', 'name': 'Asha', 'parents_num': '9876543210'},
+        {'umis': '2', 'name': 'Ravi', 'parents_num': '98765 43211'},
+        {'umis': '3', 'name': 'Meena', 'parents_num': '9876543212', 'pdf_path': 'meena.pdf'},
+    ]
+
+    first = send_parent_broadcast(plan_parent_broadcast(reports, 'fake'), queue=queue)
+    second = send_parent_broadcast(plan_parent_broadcast(reports, 'fake'), queue=queue)
+
+    assert second == first
+    assert queue.drain() == 3
+    assert sorted(s['to'] for s in transport.sent) == ['+919876543210', '+919876543211', '+919876543212']
+
+    # A new broadcast id is a new broadcast
+    send_parent_broadcast(plan_parent_broadcast(reports[:1], 'fake'), queue=queue, broadcast_id='reminder')
+    assert queue.drain() == 1
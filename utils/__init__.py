@@ -1 +1,85 @@
-# Empty __init__.py to make utils a package
+"""
+Public API of the utils package, loaded lazily.
+
+Importing utils is cheap: ReportLab, pyautogui/win32 and the other heavy
+or Windows-only dependencies are only imported when one of the names
+below is first accessed (PEP 562 module __getattr__), e.g.
+
+    import utils
+    utils.generate_student_report_pdf(student)   # loads utils.pdf_generator now
+
+Submodules can still be imported directly as before.
+"""
+import importlib
+
+# public name -> submodule that defines it
+_EXPORTS = {
+    # Reports
+    'generate_student_report_pdf': 'pdf_generator',
+    'generate_batch_report_pdf': 'pdf_generator',
+    'generate_compact_report': 'pdf_generator',
+    'student_report_bytes': 'pdf_generator',
+    'batch_report_bytes': 'pdf_generator',
+    'iter_student_report': 'pdf_generator',
+    'iter_batch_report': 'pdf_generator',
+    'generate_department_reports': 'batch_reports',
+    'generate_compendium_pdf': 'compendium',
+    'split_compendium': 'compendium',
+    'export_cohort': 'cohort_export',
+    'export_batch_data': 'cohort_export',
+    'iter_cohort_csv': 'cohort_export',
+    'load_report_record': 'report_data',
+    'load_report_records': 'report_data',
+    'get_report_cache': 'report_cache',
+    'get_export_jobs': 'export_jobs',
+    'ExportJobs': 'export_jobs',
+    'run_prerender': 'prerender',
+    'schedule_prerender': 'prerender',
+    'init_attendance_summary': 'attendance_summary',
+    'install_attendance_summary_hooks': 'attendance_summary',
+    'get_attendance_summary': 'attendance_summary',
+    'init_attendance_index': 'attendance_index',
+    'get_attendance_index': 'attendance_index',
+    'init_subject_catalog': 'subject_catalog',
+    'get_subject_catalog': 'subject_catalog',
+    'invalidate_subject_catalog': 'subject_catalog',
+    'prewarm_qr_codes': 'qr_cache',
+    'prewarm_department_qr_codes': 'qr_cache',
+    'preprocess_all_photos': 'photo_cache',
+    'init_verification': 'verification',
+    'verify_report': 'verification',
+    'issue_verification_tokens': 'verification',
+    'revoke_verification_tokens': 'verification',
+    # WhatsApp
+    'send_whatsapp_message': 'whatsapp_sender',
+    'send_whatsapp_with_pdf': 'whatsapp_sender',
+    'send_whatsapp_with_pdfs': 'whatsapp_sender',
+    'send_group_message': 'whatsapp_sender',
+    'WhatsAppQueue': 'whatsapp_queue',
+    'get_whatsapp_queue': 'whatsapp_queue',
+    'DesktopTransport': 'whatsapp_transport',
+    'FakeTransport': 'whatsapp_transport',
+    'CloudApiTransport': 'whatsapp_cloud',
+    'normalize_phone_number': 'recipients',
+    'plan_parent_broadcast': 'recipients',
+    'send_parent_broadcast': 'recipients',
+    # Instrumentation
+    'enable_metrics': 'metrics',
+    'disable_metrics': 'metrics',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'{__name__}.{module_name}'), name)
+    # Cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
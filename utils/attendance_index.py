@@ -0,0 +1,430 @@
+"""
+In-memory attendance index.
+
+Each student's attendance is two Python ints used as bit planes, one bit
+per day counted from the index start date. Together the planes form a
+2-bit code per day:
+
+    hi lo
+     0  0   not marked
+     0  1   Present
+     1  0   Absent
+     1  1   Leave
+
+Counts are popcounts over the planes (int.bit_count), so percentages,
+streaks, weekly trends and the newest-N log are answered without
+touching the database. A semester of 10,000 students fits in a few MB.
+
+The index loads incrementally: refresh() reads only Attendance rows with
+an id above the last one seen, and the Attendance mapper events keep it
+in step with this process's ORM updates and deletes. Those changes are
+applied once the session commits (a rollback drops them). Updates and
+deletes from other processes, or from bulk Query.update()/delete(), are
+not seen by the events, so refresh() also rebuilds the whole index every
+REBUILD_INTERVAL seconds; call rebuild() after a bulk change to pick it
+up at once. Call init_attendance_index() once at app startup (inside the
+app context); from then on the report loader reads summaries and logs
+from it.
+
+One mark is kept per student per day; if the table holds two rows for
+the same day, the later one wins.
+"""
+import threading
+import time
+from datetime import date, timedelta
+
+STATUS_CODES = {'Present': 1, 'Absent': 2, 'Leave': 3}
+CODE_STATUS = {code: status for status, code in STATUS_CODES.items()}
+
+# Attendance rows read per query while loading
+LOAD_BATCH_SIZE = 50000
+# Seconds between full rebuilds (catches changes the mapper events do not see)
+REBUILD_INTERVAL = 15 * 60
+
+_index = None
+_hooks_installed = False
+
+# session.info key holding the index changes flushed by a session but not yet committed
+_PENDING_KEY = 'attendance_index_pending'
+
+
+def _bits(value):
+    """Positions of the set bits of a non-negative int, highest first"""
+    while value:
+        position = value.bit_length() - 1
+        yield position
+        value ^= 1 << position
+
+
+def _split(start, lo, hi, since=None, until=None):
+    """(present, absent, leave) masks of a student's planes, optionally limited to since..until inclusive"""
+    if start is not None and (since is not None or until is not None):
+        first = max(0, (since - start).days) if since is not None else 0
+        last = (until - start).days if until is not None else max(lo.bit_length(), hi.bit_length())
+        window = ((1 << max(0, last + 1 - first)) - 1) << first
+        lo &= window
+        hi &= window
+    return lo & ~hi, hi & ~lo, lo & hi
+
+
+class AttendanceIndex:
+    """Bit-plane attendance per student, keyed by UMIS"""
+
+    def __init__(self, start=None):
+        self.start = start  # date of bit 0; set from the first mark if None
+        self.since = start  # marks before this date are ignored (None: keep everything)
+        self._lo = {}
+        self._hi = {}
+        self.last_id = 0  # highest Attendance.id loaded
+        self.rebuilt_at = time.monotonic()
+        self._replay = None  # changes committed while a rebuild runs
+        self._lock = threading.RLock()
+
+    # ===== Writing =====
+
+    def _day(self, day):
+        """Bit position of a date, moving the start back if the date precedes it"""
+        if self.start is None:
+            self.start = day
+        offset = (day - self.start).days
+        if offset < 0:
+            # Shift every plane up so the earlier date becomes bit 0
+            shift = -offset
+            self._lo = {umis: bits << shift for umis, bits in self._lo.items()}
+            self._hi = {umis: bits << shift for umis, bits in self._hi.items()}
+            self.start = day
+            offset = 0
+        return offset
+
+    def mark(self, umis, day, status):
+        """Record a student's status for a day (replaces any earlier mark)"""
+        code = STATUS_CODES.get(status)
+        if code is None:
+            self.clear(umis, day)
+            return
+        if self.since is not None and day < self.since:
+            return
+        with self._lock:
+            bit = 1 << self._day(day)
+            lo = self._lo.get(umis, 0)
+            hi = self._hi.get(umis, 0)
+            self._lo[umis] = lo | bit if code & 1 else lo & ~bit
+            self._hi[umis] = hi | bit if code & 2 else hi & ~bit
+
+    def mark_many(self, rows):
+        """Record many (umis, date, status) marks at once; later rows win"""
+        by_student = {}
+        for umis, day, status in rows:
+            if self.since is None or day >= self.since:
+                by_student.setdefault(umis, {})[day.toordinal()] = STATUS_CODES.get(status, 0)
+        if not by_student:
+            return
+        with self._lock:
+            # Move the start back once for the whole batch
+            self._day(date.fromordinal(min(min(days) for days in by_student.values())))
+            start = self.start.toordinal()
+            for umis, days in by_student.items():
+                # Pack this batch's bits bytewise, then merge them into the planes in one step
+                size = (max(days) - start) // 8 + 1
+                touched, lo, hi = bytearray(size), bytearray(size), bytearray(size)
+                for ordinal, code in days.items():
+                    offset = ordinal - start
+                    byte, bit = offset >> 3, 1 << (offset & 7)
+                    touched[byte] |= bit
+                    if code & 1:
+                        lo[byte] |= bit
+                    if code & 2:
+                        hi[byte] |= bit
+                keep = ~int.from_bytes(touched, 'little')
+                self._lo[umis] = self._lo.get(umis, 0) & keep | int.from_bytes(lo, 'little')
+                self._hi[umis] = self._hi.get(umis, 0) & keep | int.from_bytes(hi, 'little')
+
+    def clear(self, umis, day):
+        """Remove a student's mark for a day"""
+        with self._lock:
+            if self.start is None or day < self.start or umis not in self._lo:
+                return
+            bit = 1 << (day - self.start).days
+            self._lo[umis] &= ~bit
+            self._hi[umis] &= ~bit
+
+    def apply(self, changes):
+        """Apply committed ('mark', umis, day, status) and ('clear', umis, day) changes in order"""
+        with self._lock:
+            if self._replay is not None:
+                self._replay.extend(changes)
+            for change in changes:
+                if change[0] == 'mark':
+                    self.mark(*change[1:])
+                else:
+                    self.clear(*change[1:])
+
+    # ===== Loading =====
+
+    def refresh(self, batch_size=LOAD_BATCH_SIZE):
+        """
+        Read Attendance rows added since the last load, or rebuild the whole
+        index once REBUILD_INTERVAL has passed; returns the number of rows read.
+        """
+        if time.monotonic() - self.rebuilt_at >= REBUILD_INTERVAL:
+            loaded = self.rebuild(batch_size)
+            if loaded is not None:
+                return loaded
+        return self._load(batch_size)
+
+    def rebuild(self, batch_size=LOAD_BATCH_SIZE):
+        """
+        Reload every row into new planes and swap them in; readers keep the
+        old planes meanwhile. Returns the number of rows read, or None if
+        another thread is already rebuilding.
+        """
+        with self._lock:
+            if self._replay is not None:
+                return None
+            self._replay = []
+        try:
+            fresh = AttendanceIndex(self.since)
+            loaded = fresh._load(batch_size)
+            with self._lock:
+                # Changes committed during the load may predate what it read
+                fresh.apply(self._replay)
+                self.start, self._lo, self._hi, self.last_id = fresh.start, fresh._lo, fresh._hi, fresh.last_id
+                self.rebuilt_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._replay = None
+        return loaded
+
+    def _load(self, batch_size):
+        """Read Attendance rows with an id above last_id"""
+        from sqlalchemy import select
+        from models import db, Attendance
+        # Core table columns: plain tuples, no ORM row processing
+        t = Attendance.__table__
+        loaded = 0
+        while True:
+            query = select(t.c.id, t.c.student_umis, t.c.date, t.c.status).where(t.c.id > self.last_id)
+            if self.since is not None:
+                query = query.where(t.c.date >= self.since)
+            rows = db.session.connection().execute(query.order_by(t.c.id).limit(batch_size)).all()
+            if not rows:
+                return loaded
+            with self._lock:
+                self.mark_many((umis, day, status) for _, umis, day, status in rows)
+                self.last_id = rows[-1][0]
+            loaded += len(rows)
+            if len(rows) < batch_size:
+                return loaded
+
+    # ===== Queries =====
+
+    def _snapshot(self, umis):
+        """
+        (start, lo, hi) for a student, read together: _day() and rebuild()
+        change all three under the lock, so readers must not mix them.
+        """
+        with self._lock:
+            return self.start, self._lo.get(umis, 0), self._hi.get(umis, 0)
+
+    def _planes(self, umis, since=None, until=None):
+        """(present, absent, leave) bit masks, optionally limited to since..until inclusive"""
+        return _split(*self._snapshot(umis), since, until)
+
+    def counts(self, umis, since=None, until=None):
+        """Summary dict ('total', 'present', 'absent', 'leave', 'percentage'), as in utils.attendance_summary"""
+        present, absent, leave = self._planes(umis, since, until)
+        present, absent, leave = present.bit_count(), absent.bit_count(), leave.bit_count()
+        total = present + absent + leave
+        return {
+            'total': total,
+            'present': present,
+            'absent': absent,
+            'leave': leave,
+            'percentage': (present / total * 100) if total > 0 else 0,
+        }
+
+    def percentage(self, umis, since=None, until=None):
+        return self.counts(umis, since, until)['percentage']
+
+    def summaries(self, umis_list):
+        """{umis: summary dict} for many students (same shape as fetch_attendance_summaries)"""
+        return {umis: self.counts(umis) for umis in umis_list}
+
+    def log(self, umis, limit=20):
+        """Newest-first ((date, status), ...) of the most recent `limit` marked days"""
+        start, lo, hi = self._snapshot(umis)
+        entries = []
+        for position in _bits(lo | hi):
+            if len(entries) >= limit:
+                break
+            code = (lo >> position & 1) | (hi >> position & 1) << 1
+            entries.append((start + timedelta(days=position), CODE_STATUS[code]))
+        return tuple(entries)
+
+    def logs(self, umis_list, limit=20):
+        """{umis: log} for students with at least one mark (same shape as fetch_attendance_logs)"""
+        logs = {}
+        for umis in umis_list:
+            entries = self.log(umis, limit)
+            if entries:
+                logs[umis] = entries
+        return logs
+
+    def current_streak(self, umis):
+        """Present days in a row up to the latest mark (unmarked days do not break a streak)"""
+        present, absent, leave = self._planes(umis)
+        broken = absent | leave
+        if broken:
+            present >>= broken.bit_length()
+        return present.bit_count()
+
+    def longest_streak(self, umis):
+        """Longest run of Present marks not interrupted by an Absent or Leave"""
+        present, absent, leave = self._planes(umis)
+        longest = 0
+        upper = present.bit_length()
+        # Count present bits between consecutive breaks, newest run first
+        for position in _bits(absent | leave):
+            run = (present >> (position + 1)) & ((1 << max(0, upper - position - 1)) - 1)
+            longest = max(longest, run.bit_count())
+            upper = position
+        return max(longest, (present & ((1 << upper) - 1)).bit_count())
+
+    def weekly_trend(self, umis, weeks=None):
+        """
+        [(week start (Monday), present, marked, percentage), ...] oldest
+        first; only the latest `weeks` weeks if given.
+        """
+        start, lo, hi = self._snapshot(umis)
+        if start is None:
+            return []
+        present, absent, leave = _split(start, lo, hi)
+        marked = present | absent | leave
+        if not marked:
+            return []
+        # Align to Mondays so every window covers one calendar week
+        lead = start.weekday()
+        present <<= lead
+        marked <<= lead
+        first_monday = start - timedelta(days=lead)
+        total_weeks = (marked.bit_length() + 6) // 7
+        first_week = max(0, total_weeks - weeks) if weeks else 0
+        trend = []
+        for week in range(first_week, total_weeks):
+            days = marked >> (7 * week) & 0x7F
+            attended = (present >> (7 * week) & 0x7F).bit_count()
+            count = days.bit_count()
+            trend.append((first_monday + timedelta(weeks=week), attended, count,
+                          (attended / count * 100) if count else None))
+        return trend
+
+    def below_threshold(self, threshold=75.0, umis_list=None):
+        """UMIS of students whose overall percentage is under threshold (dashboards)"""
+        with self._lock:
+            candidates = list(self._lo) if umis_list is None else umis_list
+        below = []
+        for umis in candidates:
+            summary = self.counts(umis)
+            if summary['total'] and summary['percentage'] < threshold:
+                below.append(umis)
+        return below
+
+    def __len__(self):
+        return len(self._lo)
+
+    def __contains__(self, umis):
+        return umis in self._lo
+
+
+# ===== Keeping the index in step with Attendance =====
+
+def _record(target, change):
+    """Hold a flushed change until the session commits"""
+    from sqlalchemy.orm import object_session
+    session = object_session(target)
+    if session is None:
+        _index.apply([change])
+    else:
+        session.info.setdefault(_PENDING_KEY, []).append(change)
+
+
+def _after_insert(mapper, connection, target):
+    if _index is not None:
+        _record(target, ('mark', target.student_umis, target.date, target.status))
+
+
+def _after_update(mapper, connection, target):
+    if _index is None:
+        return
+    from sqlalchemy import inspect
+    state = inspect(target).attrs
+    for attr in ('date', 'student_umis'):
+        history = getattr(state, attr).history
+        if history.deleted:
+            old = {'date': target.date, 'student_umis': target.student_umis}
+            old[attr] = history.deleted[0]
+            _record(target, ('clear', old['student_umis'], old['date']))
+    _record(target, ('mark', target.student_umis, target.date, target.status))
+
+
+def _after_delete(mapper, connection, target):
+    if _index is not None:
+        _record(target, ('clear', target.student_umis, target.date))
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    """Attribute 'set' listener registered with active_history, so _after_update sees the old value"""
+
+
+def _after_commit(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes and _index is not None:
+        _index.apply(changes)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def install_attendance_index_hooks():
+    """Register the Attendance mapper and session commit/rollback events (idempotent)"""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from models import Attendance
+    event.listen(Attendance, 'after_insert', _after_insert)
+    event.listen(Attendance, 'after_update', _after_update)
+    event.listen(Attendance, 'after_delete', _after_delete)
+    # Load the old day and student of expired rows when they change, or the old mark is never cleared
+    event.listen(Attendance.date, 'set', _keep_old_value, active_history=True)
+    event.listen(Attendance.student_umis, 'set', _keep_old_value, active_history=True)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
+    _hooks_installed = True
+
+
+def init_attendance_index(start=None):
+    """
+    Build the shared index from the database, install the hooks and make
+    reports read from it. start: first day to index (default: the
+    earliest attendance row). Returns the index.
+    """
+    global _index
+    index = AttendanceIndex(start)
+    index.refresh()
+    install_attendance_index_hooks()
+    _index = index
+    return index
+
+
+def get_attendance_index():
+    """The shared index, or None until init_attendance_index() has run"""
+    return _index
+
+
+def reset_attendance_index():
+    """Stop using the shared index (reports fall back to the summary table)"""
+    global _index
+    _index = None
@@ -0,0 +1,277 @@
+"""
+Attendance summary store.
+
+Keeps one row per student with Present/Absent/Leave counts and the
+attendance percentage, so reports and dashboards read a student's
+summary with a primary-key lookup instead of walking every Attendance
+row. The table is maintained incrementally by SQLAlchemy mapper events
+on Attendance. Every process that writes attendance must register them
+at setup, before its first write: call init_attendance_summary() once at
+app startup (inside the app context), or install_attendance_summary_hooks()
+right after the models are defined. Writes made before that are not
+counted. Until the hooks are registered this process does not trust the
+table and aggregates Attendance on the fly instead.
+"""
+from datetime import datetime
+
+STATUS_COLUMNS = {
+    'Present': 'present_count',
+    'Absent': 'absent_count',
+    'Leave': 'leave_count',
+}
+
+_table = None
+_table_ready = False
+_hooks_installed = False
+
+
+def summary_table():
+    """The attendance_summary Table, declared on the app's metadata once"""
+    global _table
+    if _table is None:
+        from models import db
+        _table = db.Table(
+            'attendance_summary',
+            db.Column('student_umis', db.String(50), primary_key=True),
+            db.Column('present_count', db.Integer, nullable=False, default=0),
+            db.Column('absent_count', db.Integer, nullable=False, default=0),
+            db.Column('leave_count', db.Integer, nullable=False, default=0),
+            db.Column('total_days', db.Integer, nullable=False, default=0),
+            db.Column('percentage', db.Float, nullable=False, default=0.0),
+            db.Column('updated_at', db.DateTime),
+            extend_existing=True,
+        )
+    return _table
+
+
+def init_attendance_summary(rebuild=False):
+    """Create the summary table, install the Attendance hooks and optionally backfill"""
+    global _table_ready
+    from models import db
+    summary_table().create(bind=db.engine, checkfirst=True)
+    _table_ready = True
+    install_attendance_summary_hooks()
+    if rebuild:
+        rebuild_attendance_summary()
+
+
+def _ensure_ready():
+    """Create the table if needed (hooks are registered at setup, never on a read)"""
+    global _table_ready
+    if not _table_ready:
+        from models import db
+        summary_table().create(bind=db.engine, checkfirst=True)
+        _table_ready = True
+
+
+def _percentage_expr(t, present_delta, total_delta):
+    from sqlalchemy import case
+    total = t.c.total_days + total_delta
+    return case((total > 0, 100.0 * (t.c.present_count + present_delta) / total), else_=0.0)
+
+
+def apply_attendance_change(connection, umis, old_status=None, new_status=None):
+    """
+    Adjust a student's summary for one attendance row changing from
+    old_status to new_status (None on either side for insert/delete).
+    Runs on the given connection so it joins the caller's transaction.
+    """
+    if old_status == new_status:
+        return
+    t = summary_table()
+    deltas = {column: 0 for column in STATUS_COLUMNS.values()}
+    total_delta = 0
+    if old_status is not None:
+        total_delta -= 1
+        if old_status in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[old_status]] -= 1
+    if new_status is not None:
+        total_delta += 1
+        if new_status in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[new_status]] += 1
+
+    values = {column: t.c[column] + delta for column, delta in deltas.items() if delta}
+    values['total_days'] = t.c.total_days + total_delta
+    values['percentage'] = _percentage_expr(t, deltas['present_count'], total_delta)
+    values['updated_at'] = datetime.now()
+    result = connection.execute(t.update().where(t.c.student_umis == umis).values(**values))
+
+    if result.rowcount == 0:
+        # First attendance row for this student: seed the summary from the table itself
+        _rebuild(connection, [umis])
+
+
+def record_attendance_marked(umis, old_status=None, new_status=None):
+    """For bulk Core inserts/updates that bypass the ORM mapper events"""
+    from models import db
+    _ensure_ready()
+    apply_attendance_change(db.session.connection(), umis, old_status, new_status)
+
+
+def _after_insert(mapper, connection, target):
+    apply_attendance_change(connection, target.student_umis, None, target.status)
+
+
+def _after_update(mapper, connection, target):
+    from sqlalchemy import inspect
+    attrs = inspect(target).attrs
+    status = attrs.status.history
+    student = attrs.student_umis.history
+    if student.deleted:
+        # Row moved to another student: take it off the old one, add it to the new one
+        old_umis = student.deleted[0]
+        if status.deleted or not status.added:
+            old_status = status.deleted[0] if status.deleted else target.status
+            apply_attendance_change(connection, old_umis, old_status, None)
+            apply_attendance_change(connection, target.student_umis, None, target.status)
+        else:
+            _rebuild(connection, [old_umis, target.student_umis])
+    elif status.deleted:
+        apply_attendance_change(connection, target.student_umis, status.deleted[0], target.status)
+    elif status.added:
+        # Old value was never loaded (expired instance), so recount this student
+        _rebuild(connection, [target.student_umis])
+
+
+def _after_delete(mapper, connection, target):
+    apply_attendance_change(connection, target.student_umis, target.status, None)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    """Attribute 'set' listener registered with active_history, so _after_update sees the old value"""
+
+
+def install_attendance_summary_hooks():
+    """Register the Attendance mapper events (idempotent)"""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    from sqlalchemy import event
+    from models import Attendance
+    event.listen(Attendance, 'after_insert', _after_insert)
+    event.listen(Attendance, 'after_update', _after_update)
+    event.listen(Attendance, 'after_delete', _after_delete)
+    # Load the old student and status of expired rows when they change, or a move goes unnoticed
+    event.listen(Attendance.student_umis, 'set', _keep_old_value, active_history=True)
+    event.listen(Attendance.status, 'set', _keep_old_value, active_history=True)
+    _hooks_installed = True
+
+
+def _aggregate_query(umis_list=None):
+    """One GROUP BY over Attendance producing summary-shaped rows"""
+    from sqlalchemy import case, func, select
+    from models import Attendance
+
+    def count(status):
+        return func.coalesce(func.sum(case((Attendance.status == status, 1), else_=0)), 0)
+
+    total = func.count()
+    query = select(
+        Attendance.student_umis.label('student_umis'),
+        count('Present').label('present_count'),
+        count('Absent').label('absent_count'),
+        count('Leave').label('leave_count'),
+        total.label('total_days'),
+        case((total > 0, 100.0 * count('Present') / total), else_=0.0).label('percentage'),
+    ).group_by(Attendance.student_umis)
+    if umis_list is not None:
+        query = query.where(Attendance.student_umis.in_(umis_list))
+    return query
+
+
+def _rebuild(connection, umis_list=None):
+    from sqlalchemy import DateTime, literal
+    t = summary_table()
+    query = _aggregate_query(umis_list)
+    query = query.add_columns(literal(datetime.now(), DateTime).label('updated_at'))
+
+    delete = t.delete()
+    if umis_list is not None:
+        delete = delete.where(t.c.student_umis.in_(umis_list))
+    connection.execute(delete)
+    connection.execute(t.insert().from_select(
+        ['student_umis', 'present_count', 'absent_count', 'leave_count', 'total_days', 'percentage', 'updated_at'],
+        query,
+    ))
+
+
+def rebuild_attendance_summary(umis_list=None):
+    """Recompute summaries with one GROUP BY (all students, or just umis_list)"""
+    from models import db
+    _ensure_ready()
+    _rebuild(db.session.connection(), umis_list)
+    db.session.commit()
+
+
+def _empty_summary():
+    return {'total': 0, 'present': 0, 'absent': 0, 'leave': 0, 'percentage': 0.0}
+
+
+def _summary_from_row(row):
+    return {
+        'total': row.total_days,
+        'present': row.present_count,
+        'absent': row.absent_count,
+        'leave': row.leave_count,
+        'percentage': row.percentage,
+    }
+
+
+def fetch_attendance_summaries(umis_list):
+    """{umis: {'total', 'present', 'absent', 'leave', 'percentage'}} by primary key"""
+    from models import db
+    _ensure_ready()
+    t = summary_table()
+    summaries = {}
+    umis_list = list(umis_list)
+    for start in range(0, len(umis_list), 500):
+        chunk = umis_list[start:start + 500]
+        if _hooks_installed:
+            for row in db.session.execute(t.select().where(t.c.student_umis.in_(chunk))):
+                summaries[row.student_umis] = _summary_from_row(row)
+
+        # Students not summarised yet (e.g. before the first rebuild), or every student while
+        # this process has no hooks and so cannot trust the table, are aggregated on the fly
+        missing = [umis for umis in chunk if umis not in summaries]
+        if missing:
+            for row in db.session.execute(_aggregate_query(missing)):
+                summaries[row.student_umis] = _summary_from_row(row)
+
+    for umis in umis_list:
+        summaries.setdefault(umis, _empty_summary())
+    return summaries
+
+
+def get_attendance_summary(umis):
+    """Summary for a single student (dashboards)"""
+    return fetch_attendance_summaries([umis])[umis]
+
+
+def fetch_attendance_logs(umis_list, limit=20):
+    """
+    {umis: ((date, status), ...)} with at most `limit` newest rows per
+    student. Uses ROW_NUMBER() so the database does the per-student LIMIT.
+    """
+    from sqlalchemy import func, select
+    from models import db, Attendance
+    logs = {}
+    umis_list = list(umis_list)
+    for start in range(0, len(umis_list), 500):
+        chunk = umis_list[start:start + 500]
+        ranked = select(
+            Attendance.student_umis,
+            Attendance.date,
+            Attendance.status,
+            func.row_number().over(
+                partition_by=Attendance.student_umis,
+                order_by=Attendance.date.desc(),
+            ).label('rn'),
+        ).where(Attendance.student_umis.in_(chunk)).subquery()
+        rows = db.session.execute(
+            select(ranked.c.student_umis, ranked.c.date, ranked.c.status)
+            .where(ranked.c.rn <= limit)
+            .order_by(ranked.c.student_umis, ranked.c.rn)
+        )
+        for umis, date, status in rows:
+            logs.setdefault(umis, []).append((date, status))
+    return {umis: tuple(rows) for umis, rows in logs.items()}
@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.pdf_generator import report_filepath, render_student_report, student_report_cache_key
+from utils.report_cache import get_report_cache
+from utils.report_data import load_report_records, select_students
+
+
+def _render_one(job):
+    """Worker entry point. Runs in a child process and only sees plain data."""
+    data, filepath, host_url = job
+    try:
+        return {'umis': data['umis'], 'path': render_student_report(data, filepath, host_url), 'error': None}
+    except Exception as e:
+        return {'umis': data['umis'], 'path': None, 'error': str(e)}
+
+
+def generate_department_reports(students=None, department_id=None, year=None,
+                                output_dir='static/reports', host_url='http://127.0.0.1:5000/',
+                                workers=None, chunksize=None, use_cache=True, executor=None):
+    """
+    Generate one student report PDF per student, spreading the ReportLab
+    builds across a process pool.
+    students: list of student objects. If omitted, students are selected by
+              department_id / year.
+    workers: pool size (defaults to the number of CPUs). workers=1 renders
+             in the calling process without starting a pool.
+    use_cache: serve unchanged students from the report cache and only
+               render the misses.
+    executor: an existing process pool to render on (e.g. one kept across
+              many calls); workers is then only used for chunking.
+    Returns a list of {'umis', 'path', 'error', 'cached'} dicts in input order.
+    """
+    if students is None:
+        students = select_students(department_id, year)
+    students = list(students)
+
+    # Prefetch in the parent so workers never open DB sessions
+    errors = {}
+    records = load_report_records(students, errors=errors)
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = [None] * len(records)
+    jobs = []
+    pending = []  # (result index, cache key) for every job
+    cache = get_report_cache(os.path.join(output_dir, 'cache')) if use_cache else None
+    for idx, (student, record) in enumerate(zip(students, records)):
+        if record is None:
+            # One bad record must not abort the rest of the batch
+            results[idx] = {'umis': student.umis, 'path': None, 'error': errors[student.umis], 'cached': False}
+            continue
+        if cache is None:
+            jobs.append((record, report_filepath(record['umis'], output_dir), host_url))
+            pending.append((idx, None))
+            continue
+        try:
+            key = student_report_cache_key(record, host_url)
+        except Exception as e:
+            results[idx] = {'umis': record['umis'], 'path': None, 'error': str(e), 'cached': False}
+            continue
+        path = cache.get(key)
+        if path:
+            results[idx] = {'umis': record['umis'], 'path': path, 'error': None, 'cached': True}
+        else:
+            tmp_path = os.path.join(cache.root, f'.{key}.{os.getpid()}.tmp')
+            jobs.append((record, tmp_path, host_url))
+            pending.append((idx, key))
+
+    workers = workers or os.cpu_count() or 1
+    # Hand out work in chunks so IPC overhead stays small next to the builds
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (workers * 4))
+    if executor is not None and jobs:
+        rendered = list(executor.map(_render_one, jobs, chunksize=chunksize))
+    elif workers == 1 or len(jobs) <= 1:
+        rendered = [_render_one(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(_render_one, jobs, chunksize=chunksize))
+
+    # Only the parent touches the cache index
+    for (idx, key), job, result in zip(pending, jobs, rendered):
+        if key and result['path']:
+            result['path'] = cache.put(key, result['path'], name=f"student_report_{result['umis']}_{key[:16]}.pdf",
+                                       save_index=False)
+        elif key and os.path.exists(job[1]):
+            os.remove(job[1])
+        result['cached'] = False
+        results[idx] = result
+    if cache is not None and jobs:
+        cache.flush()
+    return results
@@ -0,0 +1,299 @@
+"""
+Cohort data export (CSV, XLSX, Parquet).
+
+The spreadsheet counterpart of generate_batch_report_pdf for staff who
+want the data rather than a printable report. There is no page layout:
+rows are written to the file as they are produced, one full-width marks
+column per subject instead of the PDF's truncated "Marks Summary".
+
+Students are read with the batch report's department/year filters in
+keyset chunks (utils.report_data.iter_student_chunks) and each chunk is
+turned into records with the attendance log and verification tokens
+left out, so memory stays at one chunk whatever the cohort size. The
+subject columns are fixed up front from the Subject table.
+
+    export_cohort('static/reports/cse_year2.xlsx', department_id=3, year=2)
+
+    # Flask: stream a CSV download without writing a file
+    return Response(stream_with_context(iter_cohort_csv(department_id=3)),
+                    mimetype='text/csv')
+
+Existing students_data lists (or generators) in the batch report format
+go through export_batch_data(). CSV needs nothing beyond the standard
+library; XLSX needs openpyxl and Parquet needs pyarrow (both optional).
+"""
+import csv
+import io
+import os
+import time
+
+from utils import metrics
+from utils.report_data import QUERY_CHUNK_SIZE, fetch_subject_lists, iter_student_chunks, load_report_records
+
+EXPORT_FORMATS = ('csv', 'xlsx', 'parquet')
+
+# (header, type) of the leading columns; subject columns follow as floats.
+# The first seven match the batch report table.
+BATCH_COLUMNS = (
+    ('S.No', int),
+    ('Roll No', str),
+    ('Name', str),
+    ('Email', str),
+    ('Department', str),
+    ('Year', str),
+    ('Attendance %', float),
+)
+RECORD_COLUMNS = BATCH_COLUMNS + (
+    ('Present', int),
+    ('Absent', int),
+    ('Leave', int),
+    ('Working Days', int),
+    ('SGPA', float),
+    ('CGPA', float),
+    ('Credits Earned', float),
+    ('Re-appear', int),
+)
+
+
+def export_format(path, fmt=None):
+    """The export format for path: fmt if given, else its extension"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+    return fmt
+
+
+def fetch_cohort_subject_codes(department_id=None, year=None, students=None):
+    """
+    Subject codes of the current-year subjects of the selected students,
+    in department/year then Subject.id order, each code once.
+    """
+    if students is not None:
+        keys = {(s.department_id, s.current_year) for s in students}
+    else:
+        from models import db, Student
+        query = db.session.query(Student.department_id, Student.current_year).distinct()
+        if department_id:
+            query = query.filter(Student.department_id == department_id)
+        if year:
+            query = query.filter(Student.current_year == year)
+        keys = set(query)
+    subjects = fetch_subject_lists(keys)
+    codes = {}
+    for key in sorted(subjects):
+        for code, _ in subjects[key]:
+            codes.setdefault(code, None)
+    return list(codes)
+
+
+def record_row(number, record, subject_codes):
+    """Export row (RECORD_COLUMNS then one marks cell per subject code) for a report record"""
+    attendance = record['attendance']
+    academics = record['academics'] or {}
+    marks = {row[0]: row[3] for row in academics.get('subjects', ())}
+    return [
+        number,
+        record['umis'],
+        record['name'],
+        record['email'],
+        record['department'],
+        str(record['current_year']) if record['current_year'] is not None else None,
+        round(attendance['percentage'], 2),
+        attendance['present'],
+        attendance['absent'],
+        attendance['leave'],
+        attendance['total'],
+        academics.get('sgpa'),
+        academics.get('cgpa'),
+        academics.get('credits_earned'),
+        academics.get('reappear_count'),
+    ] + [marks.get(code) for code in subject_codes]
+
+
+def batch_data_row(number, data, subject_codes):
+    """Export row (BATCH_COLUMNS then one marks cell per subject) for a students_data dict"""
+    marks = {m['subject']: m['marks'] for m in data.get('marks') or ()}
+    return [
+        number,
+        data.get('roll_number', 'N/A'),
+        data.get('name', ''),
+        data.get('email', ''),
+        data.get('department', ''),
+        str(data.get('year', '')),
+        round(data.get('attendance_pct', 0), 2),
+    ] + [marks.get(code) for code in subject_codes]
+
+
+def iter_export_chunks(department_id=None, year=None, students=None, subject_codes=None,
+                       chunk_size=QUERY_CHUNK_SIZE):
+    """Lists of export rows (see record_row) for the selected students, one list per chunk"""
+    if students is not None:
+        students = list(students)
+        chunks = (students[start:start + chunk_size] for start in range(0, len(students), chunk_size))
+    else:
+        chunks = iter_student_chunks(department_id, year, chunk_size)
+    if subject_codes is None:
+        subject_codes = fetch_cohort_subject_codes(department_id, year, students)
+    number = 0
+    for chunk in chunks:
+        with metrics.span('export.records'):
+            records = load_report_records(chunk, attendance_log=False, verification=False)
+        rows = []
+        for record in records:
+            number += 1
+            rows.append(record_row(number, record, subject_codes))
+        yield rows
+
+
+# ===== Writers =====
+
+def _write_csv(path, header, chunks):
+    # utf-8-sig so Excel detects UTF-8 names
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        count = 0
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def _write_xlsx(path, header, chunks):
+    try:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+    except ImportError as e:
+        raise RuntimeError("XLSX export requires openpyxl (pip install openpyxl)") from e
+    # Write-only mode streams rows to disk instead of keeping a cell grid
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Students')
+    sheet.freeze_panes = 'C2'
+    bold = Font(bold=True)
+    header_cells = []
+    for title in header:
+        cell = WriteOnlyCell(sheet, value=title)
+        cell.font = bold
+        header_cells.append(cell)
+    sheet.append(header_cells)
+    count = 0
+    for rows in chunks:
+        for row in rows:
+            sheet.append(row)
+        count += len(rows)
+    workbook.save(path)
+    return count
+
+
+def _write_parquet(path, header, types, chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)") from e
+    arrow_types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+    schema = pa.schema([(title, arrow_types[kind]) for title, kind in zip(header, types)])
+    count = 0
+    # One row group per chunk
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            if not rows:
+                continue
+            columns = [[row[col] for row in rows] for col in range(len(header))]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            ))
+            count += len(rows)
+    return count
+
+
+def write_export(output_path, columns, subject_codes, chunks, fmt=None):
+    """
+    Write chunks of rows to output_path. columns: (header, type) pairs of
+    the leading columns; one float column per subject code follows.
+    Returns a summary dict ('path', 'format', 'rows', 'columns', 'seconds').
+    """
+    fmt = export_format(output_path, fmt)
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    header = [title for title, _ in columns] + list(subject_codes)
+    types = [kind for _, kind in columns] + [float] * len(subject_codes)
+
+    started = time.perf_counter()
+    with metrics.span('export.write', format=fmt):
+        if fmt == 'csv':
+            count = _write_csv(output_path, header, chunks)
+        elif fmt == 'xlsx':
+            count = _write_xlsx(output_path, header, chunks)
+        else:
+            count = _write_parquet(output_path, header, types, chunks)
+    metrics.incr('export_rows', count, format=fmt)
+    return {'path': output_path, 'format': fmt, 'rows': count, 'columns': len(header),
+            'seconds': time.perf_counter() - started}
+
+
+# ===== Entry points =====
+
+def export_cohort(output_path, fmt=None, students=None, department_id=None, year=None, chunk_size=QUERY_CHUNK_SIZE):
+    """
+    Export the selected students' data to a CSV, XLSX or Parquet file
+    (format from fmt or the file extension). Runs inside the app context.
+    students: list of student objects. If omitted, students are selected by
+              department_id / year, chunk by chunk.
+    Returns the write_export summary dict.
+    """
+    fmt = export_format(output_path, fmt)
+    if students is not None:
+        students = list(students)
+    subject_codes = fetch_cohort_subject_codes(department_id, year, students)
+    chunks = iter_export_chunks(department_id, year, students, subject_codes, chunk_size)
+    return write_export(output_path, RECORD_COLUMNS, subject_codes, chunks, fmt)
+
+
+def export_batch_data(students_data, output_path, fmt=None, subjects=None, chunk_size=QUERY_CHUNK_SIZE):
+    """
+    Export students_data in the generate_batch_report_pdf format (any
+    iterable, e.g. a generator) to CSV, XLSX or Parquet.
+    subjects: the marks columns, in order. Without it the rows are read
+              once up front to collect the subject names, so pass it to
+              keep a generator streaming.
+    """
+    if subjects is None:
+        students_data = list(students_data)
+        found = {}
+        for data in students_data:
+            for m in data.get('marks') or ():
+                found.setdefault(m['subject'], None)
+        subjects = list(found)
+
+    def chunks():
+        rows = []
+        for number, data in enumerate(students_data, 1):
+            rows.append(batch_data_row(number, data, subjects))
+            if len(rows) >= chunk_size:
+                yield rows
+                rows = []
+        yield rows
+
+    return write_export(output_path, BATCH_COLUMNS, subjects, chunks(), fmt)
+
+
+def iter_cohort_csv(department_id=None, year=None, students=None, chunk_size=QUERY_CHUNK_SIZE):
+    """
+    The export_cohort CSV as an iterator of UTF-8 byte chunks (one per
+    student chunk), for streaming HTTP responses. Needs the app context
+    while it is consumed (stream_with_context).
+    """
+    if students is not None:
+        students = list(students)
+    subject_codes = fetch_cohort_subject_codes(department_id, year, students)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([title for title, _ in RECORD_COLUMNS] + subject_codes)
+    yield buffer.getvalue().encode('utf-8-sig')
+    for rows in iter_export_chunks(department_id, year, students, subject_codes, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
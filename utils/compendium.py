@@ -0,0 +1,274 @@
+"""
+Department compendium: the selected students' reports as one PDF.
+
+Each student is a section that starts on a new page, with its own
+outline (bookmark) entry and table-of-contents line. Because it is one
+document, fonts, the watermark form XObject and repeated images are
+written once for the whole class instead of once per student file.
+
+The whole compendium is laid out in a single pass. The table of contents
+has one row per student, so its size is known up front; the page number
+in each row is a form XObject that is only defined once that student's
+section has been placed (PDF resolves the forward reference at save).
+
+A sidecar JSON next to the PDF records each student's page range, so
+split_compendium() can cut per-student files out of it later without
+re-rendering (this needs the optional pypdf package).
+
+    path = generate_compendium_pdf(department_id=3, year=2)
+    split_compendium(path)   # -> [{'umis', 'path'}, ...]
+"""
+import json
+import os
+from datetime import datetime
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.platypus import Flowable, PageBreak, Paragraph, SimpleDocTemplate, Spacer
+
+from utils import metrics
+from utils.fast_table import fit_text, text_width
+from utils.pdf_generator import draw_watermark_and_header, record_report_metrics, student_report_flowables
+from utils.report_data import load_report_records, select_students
+from utils.report_theme import get_theme
+
+COMPENDIUM_INDEX_VERSION = 1
+
+# Room reserved right of the contents leader dots for the page number
+PAGE_NUMBER_WIDTH = 40
+# Shortest leader kept between a contents title and its page number
+MIN_LEADER_WIDTH = 12
+
+
+def page_number_form_name(key):
+    """Form XObject holding the first page number of a section"""
+    return f'SGACSectionPage_{key}'
+
+
+class SectionStart(Flowable):
+    """Zero-size marker placed at the top of each student's section"""
+
+    def __init__(self, key, title, umis):
+        super().__init__()
+        self.key = key
+        self.title = title
+        self.umis = umis
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        pass
+
+
+class ContentsTable(Flowable):
+    """
+    Table of contents rows (title, leader dots, page number), each linked
+    to its section. Titles too long for the row are cut with '...'.
+    Splits across pages like a table.
+    """
+
+    def __init__(self, entries, style):
+        super().__init__()
+        self.entries = entries  # (section key, title)
+        self.style = style
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        self.height = len(self.entries) * self.style.leading
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        rows = int(availHeight // self.style.leading)
+        if rows <= 0:
+            return []
+        if rows >= len(self.entries):
+            return [self]
+        return [ContentsTable(self.entries[:rows], self.style), ContentsTable(self.entries[rows:], self.style)]
+
+    def draw(self):
+        canv = self.canv
+        style = self.style
+        leading = style.leading
+        number_x = self.width - PAGE_NUMBER_WIDTH
+        title_width = number_x - 6 - MIN_LEADER_WIDTH - style.leftIndent
+        canv.setFont(style.fontName, style.fontSize)
+        canv.setFillColor(style.textColor)
+        canv.setStrokeColor(style.textColor)
+        canv.setDash(1, 3)
+        for row, (key, title) in enumerate(self.entries):
+            bottom = self.height - (row + 1) * leading
+            baseline = bottom + (leading - style.fontSize) / 2 + 1
+            title = fit_text(title, style.fontName, style.fontSize, title_width)
+            canv.drawString(style.leftIndent, baseline, title)
+            leader_start = style.leftIndent + text_width(title, style.fontName, style.fontSize) + 6
+            if leader_start < number_x - 6:
+                canv.line(leader_start, baseline, number_x - 6, baseline)
+            canv.saveState()
+            canv.translate(self.width, baseline)
+            canv.doForm(page_number_form_name(key))
+            canv.restoreState()
+            canv.linkRect('', key, (0, bottom, self.width, bottom + leading), relative=1)
+
+
+class CompendiumDocTemplate(SimpleDocTemplate):
+    """
+    Turns SectionStart markers into bookmarks, contents page numbers and
+    page ranges. progress(sections, pages) is called after every page, as
+    in utils.pdf_generator.BatchDocTemplate.
+    """
+
+    def __init__(self, filename, contents_style=None, progress=None, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.contents_style = contents_style
+        self.progress = progress
+        self.sections = []
+
+    def afterFlowable(self, flowable):
+        if not isinstance(flowable, SectionStart):
+            return
+        canv = self.canv
+        canv.bookmarkPage(flowable.key)
+        canv.addOutlineEntry(flowable.title, flowable.key, level=0)
+        if self.contents_style is not None:
+            # Right-aligned at the form origin; the bbox extends to the left
+            style = self.contents_style
+            canv.beginForm(page_number_form_name(flowable.key), lowerx=-PAGE_NUMBER_WIDTH, lowery=-style.fontSize,
+                           upperx=0, uppery=style.fontSize * 2)
+            canv.setFont(style.fontName, style.fontSize)
+            canv.setFillColor(style.textColor)
+            canv.drawRightString(0, 0, str(self.page))
+            canv.endForm()
+        self.sections.append({'umis': flowable.umis, 'title': flowable.title,
+                              'first_page': self.page, 'last_page': self.page})
+
+    def afterPage(self):
+        if self.sections:
+            self.sections[-1]['last_page'] = self.page
+        if self.progress is not None:
+            self.progress(len(self.sections), self.page)
+
+
+def compendium_index_path(pdf_path):
+    """Path of the page-range sidecar written next to a compendium PDF"""
+    return os.path.splitext(pdf_path)[0] + '.index.json'
+
+
+def compendium_flowables(records, host_url='http://127.0.0.1:5000/', title=None, toc=True):
+    """Title page with the table of contents, then one section per student record"""
+    theme = get_theme('student')
+    elements = []
+    if toc:
+        # Same cover header as the batch report
+        batch_theme = get_theme('batch')
+        elements.extend(batch_theme.college_header())
+        elements.append(theme.line_table())
+        elements.append(Spacer(1, 0.2*inch))
+        elements.append(Paragraph(f"<b>{(title or 'Department Report Compendium').upper()}</b>", batch_theme.title_style))
+        elements.append(Paragraph(
+            f"{len(records)} students | Generated {datetime.now().strftime('%d %B %Y at %I:%M %p')}",
+            batch_theme.footer_style
+        ))
+        elements.append(Spacer(1, 0.3*inch))
+
+    sections = [(f"student_{idx}", f"{data['umis']} - {data['name']}") for idx, data in enumerate(records)]
+    if toc:
+        elements.append(ContentsTable(sections, theme.toc_style))
+
+    for (key, section_title), data in zip(sections, records):
+        if elements:
+            elements.append(PageBreak())
+        elements.append(SectionStart(key, section_title, data['umis']))
+        elements.extend(student_report_flowables(data, host_url))
+    return elements
+
+
+def render_compendium(records, output, host_url='http://127.0.0.1:5000/', title=None, toc=True, progress=None):
+    """
+    Build the compendium into output (a path or a writable binary file
+    object) from utils.report_data records. Returns the section list:
+    [{'umis', 'title', 'first_page', 'last_page'}], pages 1-based inclusive.
+    progress: optional progress(sections, pages) callback.
+    """
+    doc = CompendiumDocTemplate(output, contents_style=get_theme('student').toc_style if toc else None,
+                                progress=progress, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50,
+                                bottomMargin=50, title=title or "Department Report Compendium")
+    with metrics.span('report.flowables', kind='compendium'):
+        elements = compendium_flowables(records, host_url, title, toc)
+
+    with metrics.span('report.layout', kind='compendium'):
+        doc.build(elements, onFirstPage=draw_watermark_and_header, onLaterPages=draw_watermark_and_header)
+    record_report_metrics(doc, output, 'compendium')
+    return doc.sections
+
+
+def generate_compendium_pdf(students=None, department_id=None, year=None, output_path=None,
+                            host_url='http://127.0.0.1:5000/', title=None, toc=True):
+    """
+    Render every selected student's report into one PDF and write its
+    page-range sidecar (see compendium_index_path).
+    students: list of student objects. If omitted, students are selected by
+              department_id / year.
+    output_path: defaults to a timestamped file under static/reports.
+    Returns the PDF path.
+    """
+    if students is None:
+        students = select_students(department_id, year)
+    records = load_report_records(students)
+
+    if output_path is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_path = os.path.join('static/reports', f'compendium_{timestamp}.pdf')
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    sections = render_compendium(records, output_path, host_url, title, toc)
+    write_compendium_index(output_path, sections)
+    return output_path
+
+
+def write_compendium_index(pdf_path, sections):
+    """Write the page-range sidecar of a rendered compendium"""
+    with open(compendium_index_path(pdf_path), 'w') as f:
+        json.dump({'version': COMPENDIUM_INDEX_VERSION, 'pdf': os.path.basename(pdf_path),
+                   'sections': sections}, f, indent=1)
+
+
+def split_compendium(pdf_path, output_dir=None, umis=None):
+    """
+    Cut per-student PDFs out of a compendium using its sidecar page
+    ranges. Requires pypdf.
+    The pages are copied as they are, so each file keeps the compendium's
+    running page numbers in its footer (a student's report may start at
+    "Page 37"); render with generate_student_report_pdf for standalone
+    numbering.
+    output_dir: defaults to a folder named after the compendium.
+    umis: only extract these students (default: all).
+    Returns a list of {'umis', 'path'} dicts in compendium order.
+    """
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError as e:
+        raise RuntimeError("Splitting a compendium requires pypdf (pip install pypdf)") from e
+
+    with open(compendium_index_path(pdf_path)) as f:
+        sections = json.load(f)['sections']
+    if umis is not None:
+        wanted = set(umis)
+        sections = [s for s in sections if s['umis'] in wanted]
+
+    if output_dir is None:
+        output_dir = os.path.splitext(pdf_path)[0]
+    os.makedirs(output_dir, exist_ok=True)
+
+    reader = PdfReader(pdf_path)
+    results = []
+    for section in sections:
+        writer = PdfWriter()
+        for page in range(section['first_page'] - 1, section['last_page']):
+            writer.add_page(reader.pages[page])
+        path = os.path.join(output_dir, f"student_report_{section['umis']}.pdf")
+        with open(path, 'wb') as f:
+            writer.write(f)
+        results.append({'umis': section['umis'], 'path': path})
+    return results
@@ -0,0 +1,335 @@
+"""
+Background report export jobs.
+
+generate_batch_report_pdf and generate_compendium_pdf lay out the whole
+cohort before they return, which for "All Departments / All Years" takes
+longer than a proxied HTTP request may stay open. Routes submit a job
+instead and get its id back at once:
+
+    jobs = get_export_jobs()
+    job_id = jobs.submit_batch_report(lambda: build_students_data(dept_id, year, status),
+                                      report_title=title, hod_sign=hod_sign)
+    ...
+    jobs.status(job_id)        # polled by the page: status, rows / total_rows, pages
+    jobs.output_path(job_id)   # the finished PDF, for send_file()
+    jobs.cancel(job_id)
+
+A job first loads its data in a job thread inside the app context
+(students_data may be a callable so the queries run there rather than
+in the request), then renders on a pool of low-priority worker processes
+so layout does not compete with request threads. At most max_running
+jobs run at once and at most max_queued wait behind them; submitting
+beyond that raises RuntimeError.
+
+Progress and cancellation cross the process boundary through files in
+the job's directory: the renderer rewrites progress.json after every
+page (rows laid out, pages written) and stops at the next page once the
+cancel marker exists. Finished jobs and their files are removed after
+`retention` seconds. Jobs are kept in memory, so a restart forgets them.
+"""
+import json
+import os
+import secrets
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from utils import metrics
+
+DEFAULT_JOB_DIR = os.path.join('static', 'reports', 'jobs')
+DEFAULT_MAX_RUNNING = 2
+DEFAULT_MAX_QUEUED = 8
+DEFAULT_RETENTION = 6 * 3600  # seconds
+
+QUEUED = 'queued'
+LOADING = 'loading'
+RENDERING = 'rendering'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+PROGRESS_NAME = 'progress.json'
+CANCEL_NAME = 'cancel'
+
+# Rewrite progress.json at most this often (seconds); the last page is always written
+PROGRESS_INTERVAL = 0.5
+
+
+class ExportCancelled(Exception):
+    """Raised inside a render when its job has been cancelled"""
+
+
+# ===== Worker process side =====
+
+class JobProgress:
+    """progress(rows, pages) callback for the renderers, backed by files in the job directory"""
+
+    def __init__(self, job_dir):
+        self.progress_path = os.path.join(job_dir, PROGRESS_NAME)
+        self.cancel_path = os.path.join(job_dir, CANCEL_NAME)
+        self.rows = 0
+        self.pages = 0
+        self._written_at = 0.0
+
+    def __call__(self, rows, pages):
+        self.rows, self.pages = rows, pages
+        if os.path.exists(self.cancel_path):
+            raise ExportCancelled()
+        if time.monotonic() - self._written_at >= PROGRESS_INTERVAL:
+            self.write()
+
+    def write(self):
+        tmp_path = f'{self.progress_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'rows': self.rows, 'pages': self.pages}, f)
+        os.replace(tmp_path, self.progress_path)
+        self._written_at = time.monotonic()
+
+
+def _render_job(kind, job_dir, output_path, payload):
+    """Render one job's output (runs in a worker process). Returns {'rows', 'pages'}."""
+    progress = JobProgress(job_dir)
+    if kind == 'batch':
+        from utils.pdf_generator import render_batch_report
+        render_batch_report(payload['students_data'], output_path, payload['report_title'],
+                            payload['hod_sign'], payload['principal_sign'], progress=progress, scale=payload['scale'])
+    else:
+        from utils.compendium import render_compendium, write_compendium_index
+        sections = render_compendium(payload['records'], output_path, payload['host_url'], payload['title'],
+                                     payload['toc'], progress=progress)
+        write_compendium_index(output_path, sections)
+    progress.write()
+    return {'rows': progress.rows, 'pages': progress.pages}
+
+
+def read_progress(job_dir):
+    """{'rows', 'pages'} last written by a job's renderer ({} before the first page)"""
+    try:
+        with open(os.path.join(job_dir, PROGRESS_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# ===== Job manager =====
+
+class ExportJobs:
+    """Bounded pool of export jobs with progress, cancellation and downloadable output"""
+
+    def __init__(self, app=None, job_dir=DEFAULT_JOB_DIR, max_running=DEFAULT_MAX_RUNNING,
+                 max_queued=DEFAULT_MAX_QUEUED, retention=DEFAULT_RETENTION, processes=True):
+        """
+        app: Flask app whose context the loading step runs in (default: the
+             current app).
+        processes: render in worker processes; False renders in the job
+                   thread (no process startup, but layout holds the GIL).
+        """
+        # Imported here: concurrent.futures.process loads multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        if app is None:
+            from flask import current_app
+            app = current_app._get_current_object()
+        self.app = app
+        self.job_dir = job_dir
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.retention = retention
+        self._jobs = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._threads = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix='export-job')
+        self._processes = None
+        if processes:
+            from utils.prerender import lower_process_priority
+            self._processes = ProcessPoolExecutor(max_workers=max_running, initializer=lower_process_priority)
+
+    # ===== Submitting =====
+
+    def _submit(self, kind, load, download_name):
+        """Register a job; load() runs in the job thread and returns (total_rows, render payload)"""
+        self.purge()
+        with self._lock:
+            waiting = sum(1 for job in self._jobs.values() if job['status'] not in FINISHED)
+            if waiting >= self.max_running + self.max_queued:
+                raise RuntimeError("Too many report exports in progress; try again when one has finished")
+            job_id = secrets.token_hex(8)
+            job_dir = os.path.join(self.job_dir, job_id)
+            os.makedirs(job_dir, exist_ok=True)
+            self._jobs[job_id] = {
+                'id': job_id,
+                'kind': kind,
+                'status': QUEUED,
+                'download_name': download_name,
+                'rows': 0,
+                'total_rows': None,
+                'pages': 0,
+                'bytes': None,
+                'error': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'path': os.path.join(job_dir, download_name),
+                'cancel_requested': False,
+            }
+            self._futures[job_id] = self._threads.submit(self._run, job_id, load)
+        metrics.incr('export_jobs', kind=kind, result='submitted')
+        return job_id
+
+    def submit_batch_report(self, students_data, report_title=None, hod_sign=True, principal_sign=False):
+        """
+        Queue a generate_batch_report_pdf export; returns the job id.
+        students_data: the list of dicts, or a callable returning it (called
+                       in the job thread, inside the app context).
+        """
+        load = students_data if callable(students_data) else (lambda: students_data)
+
+        def load_payload():
+            from utils.grading import get_grade_scale
+            rows = list(load())
+            # Read in the app context: worker processes have no app config
+            return len(rows), {'students_data': rows, 'report_title': report_title,
+                               'hod_sign': hod_sign, 'principal_sign': principal_sign, 'scale': get_grade_scale()}
+
+        return self._submit('batch', load_payload, f"batch_report_{datetime.now():%Y%m%d_%H%M%S}.pdf")
+
+    def submit_compendium(self, students=None, department_id=None, year=None, host_url='http://127.0.0.1:5000/',
+                          title=None, toc=True):
+        """
+        Queue a generate_compendium_pdf export (the page-range sidecar is
+        written next to it); returns the job id. students: list of student
+        objects, or None to select by department_id / year in the job.
+        """
+        def load_payload():
+            from utils.report_data import load_report_records, select_students
+            selected = select_students(department_id, year) if students is None else students
+            records = load_report_records(selected)
+            return len(records), {'records': records, 'host_url': host_url, 'title': title, 'toc': toc}
+
+        return self._submit('compendium', load_payload, f"compendium_{datetime.now():%Y%m%d_%H%M%S}.pdf")
+
+    # ===== Running =====
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            self._jobs[job_id].update(changes)
+
+    def _run(self, job_id, load):
+        job = self._jobs[job_id]
+        job_dir = os.path.dirname(job['path'])
+        try:
+            if job['cancel_requested']:
+                raise ExportCancelled()
+            self._update(job_id, status=LOADING, started_at=time.time())
+            with metrics.span('export_job.load', kind=job['kind']):
+                with self.app.app_context():
+                    total_rows, payload = load()
+            if job['cancel_requested']:
+                raise ExportCancelled()
+            self._update(job_id, status=RENDERING, total_rows=total_rows)
+            with metrics.span('export_job.render', kind=job['kind']):
+                if self._processes is not None:
+                    result = self._processes.submit(_render_job, job['kind'], job_dir, job['path'], payload).result()
+                else:
+                    result = _render_job(job['kind'], job_dir, job['path'], payload)
+            self._update(job_id, status=DONE, bytes=os.path.getsize(job['path']), **result)
+        except ExportCancelled:
+            self._discard_output(job)
+            self._update(job_id, status=CANCELLED, **read_progress(job_dir))
+        except Exception as e:
+            print(f"Export job {job_id} failed: {e}")
+            self._discard_output(job)
+            self._update(job_id, status=FAILED, error=str(e), **read_progress(job_dir))
+        finally:
+            self._update(job_id, finished_at=time.time())
+            with self._lock:
+                self._futures.pop(job_id, None)
+            metrics.incr('export_jobs', kind=job['kind'], result=job['status'])
+
+    def _discard_output(self, job):
+        for path in (job['path'], os.path.splitext(job['path'])[0] + '.index.json'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # ===== Status, download, cancel =====
+
+    def status(self, job_id):
+        """The job as a dict (progress read live while rendering), or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+        if job['status'] == RENDERING:
+            job.update(read_progress(os.path.dirname(job['path'])))
+        job.pop('cancel_requested')
+        return job
+
+    def jobs(self):
+        """Status of every known job, newest first"""
+        with self._lock:
+            job_ids = sorted(self._jobs, key=lambda job_id: self._jobs[job_id]['created_at'], reverse=True)
+        return [self.status(job_id) for job_id in job_ids]
+
+    def output_path(self, job_id):
+        """Path of a finished job's file, or None while it is not done"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job['path'] if job is not None and job['status'] == DONE else None
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job (a render stops after its current
+        page). Returns False if the job is unknown or already finished.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] in FINISHED:
+                return False
+            job['cancel_requested'] = True
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            # Never started: _run will not record it
+            self._update(job_id, status=CANCELLED, finished_at=time.time())
+            with self._lock:
+                self._futures.pop(job_id, None)
+            metrics.incr('export_jobs', kind=job['kind'], result=CANCELLED)
+            return True
+        with open(os.path.join(os.path.dirname(job['path']), CANCEL_NAME), 'w'):
+            pass
+        return True
+
+    def purge(self, older_than=None):
+        """Forget finished jobs (and delete their files) older than retention; returns how many"""
+        cutoff = time.time() - (self.retention if older_than is None else older_than)
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job['status'] in FINISHED and job['finished_at'] and job['finished_at'] < cutoff]
+            for job in expired:
+                del self._jobs[job['id']]
+        for job in expired:
+            shutil.rmtree(os.path.dirname(job['path']), ignore_errors=True)
+        return len(expired)
+
+    def shutdown(self, cancel=True):
+        """Stop the pools, cancelling unfinished jobs first unless cancel is False"""
+        if cancel:
+            for job_id in [job['id'] for job in self.jobs() if job['status'] not in FINISHED]:
+                self.cancel(job_id)
+        self._threads.shutdown(wait=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=True)
+
+
+_default_jobs = None
+_default_jobs_lock = threading.Lock()
+
+
+def get_export_jobs(app=None, **options):
+    """Process-wide export job manager (created with app/options on first call)"""
+    global _default_jobs
+    with _default_jobs_lock:
+        if _default_jobs is None:
+            _default_jobs = ExportJobs(app, **options)
+        return _default_jobs
@@ -0,0 +1,249 @@
+"""
+Fixed-layout table flowable for very large tabular reports.
+
+A platypus Table measures every cell of every row, keeps a style object
+per cell and copies its remaining rows on every page split, so a
+10,000-row batch report spends most of its time and memory in table
+layout. FastTable knows its column widths and that every cell is a
+single line of text, so every row has the same height: wrap() is a
+multiplication, split() slices an index range over the shared rows, and
+draw() paints the page's rows straight onto the canvas (backgrounds as
+one path per stripe colour, the text as one block of operators, the grid
+as one set of lines).
+
+It stays a flowable, so headings, signatures, page callbacks and
+afterFlowable hooks work as with any other table:
+
+    table = FastTable(header, rows, col_widths, style=FastTableStyle())
+    doc.build([heading, table, signatures])
+
+The header row repeats on every page and the row stripes restart below
+it, as with Table(repeatRows=1) and ROWBACKGROUNDS. Body text wider
+than its cell is cut to fit with '...'; header titles are drawn as given.
+"""
+from reportlab.lib import colors
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable
+
+ELLIPSIS = '...'
+
+
+class FastTableStyle:
+    """Look of a FastTable. The defaults mirror the cell defaults of a platypus Table."""
+
+    def __init__(self, font='Helvetica', font_size=10, text_color=colors.black,
+                 header_font='Helvetica-Bold', header_font_size=None, header_text_color=colors.black,
+                 header_background=None, row_backgrounds=(), leading=12, top_padding=3, bottom_padding=3,
+                 left_padding=6, right_padding=6, align='CENTER', column_align=None,
+                 grid_width=0, grid_color=colors.black, box_width=0, box_color=colors.black):
+        """
+        row_backgrounds: colours cycled over the body rows of each page.
+        align: 'LEFT', 'CENTER' or 'RIGHT'; column_align: {column: align}
+               overrides for the body rows.
+        grid_width / box_width: inner grid and outer box line widths (0: none).
+        """
+        self.font = font
+        self.font_size = font_size
+        self.text_color = text_color
+        self.header_font = header_font
+        self.header_font_size = header_font_size or font_size
+        self.header_text_color = header_text_color
+        self.header_background = header_background
+        self.row_backgrounds = tuple(row_backgrounds)
+        self.leading = leading
+        self.top_padding = top_padding
+        self.bottom_padding = bottom_padding
+        self.left_padding = left_padding
+        self.right_padding = right_padding
+        self.align = align
+        self.column_align = dict(column_align or {})
+        self.grid_width = grid_width
+        self.grid_color = grid_color
+        self.box_width = box_width
+        self.box_color = box_color
+
+    @property
+    def row_height(self):
+        return self.leading + self.top_padding + self.bottom_padding
+
+    def baseline(self, font_size):
+        """Baseline above the bottom of a row (Table's VALIGN MIDDLE placement of one line)"""
+        return (self.bottom_padding + self.row_height - self.top_padding + self.leading) / 2.0 - font_size
+
+
+class _CharWidths(dict):
+    """Glyph widths of one font at size 1000, filled on first use of each character"""
+
+    def __init__(self, font):
+        super().__init__()
+        self.font = font
+
+    def __missing__(self, char):
+        width = self[char] = stringWidth(char, self.font, 1000)
+        return width
+
+
+_char_widths = {}
+
+
+def text_width(text, font, size):
+    """stringWidth(text, font, size) from cached per-character widths"""
+    widths = _char_widths.get(font)
+    if widths is None:
+        widths = _char_widths[font] = _CharWidths(font)
+    return sum(map(widths.__getitem__, text)) * size / 1000.0
+
+
+def fit_text(text, font, size, width):
+    """text, cut at the end and suffixed with '...' if it is wider than width"""
+    if text_width(text, font, size) <= width:
+        return text
+    widths = _char_widths[font]
+    room = (width - text_width(ELLIPSIS, font, size)) * 1000.0 / size
+    used = 0
+    for cut, char in enumerate(text):
+        used += widths[char]
+        if used > room:
+            break
+    return text[:cut].rstrip() + ELLIPSIS if cut else ''
+
+
+# Literal-string escapes for text written straight into the content stream
+_PDF_ESCAPES = str.maketrans({'\\': '\\\\', '(': '\\(', ')': '\\)', '\r': ' ', '\n': ' '})
+
+
+class FastTable(Flowable):
+    """
+    Table of single-line text cells with fixed column widths and row
+    height; the header row repeats on every page. rows is shared, not
+    copied, by the parts split() returns.
+    """
+
+    def __init__(self, header, rows, col_widths, style=None, start=0, stop=None):
+        super().__init__()
+        self.header = header
+        self.rows = rows
+        self.col_widths = tuple(col_widths)
+        self.style = style or FastTableStyle()
+        self.start = start
+        self.stop = len(rows) if stop is None else stop
+        self.hAlign = 'CENTER'
+        self.width = sum(self.col_widths)
+
+    @property
+    def body_rows(self):
+        """Rows of this part, not counting the header"""
+        return self.stop - self.start
+
+    def wrap(self, availWidth, availHeight):
+        self.height = (self.body_rows + 1) * self.style.row_height
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        # Header plus as many whole rows as fit (with a little slack for rounding)
+        fit = int((availHeight + 1e-6) // self.style.row_height) - 1
+        if fit < 1 or fit >= self.body_rows:
+            return []
+        middle = self.start + fit
+        return [
+            FastTable(self.header, self.rows, self.col_widths, self.style, self.start, middle),
+            FastTable(self.header, self.rows, self.col_widths, self.style, middle, self.stop),
+        ]
+
+    def _row_text(self, ops, others, cells, top, font, size, aligns, fit=True):
+        """
+        Append Tm/Tj operators for one row's ASCII cells to ops; other
+        cells go to others as (x, y, text) for canvas.drawString.
+        """
+        style = self.style
+        y = top - style.row_height + style.baseline(size)
+        left, right = style.left_padding, style.right_padding
+        x = 0
+        for col_width, align, value in zip(self.col_widths, aligns, cells):
+            value = '' if value is None else str(value)
+            if value:
+                # Measured once: the width both fits and aligns the cell
+                value_width = text_width(value, font, size)
+                if fit and value_width > col_width - left - right:
+                    value = fit_text(value, font, size, col_width - left - right)
+                    value_width = text_width(value, font, size)
+                if align == 'LEFT':
+                    text_x = x + left
+                elif align == 'RIGHT':
+                    text_x = x + col_width - right - value_width
+                else:
+                    text_x = x + (col_width + left - right - value_width) / 2.0
+                if value.isascii():
+                    ops.append(f'1 0 0 1 {text_x:.2f} {y:.2f} Tm ({value.translate(_PDF_ESCAPES)}) Tj')
+                else:
+                    others.append((text_x, y, value))
+            x += col_width
+
+    def _draw_text(self, color, font, size, rows, top, aligns, fit=True):
+        """Draw rows of cells (top edge of the first at top) in one literal text block"""
+        canv = self.canv
+        canv.setFillColor(color)
+        canv.setFont(font, size, self.style.leading)
+        ops = []
+        others = []
+        for cells in rows:
+            self._row_text(ops, others, cells, top, font, size, aligns, fit)
+            top -= self.style.row_height
+        if ops:
+            # The text block a PDFTextObject would write, without its per-call overhead
+            resource = canv._doc.getInternalFontName(font)
+            canv.addLiteral(f'BT {resource} {size} Tf {self.style.leading} TL\n' + '\n'.join(ops) + '\nET')
+        for x, y, value in others:
+            # Non-ASCII text needs the canvas' font encoding and substitution
+            canv.drawString(x, y, value)
+
+    def draw(self):
+        canv = self.canv
+        style = self.style
+        row_height = style.row_height
+        count = self.body_rows
+        width, height = self.width, (count + 1) * row_height
+        canv.saveState()
+
+        # Backgrounds: header, then one path per stripe colour
+        if style.header_background is not None:
+            canv.setFillColor(style.header_background)
+            canv.rect(0, height - row_height, width, row_height, stroke=0, fill=1)
+        stripes = style.row_backgrounds
+        for offset, color in enumerate(stripes):
+            if color is None or offset >= count:
+                continue
+            canv.setFillColor(color)
+            canv.addLiteral('\n'.join(
+                f'0 {height - (i + 2) * row_height:.2f} {width:.2f} {row_height:.2f} re'
+                for i in range(offset, count, len(stripes))
+            ) + '\nf')
+
+        # Text
+        self._draw_text(style.header_text_color, style.header_font, style.header_font_size, [self.header], height,
+                        [style.align] * len(self.col_widths), fit=False)
+        aligns = [style.column_align.get(col, style.align) for col in range(len(self.col_widths))]
+        self._draw_text(style.text_color, style.font, style.font_size,
+                        (self.rows[i] for i in range(self.start, self.stop)), height - row_height, aligns)
+
+        # Lines: inner grid, then the outer box
+        canv.setLineCap(1)
+        canv.setLineJoin(1)
+        if style.grid_width:
+            lines = [(0, i * row_height, width, i * row_height) for i in range(count + 1)]
+            x = 0
+            for col_width in self.col_widths[:-1]:
+                x += col_width
+                lines.append((x, 0, x, height))
+            canv.setLineWidth(style.grid_width)
+            canv.setStrokeColor(style.grid_color)
+            canv.addLiteral('\n'.join(f'{x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l' for x1, y1, x2, y2 in lines) + '\nS')
+        if style.box_width:
+            canv.setLineWidth(style.box_width)
+            canv.setStrokeColor(style.box_color)
+            if self.stop < len(self.rows):
+                # Continued on the next page: like a split Table, no bottom edge
+                canv.lines([(0, 0, 0, height), (0, height, width, height), (width, height, width, 0)])
+            else:
+                canv.rect(0, 0, width, height, stroke=1, fill=0)
+        canv.restoreState()
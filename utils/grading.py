@@ -0,0 +1,168 @@
+"""
+Vectorized grade computation.
+
+A cohort's marks come in as students x subjects NumPy arrays, and one
+pass computes percentages, letter grades, grade points, re-appear flags
+and credit-weighted grade point averages (SGPA over one term's subjects,
+CGPA over everything graded so far).
+
+    result = compute_grades(marks, max_marks, credits)
+    result.letters()[i], result.gpa(term_mask)[i], result.reappear[i]
+
+NaN marks mean "not entered yet": no grade, and left out of the averages.
+
+The grade boundaries come from app.config['GRADE_SCALE'] (see
+GradeScale.from_config), read once per process by get_grade_scale();
+without it the DEFAULT_GRADES scale is used.
+"""
+import numpy as np
+
+# Credits assumed for a subject when none are recorded
+DEFAULT_CREDITS = 4
+
+# (letter, minimum percentage, grade points), best grade first; the last one is the fail grade
+DEFAULT_GRADES = (
+    ('O', 90, 10),
+    ('D+', 75, 9),
+    ('D', 65, 8),
+    ('A+', 60, 7),
+    ('A', 50, 6),
+    ('B', 40, 5),
+    ('U', 0, 0),
+)
+
+
+class GradeScale:
+    """Grade boundaries. Anything below pass_percent (default: the lowest passing bound) is a re-appear."""
+
+    def __init__(self, grades=DEFAULT_GRADES, pass_percent=None):
+        grades = sorted(grades, key=lambda g: g[1])
+        if grades[0][1] != 0:
+            raise ValueError("The lowest grade must start at 0%")
+        self.grades = tuple(reversed(grades))
+        # Ascending internally, so np.digitize maps a percentage straight to an index
+        self._bounds = np.array([g[1] for g in grades[1:]], dtype=float)
+        self._letters = np.array([g[0] for g in grades] + [''], dtype=object)  # index -1: ungraded
+        self._points = np.array([g[2] for g in grades] + [0], dtype=float)
+        self.pass_percent = float(grades[1][1] if pass_percent is None else pass_percent)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        From app config, e.g. {'grades': [['O', 90, 10], ..., ['U', 0, 0]], 'pass_percent': 40};
+        None gives the default scale.
+        """
+        if not config:
+            return DEFAULT_SCALE
+        return cls([tuple(g) for g in config['grades']], config.get('pass_percent'))
+
+    def grade_indices(self, percent):
+        """Index into the ascending grade table for each percentage"""
+        return np.digitize(percent, self._bounds)
+
+
+DEFAULT_SCALE = GradeScale()
+
+_app_scale = None
+
+
+def get_grade_scale():
+    """
+    The app's grade scale from app.config['GRADE_SCALE'], read once per
+    process; DEFAULT_SCALE without that key or outside an app context.
+    """
+    global _app_scale
+    if _app_scale is None:
+        from flask import current_app, has_app_context
+        if not has_app_context():
+            return DEFAULT_SCALE
+        _app_scale = GradeScale.from_config(current_app.config.get('GRADE_SCALE'))
+    return _app_scale
+
+
+class GradeResult:
+    """Per-cell and per-student outputs of compute_grades (all NumPy arrays)"""
+
+    def __init__(self, scale, percent, grade_index, points, graded, reappear, credits):
+        self.scale = scale
+        self.percent = percent          # students x subjects, NaN where ungraded
+        self.grade_index = grade_index  # students x subjects, -1 where ungraded
+        self.points = points            # students x subjects, 0 where ungraded
+        self.graded = graded            # students x subjects bool
+        self.reappear = reappear        # students x subjects bool
+        self.credits = credits          # students x subjects
+
+    def letters(self):
+        """Letter grade per cell ('' where ungraded)"""
+        return self.scale._letters[self.grade_index]
+
+    def _weights(self, mask):
+        graded = self.graded if mask is None else self.graded & mask
+        return self.credits * graded
+
+    def gpa(self, mask=None):
+        """Credit-weighted grade point average per student over the masked subjects (NaN if none graded)"""
+        weights = self._weights(mask)
+        total = weights.sum(axis=1)
+        return np.divide((self.points * weights).sum(axis=1), total,
+                         out=np.full(total.shape, np.nan), where=total > 0)
+
+    def credits_attempted(self, mask=None):
+        return self._weights(mask).sum(axis=1)
+
+    def credits_earned(self, mask=None):
+        graded = self.graded & ~self.reappear
+        if mask is not None:
+            graded &= mask
+        return (self.credits * graded).sum(axis=1)
+
+    def reappear_count(self, mask=None):
+        reappear = self.reappear if mask is None else self.reappear & mask
+        return reappear.sum(axis=1)
+
+
+def compute_grades(marks, max_marks=100, credits=DEFAULT_CREDITS, scale=DEFAULT_SCALE):
+    """
+    marks: students x subjects array (NaN = not entered).
+    max_marks, credits: scalars, per-subject vectors or full arrays (broadcast to marks).
+    """
+    marks = np.asarray(marks, dtype=float)
+    max_marks = np.broadcast_to(np.asarray(max_marks, dtype=float), marks.shape)
+    credits = np.broadcast_to(np.asarray(credits, dtype=float), marks.shape)
+
+    graded = ~np.isnan(marks) & (max_marks > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.where(graded, marks / max_marks * 100, np.nan)
+    grade_index = np.where(graded, scale.grade_indices(np.nan_to_num(percent)), -1)
+    points = np.where(graded, scale._points[grade_index], 0.0)
+    reappear = graded & (np.nan_to_num(percent, nan=np.inf) < scale.pass_percent)
+    return GradeResult(scale, percent, grade_index, points, graded, reappear, credits)
+
+
+def grade_mark_lists(mark_lists, scale=DEFAULT_SCALE, credits=DEFAULT_CREDITS):
+    """
+    Grade rows of the batch report shape: one list per student of
+    {'subject', 'marks', optional 'max_marks'} dicts. Returns
+    (GradeResult, subject names in column order).
+    """
+    columns = {}
+    for row in mark_lists:
+        for mark in row:
+            columns.setdefault(mark['subject'], len(columns))
+    marks = np.full((len(mark_lists), len(columns)), np.nan)
+    max_marks = np.full(marks.shape, 100.0)
+    for i, row in enumerate(mark_lists):
+        for mark in row:
+            if mark.get('marks') is None:
+                continue
+            j = columns[mark['subject']]
+            marks[i, j] = mark['marks']
+            if mark.get('max_marks'):
+                max_marks[i, j] = mark['max_marks']
+    return compute_grades(marks, max_marks, credits, scale), list(columns)
+
+
+def optional_float(value, digits=2):
+    """NumPy scalar to a rounded float, or None for NaN"""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
@@ -0,0 +1,233 @@
+"""
+Timing spans and counters for report generation and delivery.
+
+    from utils import metrics
+    with metrics.span('report.layout', kind='student'):
+        doc.build(elements)
+    metrics.incr('reports_built', kind='student')
+
+Nothing is recorded until enable_metrics() installs one or more sinks.
+While disabled, span() hands back a shared no-op context manager and
+incr() returns straight away, so instrumented code costs one global check.
+
+Sinks:
+    LogSink         one log line per span/counter event
+    PrometheusSink  aggregates in memory, render() gives the text exposition format
+    MemorySink      keeps every event (tests, benchmarks)
+"""
+import threading
+import time
+
+_enabled = False
+_sinks = ()
+
+
+class MetricsSink:
+    """Base class: receives every finished span and counter increment"""
+
+    def record_span(self, name, seconds, labels):
+        pass
+
+    def record_counter(self, name, value, labels):
+        pass
+
+
+class LogSink(MetricsSink):
+    """Writes each event to a logger (default 'sgac.metrics' at INFO)"""
+
+    def __init__(self, logger=None, level=None):
+        # logging is imported here, it is a large share of this module's import time otherwise
+        import logging
+        self.logger = logger or logging.getLogger('sgac.metrics')
+        self.level = logging.INFO if level is None else level
+
+    @staticmethod
+    def _labels(labels):
+        return ' '.join(f'{key}={value}' for key, value in sorted(labels.items()))
+
+    def record_span(self, name, seconds, labels):
+        self.logger.log(self.level, 'span %s %.2fms %s', name, seconds * 1000, self._labels(labels))
+
+    def record_counter(self, name, value, labels):
+        self.logger.log(self.level, 'counter %s +%s %s', name, value, self._labels(labels))
+
+
+class MemorySink(MetricsSink):
+    """Keeps raw events in lists"""
+
+    def __init__(self):
+        self.spans = []  # (name, seconds, labels)
+        self.counters = []  # (name, value, labels)
+        self._lock = threading.Lock()
+
+    def record_span(self, name, seconds, labels):
+        with self._lock:
+            self.spans.append((name, seconds, labels))
+
+    def record_counter(self, name, value, labels):
+        with self._lock:
+            self.counters.append((name, value, labels))
+
+    def _matches(self, event_labels, labels):
+        return all(event_labels.get(key) == value for key, value in labels.items())
+
+    def total(self, name, **labels):
+        """Sum of a counter, optionally restricted to matching labels"""
+        return sum(value for n, value, l in self.counters if n == name and self._matches(l, labels))
+
+    def span_seconds(self, name, **labels):
+        """Total time spent in a span"""
+        return sum(seconds for n, seconds, l in self.spans if n == name and self._matches(l, labels))
+
+    def span_totals(self):
+        """{span name: total seconds}"""
+        totals = {}
+        for name, seconds, _ in self.spans:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+            self.counters = []
+
+
+class PrometheusSink(MetricsSink):
+    """
+    Aggregates counters and span durations (as summaries with _count and
+    _sum) and renders them in the Prometheus text exposition format, e.g.
+    for a /metrics route returning Response(sink.render(), mimetype='text/plain').
+    """
+
+    def __init__(self, prefix='sgac'):
+        self.prefix = prefix
+        self._counters = {}  # (name, labels tuple) -> value
+        self._spans = {}  # (name, labels tuple) -> [count, sum]
+        self._lock = threading.Lock()
+
+    def record_span(self, name, seconds, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            entry = self._spans.get(key)
+            if entry is None:
+                self._spans[key] = [1, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+
+    def record_counter(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _metric_name(self, name, suffix):
+        return ''.join(c if c.isascii() and (c.isalnum() or c == '_') else '_'
+                       for c in f'{self.prefix}_{name}_{suffix}')
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def _label_text(self, labels):
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{key}="{self._escape(value)}"' for key, value in labels) + '}'
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            spans = sorted(self._spans.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            metric = self._metric_name(name, 'total')
+            if metric not in typed:
+                lines.append(f'# TYPE {metric} counter')
+                typed.add(metric)
+            lines.append(f'{metric}{self._label_text(labels)} {value}')
+        for (name, labels), (count, total) in spans:
+            metric = self._metric_name(name, 'seconds')
+            if metric not in typed:
+                lines.append(f'# TYPE {metric} summary')
+                typed.add(metric)
+            lines.append(f'{metric}_count{self._label_text(labels)} {count}')
+            lines.append(f'{metric}_sum{self._label_text(labels)} {total:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Times a with-block and reports it to every sink (an 'error' label is added on exceptions)"""
+
+    __slots__ = ('name', 'labels', 'start', 'seconds')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.seconds = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.start
+        labels = self.labels if exc_type is None else dict(self.labels, error=exc_type.__name__)
+        for sink in _sinks:
+            sink.record_span(self.name, self.seconds, labels)
+        return False
+
+
+def span(name, **labels):
+    """Context manager timing one phase"""
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, labels)
+
+
+def incr(name, value=1, **labels):
+    """Add value to a counter"""
+    if not _enabled:
+        return
+    for sink in _sinks:
+        sink.record_counter(name, value, labels)
+
+
+def enabled():
+    """True while at least one sink is installed (guard for costly measurements)"""
+    return _enabled
+
+
+def enable_metrics(*sinks):
+    """Install sinks (replacing any previous ones) and start recording; returns the sinks"""
+    global _enabled, _sinks
+    _sinks = tuple(sinks)
+    _enabled = bool(_sinks)
+    return sinks
+
+
+def add_sink(sink):
+    """Install one more sink next to the existing ones"""
+    global _enabled, _sinks
+    _sinks = _sinks + (sink,)
+    _enabled = True
+    return sink
+
+
+def disable_metrics():
+    """Remove all sinks; instrumentation becomes a no-op again"""
+    global _enabled, _sinks
+    _enabled = False
+    _sinks = ()
@@ -1,65 +1,282 @@
-from reportlab.lib.pagesizes import A4
+from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak, Flowable
 from reportlab.pdfgen import canvas
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics.charts.piecharts import Pie
-from reportlab.graphics.barcode import qr
+from reportlab.pdfbase import pdfdoc
+from reportlab.lib.rl_accel import asciiBase85Decode
 
 from datetime import datetime
+from io import BytesIO
+import math
 import os
-import random  # For mock grades
 
-# Custom colors for the college theme
-COLLEGE_PRIMARY = colors.HexColor('#1a237e')  # Deep blue
-COLLEGE_SECONDARY = colors.HexColor('#0d47a1')  # Medium blue
-COLLEGE_ACCENT = colors.HexColor('#ffd700')  # Gold
-COLLEGE_LIGHT = colors.HexColor('#e8eaf6')  # Light blue
-COLLEGE_SUCCESS = colors.HexColor('#2e7d32')  # Green
-COLLEGE_DANGER = colors.HexColor('#c62828')  # Red
-COLLEGE_WARNING = colors.HexColor('#f57c00')  # Orange
+from utils import metrics
+from utils.fast_table import FastTable
+from utils.photo_cache import THUMB_DPI, THUMB_QUALITY, find_student_photo, get_photo_thumbnail
+from utils.qr_cache import get_qr_drawing
+from utils.report_cache import get_report_cache, report_cache_key
+from utils.report_data import load_report_record
+from utils.report_theme import (
+    COLLEGE_PRIMARY, COLLEGE_SECONDARY, COLLEGE_ACCENT, COLLEGE_LIGHT,
+    COLLEGE_SUCCESS, COLLEGE_DANGER, COLLEGE_WARNING, get_theme,
+)
 
-def draw_watermark_and_header(canvas, doc):
-    """Draws watermark and static elements on every page"""
+# Bump whenever the report layout changes so cached PDFs are rebuilt
+REPORT_TEMPLATE_VERSION = '2.4'
+
+# Output profiles of the student report. 'compact' is for messaging
+# attachments: smaller, harder-compressed photo thumbnails, binary streams
+# instead of ASCII85 text (a quarter smaller) and the QR as a single path.
+REPORT_PROFILES = {
+    'default': {'photo_dpi': THUMB_DPI, 'photo_quality': THUMB_QUALITY, 'ascii85': True, 'qr_path': False},
+    'compact': {'photo_dpi': 96, 'photo_quality': 60, 'ascii85': False, 'qr_path': True},
+}
+
+# Photo (dpi, quality) a compact report steps down to while it is over its target size
+COMPACT_PHOTO_STEPS = ((72, 45), (48, 35))
+
+# Batch reports of at least this many students draw their table with
+# utils.fast_table.FastTable instead of a platypus Table
+FAST_TABLE_MIN_ROWS = 200
+
+# colors.lightgrey at alpha 0.1 composited over a white page
+WATERMARK_COLOR = colors.Color(*(1 - 0.1 * (1 - c) for c in colors.lightgrey.rgb()))
+
+def watermark_form_name(pagesize):
+    """Form XObject name of the watermark layer for a page size"""
+    return f'SGACWatermark{int(pagesize[0])}x{int(pagesize[1])}'
+
+def _define_watermark_form(canvas, pagesize):
+    """Record the static watermark layer once per document as a form XObject"""
+    canvas.beginForm(watermark_form_name(pagesize))
     canvas.saveState()
     
     # WATERMARK
+    # Drawn before any page content, so light grey at 10% alpha over white
+    # is emitted as the equivalent opaque tint (forms get no ExtGState)
     canvas.setFont('Helvetica-Bold', 60)
-    canvas.setFillColor(colors.lightgrey, alpha=0.1)
-    canvas.translate(A4[0]/2, A4[1]/2)
+    canvas.setFillColor(WATERMARK_COLOR)
+    canvas.translate(pagesize[0]/2, pagesize[1]/2)
     canvas.rotate(45)
     canvas.drawCentredString(0, 0, "SETHUPATHY COLLEGE")
     canvas.restoreState()
+    canvas.endForm()
+
+def draw_watermark_and_header(canvas, doc):
+    """Draws watermark and static elements on every page"""
+    pagesize = doc.pagesize
+    
+    # The watermark is drawn once into a form XObject and referenced on each page
+    form_name = watermark_form_name(pagesize)
+    if not canvas.hasForm(form_name):
+        _define_watermark_form(canvas, pagesize)
+    canvas.doForm(form_name)
     
     # FOOTER DECORATION (Static on all pages if needed, but handled in flowables mostly)
-    # We can add page numbers here if desired
+    # Only the page number changes from page to page
     canvas.saveState()
     canvas.setFont('Helvetica', 8)
     canvas.setFillColor(colors.gray)
     page_num = f"Page {doc.page}"
-    canvas.drawRightString(A4[0]-50, 30, page_num)
+    canvas.drawRightString(pagesize[0]-50, 30, page_num)
     canvas.restoreState()
 
-def generate_student_report_pdf(student, output_dir='static/reports', host_url='http://127.0.0.1:5000/'):
+def report_profile(profile):
+    """Settings dict of a profile given by name (or already as a dict)"""
+    if isinstance(profile, dict):
+        return profile
+    try:
+        return REPORT_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown report profile {profile!r} (expected one of {', '.join(REPORT_PROFILES)})")
+
+def _drop_ascii85(obj):
+    """Make one document object write its stream Flate-only"""
+    if isinstance(obj, (pdfdoc.PDFPage, pdfdoc.PDFFormXObject)):
+        # Both pick their filters from rl_config.useA85 when formatted, unless Contents already exists
+        if obj.compression and obj.Contents is None and obj.stream:
+            obj.Contents = pdfdoc.PDFStream(content=obj.stream, filters=[pdfdoc.PDFZCompress])
+            if isinstance(obj, pdfdoc.PDFFormXObject):
+                obj.compression = 0
+    elif isinstance(obj, pdfdoc.PDFImageXObject):
+        # Images are encoded when drawn
+        if obj._filters[:1] == ('ASCII85Decode',):
+            obj.streamContent = asciiBase85Decode(obj.streamContent)
+            obj._filters = obj._filters[1:]
+        if getattr(obj, '_smask', None) is not None:
+            _drop_ascii85(obj._smask)
+
+class BinaryStreamCanvas(canvas.Canvas):
+    """
+    Canvas whose document is written without ASCII85 stream encoding.
+    rl_config.useA85 is process-wide, so instead of flipping it this
+    canvas rewrites its own pages, forms and images just before saving;
+    builds running at the same time are unaffected. Pass it to
+    doc.build(..., canvasmaker=BinaryStreamCanvas).
+    """
+
+    def _binary_document(self):
+        if len(self._code):
+            self.showPage()
+        for obj in list(self._doc.idToObject.values()):
+            _drop_ascii85(obj)
+
+    def save(self):
+        self._binary_document()
+        super().save()
+
+    def getpdfdata(self):
+        self._binary_document()
+        return super().getpdfdata()
+
+class QrPath(Flowable):
+    """
+    A QR Drawing from utils.qr_cache redrawn as one filled path in module
+    units: a few bytes per module instead of a saved graphics state each.
+    """
+
+    def __init__(self, drawing):
+        super().__init__()
+        self.width = drawing.width
+        self.height = drawing.height
+        modules = [shape for group in drawing.contents for shape in group.contents if shape.fillColor is not None]
+        self.module = min(shape.height for shape in modules) if modules else 1
+        self.rects = [
+            tuple(round(value / self.module) for value in (shape.x, shape.y, shape.width, shape.height))
+            for shape in modules
+        ]
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        canv = self.canv
+        canv.saveState()
+        canv.scale(self.module, self.module)
+        path = canv.beginPath()
+        for x, y, w, h in self.rects:
+            path.rect(x, y, w, h)
+        canv.setFillColor(colors.black)
+        canv.drawPath(path, stroke=0, fill=1)
+        canv.restoreState()
+
+class BatchTable(Table):
+    """The batch report's student table (split parts keep the class, so they can be counted)"""
+
+    @property
+    def body_rows(self):
+        return self._nrows - self.repeatRows
+
+class BatchDocTemplate(SimpleDocTemplate):
+    """
+    Calls progress(rows, pages) after every page: student rows of the
+    batch table (BatchTable or FastTable) laid out so far and pages written. The callback may raise
+    to abort the build (e.g. utils.export_jobs cancellation).
+    """
+
+    def __init__(self, filename, progress=None, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.progress = progress
+        self.rows = 0
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, (BatchTable, FastTable)):
+            self.rows += flowable.body_rows
+
+    def afterPage(self):
+        if self.progress is not None:
+            self.progress(self.rows, self.page)
+
+def report_filepath(umis, output_dir='static/reports'):
+    """Timestamped output path for a student's report"""
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Generate filename
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f'student_report_{umis}_{timestamp}.pdf'
+    return os.path.join(output_dir, filename)
+
+def student_report_cache_key(data, host_url, **extra):
+    """
+    Cache key covering every input of render_student_report (extra: e.g.
+    profile settings). The grades are in the record, so a new GRADE_SCALE
+    gives new keys.
+    """
+    photo = find_student_photo(data['umis'])
+    return report_cache_key(data, REPORT_TEMPLATE_VERSION, host_url=host_url, photo=photo, **extra)
+
+def generate_student_report_pdf(student, output_dir='static/reports', host_url='http://127.0.0.1:5000/', use_cache=True,
+                                profile='default', target_bytes=None):
     """
     Generate a comprehensive PDF report for a student including:
     - Personal information
     - Attendance summary and visualization
     - Subject enrollment and academic performance
     - QR Verification with Photo
+    With use_cache, an unchanged student gets the previously built PDF
+    from the report cache under output_dir/cache.
+    profile: 'default' or 'compact' (see REPORT_PROFILES) or a settings
+    dict; target_bytes is the compact profile's size ceiling (see
+    generate_compact_report). Raises ValueError for an unknown profile.
     """
-    # Create output directory if it doesn't exist
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    # Generate filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'student_report_{student.umis}_{timestamp}.pdf'
-    filepath = os.path.join(output_dir, filename)
-    
+    settings = report_profile(profile)
+    if settings is REPORT_PROFILES['compact']:
+        return generate_compact_report(student, output_dir, host_url, target_bytes, use_cache)['path']
+    data = load_report_record(student)
+    if not use_cache:
+        filepath = report_filepath(data['umis'], output_dir)
+        return render_student_report(data, filepath, host_url, settings)
+    
+    if settings is REPORT_PROFILES['default']:
+        key = student_report_cache_key(data, host_url)
+    else:
+        key = student_report_cache_key(data, host_url, profile=settings)
+    cache = get_report_cache(os.path.join(output_dir, 'cache'))
+    return cache.get_or_build(
+        key,
+        lambda tmp_path: render_student_report(data, tmp_path, host_url, settings),
+        name=f"student_report_{data['umis']}_{key[:16]}.pdf",
+    )
+
+# Streaming responses are sent in pieces of this size
+PDF_CHUNK_SIZE = 64 * 1024
+
+def iter_pdf_chunks(buffer, chunk_size=PDF_CHUNK_SIZE):
+    """Yield a BytesIO's contents in chunks without copying the whole buffer"""
+    view = buffer.getbuffer()
+    try:
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+    finally:
+        view.release()
+
+def student_report_bytes(student, host_url='http://127.0.0.1:5000/'):
+    """Build a student's report in memory and return the PDF bytes"""
+    buffer = BytesIO()
+    render_student_report(load_report_record(student), buffer, host_url)
+    return buffer.getvalue()
+
+def iter_student_report(student, host_url='http://127.0.0.1:5000/', chunk_size=PDF_CHUNK_SIZE):
+    """
+    Build a student's report in memory and return an iterator of byte
+    chunks, e.g. for Response(iter_student_report(s), mimetype='application/pdf').
+    The PDF is built (and the DB read) before this returns, so the
+    iterator can outlive the request context.
+    """
+    buffer = BytesIO()
+    render_student_report(load_report_record(student), buffer, host_url)
+    return iter_pdf_chunks(buffer, chunk_size)
+
+def render_student_report(data, filepath, host_url='http://127.0.0.1:5000/', profile='default'):
+    """
+    Build the student report PDF from a record produced by
+    utils.report_data. Does not touch the database.
+    filepath: output path or a writable binary file object (e.g. BytesIO).
+    profile: name or settings dict (see REPORT_PROFILES).
+    """
+    settings = report_profile(profile)
     # Create PDF document with custom page template
     doc = SimpleDocTemplate(
         filepath, 
@@ -67,89 +284,107 @@ def generate_student_report_pdf(student, output_dir='static/reports', host_url='
         rightMargin=50,
         leftMargin=50,
         topMargin=50,
-        bottomMargin=50
-    )
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # ===== CUSTOM STYLES =====
-    
-    # College name style
-    college_name_style = ParagraphStyle(
-        'CollegeName',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=COLLEGE_PRIMARY,
-        spaceAfter=4,
-        alignment=TA_LEFT, # Changed to Left for layout with photo
-        fontName='Helvetica-Bold',
-        leading=22
-    )
-    
-    # College subtitle style
-    college_subtitle_style = ParagraphStyle(
-        'CollegeSubtitle',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=COLLEGE_SECONDARY,
-        spaceAfter=8,
-        alignment=TA_LEFT,
-        fontName='Helvetica',
-        leading=11
+        bottomMargin=50,
+        pageCompression=1
     )
+    with metrics.span('report.flowables', kind='student'):
+        elements = student_report_flowables(data, host_url, settings)
     
-    # Report title style
-    report_title_style = ParagraphStyle(
-        'ReportTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.white,
-        spaceAfter=20,
-        spaceBefore=10,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold',
-        leading=20
-    )
+    # Build PDF with Watermark and Header callbacks
+    with metrics.span('report.layout', kind='student'):
+        doc.build(elements, onFirstPage=draw_watermark_and_header, onLaterPages=draw_watermark_and_header,
+                  canvasmaker=canvas.Canvas if settings['ascii85'] else BinaryStreamCanvas)
+    record_report_metrics(doc, filepath, 'student')
     
-    # Section heading style
-    heading_style = ParagraphStyle(
-        'SectionHeading',
-        parent=styles['Heading2'],
-        fontSize=13,
-        textColor=COLLEGE_PRIMARY,
-        spaceAfter=10,
-        spaceBefore=15,
-        fontName='Helvetica-Bold',
-        borderWidth=0,
-        borderColor=COLLEGE_ACCENT,
-        borderPadding=5,
-        leftIndent=0,
-        leading=16
-    )
+    return filepath
+
+def render_compact_report(data, filepath, host_url='http://127.0.0.1:5000/', target_bytes=None):
+    """
+    Build the compact profile of a report record. While the PDF is over
+    target_bytes, the photo is stepped down through COMPACT_PHOTO_STEPS;
+    the last attempt is kept even if it is still too big.
+    filepath: output path or a writable binary file object.
+    Returns {'bytes', 'photo_dpi', 'photo_quality', 'within_target'}.
+    """
+    settings = REPORT_PROFILES['compact']
+    steps = [(settings['photo_dpi'], settings['photo_quality'])]
+    if target_bytes is not None and find_student_photo(data['umis']) is not None:
+        steps.extend(COMPACT_PHOTO_STEPS)
+    for dpi, quality in steps:
+        buffer = BytesIO()
+        render_student_report(data, buffer, host_url, dict(settings, photo_dpi=dpi, photo_quality=quality))
+        size = buffer.tell()
+        if target_bytes is None or size <= target_bytes:
+            break
+    if isinstance(filepath, str):
+        with open(filepath, 'wb') as f:
+            f.write(buffer.getbuffer())
+    else:
+        filepath.write(buffer.getbuffer())
+    return {'bytes': size, 'photo_dpi': dpi, 'photo_quality': quality,
+            'within_target': target_bytes is None or size <= target_bytes}
+
+def generate_compact_report(student, output_dir='static/reports', host_url='http://127.0.0.1:5000/',
+                            target_bytes=None, use_cache=True):
+    """
+    Build a student's report with the compact profile, e.g. for WhatsApp
+    attachments (see render_compact_report for target_bytes).
+    Returns {'path', 'bytes', 'within_target'}.
+    """
+    data = load_report_record(student)
+    if not use_cache:
+        filepath = report_filepath(data['umis'], output_dir)
+        result = render_compact_report(data, filepath, host_url, target_bytes)
+    else:
+        key = student_report_cache_key(data, host_url, profile=REPORT_PROFILES['compact'],
+                                       steps=COMPACT_PHOTO_STEPS, target_bytes=target_bytes)
+        cache = get_report_cache(os.path.join(output_dir, 'cache'))
+        filepath = cache.get_or_build(
+            key,
+            lambda tmp_path: render_compact_report(data, tmp_path, host_url, target_bytes),
+            name=f"student_report_{data['umis']}_{key[:16]}.pdf",
+        )
+    size = os.path.getsize(filepath)
+    within_target = target_bytes is None or size <= target_bytes
+    metrics.incr('compact_reports', result='within_target' if within_target else 'over_target')
+    return {'path': filepath, 'bytes': size, 'within_target': within_target}
+
+def record_report_metrics(doc, output, kind):
+    """Count a finished report, its pages and bytes (no-op while metrics are disabled)"""
+    if not metrics.enabled():
+        return
+    metrics.incr('reports_built', kind=kind)
+    metrics.incr('report_pages', doc.page, kind=kind)
+    if isinstance(output, str):
+        metrics.incr('report_bytes', os.path.getsize(output), kind=kind)
+    elif hasattr(output, 'tell'):
+        metrics.incr('report_bytes', output.tell(), kind=kind)
+
+def student_report_flowables(data, host_url='http://127.0.0.1:5000/', profile='default'):
+    """Flowables of one student report; the page decorations come from draw_watermark_and_header"""
+    settings = report_profile(profile)
+    theme = get_theme('student')
+    styles = theme.styles
+    elements = []
     
     # ===== HEADER SECTION (Refined UI & Fix QR) =====
     
-    # 1. Student Photo Handling
-    photo_path = os.path.join('static', 'student_photos', f'{student.umis}.jpg')
-    if not os.path.exists(photo_path):
-        photo_path = os.path.join('static', 'student_photos', f'{student.umis}.png')
-         
-    if os.path.exists(photo_path):
-        # Resize maintaining aspect ratio? ReportLab Image simply stretches to w/h
-        student_photo = Image(photo_path, 1.1*inch, 1.1*inch)
-    else:
-        student_photo = Paragraph("<br/><br/><b>NO PHOTO</b>", ParagraphStyle('NoPhoto', parent=styles['Normal'], alignment=TA_CENTER, fontSize=8))
+    # 1. Student Photo Handling (pre-sized thumbnail, see utils.photo_cache)
+    # The span covers finding or resizing the thumbnail; decoding and embedding it happen in doc.build (report.layout)
+    with metrics.span('report.photo_lookup', kind='student'):
+        photo_path = get_photo_thumbnail(data['umis'], settings['photo_dpi'], settings['photo_quality'])
+             
+        if photo_path:
+            # ReportLab Image simply stretches to w/h; the thumbnail is already square
+            student_photo = Image(photo_path, 1.1*inch, 1.1*inch)
+        else:
+            student_photo = theme.no_photo()
 
-    # 2. QR Code Generation (Linked to Verification URL)
-    verify_url = f"{host_url}verify/{student.umis}"
-    qr_code = qr.QrCodeWidget(verify_url)
-    qr_code.barWidth = 1.5
-    qr_code.barHeight = 1.5
-    qr_code.qrVersion = 2 
-    # Ensure it's scannable
-    
-    d_qr = Drawing(60, 60) 
-    d_qr.add(qr_code)
+    # 2. QR Code (Linked to the signed Verification URL), encoded once per student and cached
+    with metrics.span('report.qr', kind='student'):
+        d_qr = get_qr_drawing(host_url, data['umis'], token=data.get('verification_token'))
+        if settings['qr_path']:
+            d_qr = QrPath(d_qr)
     
     # 3. Header Layout Table: [Photo | College Details | QR Code]
     # We use a white background for Photo and QR slots so they pop out, 
@@ -157,111 +392,49 @@ def generate_student_report_pdf(student, output_dir='static/reports', host_url='
     header_content = [
         [
             student_photo,
-            [
-                Paragraph('<b>SETHUPATHY GOVERNMENT ARTS COLLEGE</b>', ParagraphStyle('H_Title', parent=college_name_style, textColor=colors.white)),
-                Paragraph('<i>(Autonomous) | Affiliated to Madurai Kamaraj University</i><br/>Ramanathapuram - 623 501, Tamil Nadu', ParagraphStyle('H_Sub', parent=college_subtitle_style, textColor=colors.HexColor('#e0e0e0')))
-            ],
+            theme.college_heading(),
             d_qr
         ]
     ]
     
     header_table = Table(header_content, colWidths=[1.3*inch, 4.0*inch, 1.3*inch])
-    header_table.setStyle(TableStyle([
-        # Center Column (Text): Deep Blue
-        ('BACKGROUND', (1, 0), (1, 0), COLLEGE_PRIMARY),
-        
-        # Side Columns (Photo & QR): White for contrast
-        ('BACKGROUND', (0, 0), (0, 0), colors.white),
-        ('BACKGROUND', (2, 0), (2, 0), colors.white),
-        
-        # Alignment
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'), # All content centered horizontally in cells
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        
-        # Padding
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        
-        # Borders: Box around the whole thing?
-        ('BOX', (0, 0), (-1, -1), 2, COLLEGE_PRIMARY),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey), # Inner grid
-    ]))
+    header_table.setStyle(theme.header_table_style)
     elements.append(header_table)
     
     # Decorative line
-    line_data = [['']]
-    line_table = Table(line_data, colWidths=[6.5*inch])
-    line_table.setStyle(TableStyle([
-        ('LINEABOVE', (0, 0), (-1, 0), 3, COLLEGE_ACCENT),
-        ('LINEBELOW', (0, 0), (-1, 0), 1, COLLEGE_SECONDARY),
-    ]))
-    elements.append(line_table)
+    elements.append(theme.line_table())
     elements.append(Spacer(1, 0.15*inch))
     
     # Report title banner
-    report_title_data = [[
-        Paragraph('STUDENT ACADEMIC REPORT', report_title_style)
-    ]]
-    
-    report_title_table = Table(report_title_data, colWidths=[6.5*inch])
-    report_title_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), COLLEGE_SECONDARY),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ('ROUNDEDCORNERS', [5, 5, 5, 5]),
-    ]))
-    elements.append(report_title_table)
+    elements.append(theme.report_title_table())
     elements.append(Spacer(1, 0.25*inch))
     
     # Student Information Section
-    section_header = Paragraph("📋 STUDENT INFORMATION", heading_style)
-    elements.append(section_header)
+    elements.append(theme.heading("📋 STUDENT INFORMATION"))
     
     student_data = [
-        ['UMIS Number:', student.umis],
-        ['Full Name:', student.name],
-        ['Email Address:', student.email or 'Not Provided'],
-        ['Phone Number:', student.phone or 'Not Provided'],
-        ['Department:', student.department.name if student.department else 'Not Assigned'],
-        ['Current Year:', f'Year {student.current_year}' if student.current_year else 'Not Specified'],
-        ['Parent/Guardian Contact:', student.parents_num or 'Not Provided']
+        ['UMIS Number:', data['umis']],
+        ['Full Name:', data['name']],
+        ['Email Address:', data['email'] or 'Not Provided'],
+        ['Phone Number:', data['phone'] or 'Not Provided'],
+        ['Department:', data['department'] or 'Not Assigned'],
+        ['Current Year:', f"Year {data['current_year']}" if data['current_year'] else 'Not Specified'],
+        ['Parent/Guardian Contact:', data['parents_num'] or 'Not Provided']
     ]
     
     student_table = Table(student_data, colWidths=[2.2*inch, 4.3*inch])
-    student_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), COLLEGE_LIGHT),
-        ('BACKGROUND', (1, 0), (1, -1), colors.white),
-        ('TEXTCOLOR', (0, 0), (0, -1), COLLEGE_PRIMARY),
-        ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('LEFTPADDING', (0, 0), (-1, -1), 12),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#b0bec5')),
-        ('BOX', (0, 0), (-1, -1), 2, COLLEGE_SECONDARY),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
+    student_table.setStyle(theme.student_table_style)
     elements.append(student_table)
     elements.append(Spacer(1, 0.35*inch))
     
     # Attendance Summary & Visual Charts
-    from models import Attendance
-    attendance_records = Attendance.query.filter_by(student_umis=student.umis).order_by(Attendance.date.desc()).all()
+    attendance = data['attendance']
     
-    total_days = len(attendance_records)
-    present_count = sum(1 for a in attendance_records if a.status == 'Present')
-    absent_count = sum(1 for a in attendance_records if a.status == 'Absent')
-    leave_count = sum(1 for a in attendance_records if a.status == 'Leave')
-    attendance_pct = (present_count / total_days * 100) if total_days > 0 else 0
+    total_days = attendance['total']
+    present_count = attendance['present']
+    absent_count = attendance['absent']
+    leave_count = attendance['leave']
+    attendance_pct = attendance['percentage']
     
     # Determine attendance status color
     if attendance_pct >= 75:
@@ -274,10 +447,14 @@ def generate_student_report_pdf(student, output_dir='static/reports', host_url='
         pct_color = COLLEGE_DANGER
         status_text = "Needs Improvement"
     
-    elements.append(Paragraph("📊 ATTENDANCE SUMMARY & TRENDS", heading_style))
+    elements.append(theme.heading("📊 ATTENDANCE SUMMARY & TRENDS"))
     
     # --- Pie Chart Drawing ---
     if total_days > 0:
+        # reportlab.graphics.charts is large; load it on first chart, not at import
+        from reportlab.graphics.charts.piecharts import Pie
+        from reportlab.graphics.shapes import Drawing
+
         d_pie = Drawing(200, 100)
         pc = Pie()
         pc.x = 50
@@ -295,7 +472,7 @@ def generate_student_report_pdf(student, output_dir='static/reports', host_url='
         
         d_pie.add(pc)
     else:
-        d_pie = Paragraph("(No data for visual chart)", styles['Normal'])
+        d_pie = theme.no_chart()
 
     # Attendance statistics table
     summary_data = [
@@ -311,27 +488,7 @@ def generate_student_report_pdf(student, output_dir='static/reports', host_url='
     ]
     
     summary_table = Table(summary_data, colWidths=[1.05*inch]*6)
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), COLLEGE_PRIMARY),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('BACKGROUND', (0, 1), (0, 1), colors.HexColor('#e3f2fd')),
-        ('BACKGROUND', (1, 1), (1, 1), colors.HexColor('#e8f5e9')),
-        ('BACKGROUND', (2, 1), (2, 1), colors.HexColor('#ffebee')),
-        ('BACKGROUND', (3, 1), (3, 1), colors.HexColor('#fff3e0')),
-        ('BACKGROUND', (4, 1), (4, 1), pct_color),
-        ('BACKGROUND', (5, 1), (5, 1), pct_color),
-        ('TEXTCOLOR', (0, 1), (3, 1), colors.black),
-        ('TEXTCOLOR', (4, 1), (5, 1), colors.white),
-        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1.5, colors.white),
-        ('BOX', (0, 0), (-1, -1), 2, COLLEGE_SECONDARY),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-    ]))
+    summary_table.setStyle(theme.summary_table_style(pct_color))
 
     # Arrange Table and Chart side by side (roughly)
     # We can just append them sequentially for simplicity in layout, or use a Table to hold them
@@ -340,192 +497,204 @@ def generate_student_report_pdf(student, output_dir='static/reports', host_url='
     
     if total_days > 0:
         # Chart legend/container
-        chart_table = Table([[d_pie, Paragraph("<b>Visual Representation</b><br/>Attendance Distribution", styles['Normal'])]], colWidths=[3*inch, 3*inch])
-        chart_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
+        chart_table = Table([[d_pie, theme.chart_caption()]], colWidths=[3*inch, 3*inch])
+        chart_table.setStyle(theme.chart_table_style)
         elements.append(chart_table)
 
     elements.append(Spacer(1, 0.35*inch))
     
     # ===== ACADEMIC SUBJECTS & MARKS SECTION =====
-    elements.append(Paragraph("📚 ACADEMIC SUBJECTS & PERFORMANCE", heading_style))
-    
-    from models import Subject
-    # Fetch subjects (Mocking semester logic if not explicit)
-    enrolled_subjects = []
-    if student.department_id and student.current_year:
-        # Assuming student takes all subjects for their year
-        enrolled_subjects = Subject.query.filter_by(
-            department_id=student.department_id, 
-            year=student.current_year
-        ).all()
+    elements.append(theme.heading("📚 ACADEMIC SUBJECTS & PERFORMANCE"))
+    
+    # Grades computed for the whole cohort by utils.grading (see utils.report_data)
+    academics = data.get('academics')
+    if academics:
+        graded_subjects = academics['subjects']
+    else:
+        # Record built without grades: list the enrolled subjects as awaiting marks
+        graded_subjects = [(code, name, None, None, None, None, None, False) for code, name in data['subjects']]
         
-    if enrolled_subjects:
+    if graded_subjects:
         # Table Header
-        acad_data = [['Subject Code', 'Subject Name', 'Credits', 'Grade', 'Remarks']]
+        acad_data = [['Subject Code', 'Subject Name', 'Credits', 'Marks', 'Grade', 'Remarks']]
         
-        # Populate with subjects and MOCK grades
-        total_credits = 0
-        total_points = 0
-        
-        grades = ['O', 'D+', 'D', 'A+', 'A', 'B', 'U'] # Outstanding to Unsatisfactory
-        
-        for subj in enrolled_subjects:
-            # Mock Data Generation
-            mock_credits = random.choice([3, 4])
-            mock_grade = random.choice(grades)
-            remarks = "Completed" if mock_grade != 'U' else "Re-appear"
+        for subj_code, subj_name, credits, marks, max_marks, grade, points, reappear in graded_subjects:
+            if grade is None:
+                marks_text, grade, remarks = '-', '-', "Awaiting Marks"
+            else:
+                marks_text = f"{marks:g}/{max_marks:g}"
+                remarks = "Re-appear" if reappear else "Completed"
             
             acad_data.append([
-                subj.code,
-                subj.name,
-                str(mock_credits),
-                mock_grade,
+                subj_code,
+                subj_name,
+                f"{credits:g}" if credits is not None else '-',
+                marks_text,
+                grade,
                 remarks
             ])
             
-        acad_table = Table(acad_data, colWidths=[1.2*inch, 2.8*inch, 0.8*inch, 0.8*inch, 1.2*inch])
-        acad_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), COLLEGE_SECONDARY),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('ALIGN', (1, 0), (1, -1), 'LEFT'), # Subject Name Left Aligned
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#eeeeee')),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-            ('BOX', (0, 0), (-1, -1), 1, COLLEGE_SECONDARY),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        acad_table = Table(acad_data, colWidths=[1.1*inch, 2.4*inch, 0.7*inch, 0.9*inch, 0.7*inch, 1.0*inch])
+        acad_table.setStyle(theme.acad_table_style)
         elements.append(acad_table)
+        
+        if academics:
+            # Credit-weighted averages
+            sgpa = f"{academics['sgpa']:.2f}" if academics['sgpa'] is not None else '-'
+            cgpa = f"{academics['cgpa']:.2f}" if academics['cgpa'] is not None else '-'
+            elements.append(Spacer(1, 0.1*inch))
+            elements.append(Paragraph(
+                f"<b>SGPA:</b> {sgpa} &nbsp;|&nbsp; <b>CGPA:</b> {cgpa} &nbsp;|&nbsp; "
+                f"<b>Credits Earned:</b> {academics['credits_earned']:g} / {academics['credits_attempted']:g} &nbsp;|&nbsp; "
+                f"<b>Re-appear:</b> {academics['reappear_count']}",
+                theme.gpa_style
+            ))
     else:
-        elements.append(Paragraph("No subject enrollment records found for this academic year.", styles['Italic']))
+        elements.append(theme.no_subjects())
 
     elements.append(Spacer(1, 0.35*inch))
 
     # Day-by-Day Attendance Records (Simplified for brevity if we have charts, but keeping as requested)
-    if attendance_records:
-        elements.append(Paragraph("📅 DETAILED ATTENDANCE LOG", heading_style))
+    records_to_show = data['attendance_log'] # reduced count to fit new sections
+    if records_to_show:
+        elements.append(theme.heading("📅 DETAILED ATTENDANCE LOG"))
         
-        records_to_show = attendance_records[:20] # reduced count to fit new sections
         attendance_data = [['S.No', 'Date', 'Day', 'Status']]
         
-        for idx, record in enumerate(records_to_show, 1):
-            date_str = record.date.strftime('%d-%b-%Y')
-            day_str = record.date.strftime('%A')
-            attendance_data.append([str(idx), date_str, day_str, record.status])
+        for idx, (record_date, record_status) in enumerate(records_to_show, 1):
+            date_str = record_date.strftime('%d-%b-%Y')
+            day_str = record_date.strftime('%A')
+            attendance_data.append([str(idx), date_str, day_str, record_status])
         
         attendance_table = Table(attendance_data, colWidths=[0.6*inch, 1.8*inch, 1.6*inch, 1.5*inch])
         
         # Build style list dynamically
-        table_style = [
-            ('BACKGROUND', (0, 0), (-1, 0), COLLEGE_PRIMARY),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#b0bec5')),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
-            ('BOX', (0, 0), (-1, -1), 2, COLLEGE_SECONDARY),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ]
+        table_style = list(theme.attendance_table_commands)
         
-        for idx, record in enumerate(records_to_show, 1):
-            if record.status == 'Present':
-                table_style.append(('TEXTCOLOR', (3, idx), (3, idx), COLLEGE_SUCCESS))
-            elif record.status == 'Absent':
-                table_style.append(('TEXTCOLOR', (3, idx), (3, idx), COLLEGE_DANGER))
-            elif record.status == 'Leave':
-                table_style.append(('TEXTCOLOR', (3, idx), (3, idx), COLLEGE_WARNING))
+        for idx, (_, record_status) in enumerate(records_to_show, 1):
+            status_color = theme.attendance_status_colors.get(record_status)
+            if status_color is not None:
+                table_style.append(('TEXTCOLOR', (3, idx), (3, idx), status_color))
         
         attendance_table.setStyle(TableStyle(table_style))
         elements.append(attendance_table)
         
-        if len(attendance_records) > 20:
-            elements.append(Paragraph(f"...and {len(attendance_records)-20} more records available online.", styles['Italic']))
+        if total_days > len(records_to_show):
+            elements.append(Paragraph(f"...and {total_days-len(records_to_show)} more records available online.", styles['Italic']))
     
     # Footer Section
     elements.append(Spacer(1, 0.5*inch))
     
     # Decorative line before footer
-    footer_line_data = [['']]
-    footer_line_table = Table(footer_line_data, colWidths=[6.5*inch])
-    footer_line_table.setStyle(TableStyle([
-        ('LINEABOVE', (0, 0), (-1, 0), 2, COLLEGE_ACCENT),
-    ]))
-    elements.append(footer_line_table)
+    elements.append(theme.footer_line_table())
     elements.append(Spacer(1, 0.15*inch))
     
     # Footer text with disclaimer
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.HexColor('#546e7a'),
-        alignment=TA_CENTER,
-        leading=10
-    )
-    
+    verification_id = f"{data['umis']}-{data['verification_token']}" if data.get('verification_token') else data['umis']
     footer_text = f"""
-    <b>Report Generated:</b> {datetime.now().strftime('%d %B %Y at %I:%M %p')} | <b>Verification ID:</b> {student.umis}-{random.randint(1000,9999)}<br/>
+    <b>Report Generated:</b> {datetime.now().strftime('%d %B %Y at %I:%M %p')} | <b>Verification ID:</b> {verification_id}<br/>
     <b>Sethupathy Government Arts College</b> (Autonomous) | Ramanathapuram<br/>
     <i>Scan the QR Code to verify authenticity online. | Student Management System v2.0</i><br/>
     This is a computer-generated document and does not require a signature.
     """
-    footer = Paragraph(footer_text, footer_style)
+    footer = Paragraph(footer_text, theme.footer_style)
     elements.append(footer)
     
-    # Build PDF with Watermark and Header callbacks
-    doc.build(elements, onFirstPage=draw_watermark_and_header, onLaterPages=draw_watermark_and_header)
-    
-    return filepath
+    return elements
 
 
 def generate_batch_report_pdf(students_data, output_path='static/reports/batch_report.pdf', 
-                              report_title=None, hod_sign=True, principal_sign=False):
+                              report_title=None, hod_sign=True, principal_sign=False, fast_table=None, scale=None):
     """
     Generate a PDF report for multiple students with college header.
     students_data: list of dicts with student info, attendance %, and marks.
     report_title: Custom title for the report (optional).
     hod_sign: Include HOD signature block.
     principal_sign: Include Principal signature block.
+    fast_table: Draw the student table with FastTable (default: from
+                FAST_TABLE_MIN_ROWS students up).
+    scale: GradeScale for the marks column (default: the app's, see
+           utils.grading.get_grade_scale).
     """
-    from reportlab.lib.pagesizes import A4, landscape
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-    import os
-    
     # Ensure directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    doc = SimpleDocTemplate(output_path, pagesize=landscape(A4), rightMargin=30, leftMargin=30, topMargin=40, bottomMargin=30)
+    render_batch_report(students_data, output_path, report_title, hod_sign, principal_sign, fast_table=fast_table,
+                        scale=scale)
+    return output_path
+
+def batch_report_bytes(students_data, report_title=None, hod_sign=True, principal_sign=False, fast_table=None,
+                       scale=None):
+    """In-memory variant of generate_batch_report_pdf returning the PDF bytes"""
+    buffer = BytesIO()
+    render_batch_report(students_data, buffer, report_title, hod_sign, principal_sign, fast_table=fast_table,
+                        scale=scale)
+    return buffer.getvalue()
+
+def iter_batch_report(students_data, report_title=None, hod_sign=True, principal_sign=False,
+                      chunk_size=PDF_CHUNK_SIZE, fast_table=None, scale=None):
+    """In-memory variant of generate_batch_report_pdf returning an iterator of byte chunks"""
+    buffer = BytesIO()
+    render_batch_report(students_data, buffer, report_title, hod_sign, principal_sign, fast_table=fast_table,
+                        scale=scale)
+    return iter_pdf_chunks(buffer, chunk_size)
+
+def render_batch_report(students_data, output, report_title=None, hod_sign=True, principal_sign=False, progress=None,
+                        fast_table=None, scale=None):
+    """
+    Build the batch report PDF into output (a path or a writable binary
+    file object). progress: optional progress(rows, pages) callback, see
+    BatchDocTemplate. fast_table, scale: see generate_batch_report_pdf.
+    """
+    doc = BatchDocTemplate(output, progress=progress, pagesize=landscape(A4), rightMargin=30, leftMargin=30,
+                           topMargin=40, bottomMargin=30)
+    with metrics.span('report.flowables', kind='batch'):
+        elements = batch_report_flowables(students_data, report_title, hod_sign, principal_sign, fast_table, scale)
+    
+    with metrics.span('report.layout', kind='batch'):
+        # Binary streams: a quarter smaller, and ASCII85 is a tenth of a large build
+        doc.build(elements, onFirstPage=draw_watermark_and_header, onLaterPages=draw_watermark_and_header,
+                  canvasmaker=BinaryStreamCanvas)
+    record_report_metrics(doc, output, 'batch')
+    return output
+
+def batch_report_flowables(students_data, report_title=None, hod_sign=True, principal_sign=False, fast_table=None,
+                           scale=None):
+    """Flowables of the batch report (header, student table, signatures, footer)"""
+    theme = get_theme('batch')
     elements = []
-    styles = getSampleStyleSheet()
     
     # --- HEADER ---
-    header_style = ParagraphStyle('Header', parent=styles['Heading1'], fontSize=16, textColor=COLLEGE_PRIMARY, alignment=TA_CENTER, spaceAfter=4)
-    sub_header_style = ParagraphStyle('SubHeader', parent=styles['Normal'], fontSize=10, textColor=colors.HexColor('#555555'), alignment=TA_CENTER, spaceAfter=15)
-    
-    elements.append(Paragraph("<b>SETHUPATHY GOVERNMENT ARTS COLLEGE</b>", header_style))
-    elements.append(Paragraph("Ramanathapuram - 623501 | (Autonomous)", sub_header_style))
+    elements.extend(theme.college_header())
     elements.append(Spacer(1, 0.2*inch))
     
     # Custom or default title
     title_text = report_title if report_title else "STUDENT BATCH REPORT"
-    elements.append(Paragraph(f"<b>{title_text.upper()}</b>", ParagraphStyle('Title', parent=styles['Heading2'], alignment=TA_CENTER, textColor=COLLEGE_SECONDARY)))
+    elements.append(Paragraph(f"<b>{title_text.upper()}</b>", theme.title_style))
     elements.append(Spacer(1, 0.3*inch))
     
     # --- TABLE ---
-    table_data = [['S.No', 'Roll No', 'Name', 'Email', 'Department', 'Year', 'Attendance %', 'Marks Summary']]
+    header = ['S.No', 'Roll No', 'Name', 'Email', 'Department', 'Year', 'Attendance %', 'Marks Summary']
+    rows = []
+    
+    # Grade every student's marks in one vectorized pass (NumPy loads with the first batch report)
+    from utils.grading import get_grade_scale, grade_mark_lists
+    mark_lists = [s.get('marks') or [] for s in students_data]
+    grades, subject_names = grade_mark_lists(mark_lists, scale or get_grade_scale())
+    letters = grades.letters()
+    gpas = grades.gpa()
+    columns = {name: j for j, name in enumerate(subject_names)}
     
     for idx, s in enumerate(students_data, 1):
-        marks_str = ', '.join([f"{m['subject']}: {m['marks']}" for m in s.get('marks', [])]) or '-'
-        table_data.append([
+        row = idx - 1
+        parts = []
+        for m in mark_lists[row]:
+            col = columns[m['subject']]
+            grade = f" ({letters[row, col]})" if grades.graded[row, col] else ''
+            parts.append(f"{m['subject']}: {m['marks']}{grade}")
+        marks_str = ', '.join(parts) or '-'
+        if parts and not math.isnan(gpas[row]):
+            marks_str = f"GPA {gpas[row]:.2f} | {marks_str}"
+        rows.append([
             str(idx),
             s.get('roll_number', 'N/A'),
             s.get('name', ''),
@@ -538,53 +707,26 @@ def generate_batch_report_pdf(students_data, output_path='static/reports/batch_r
     
     col_widths = [0.4*inch, 0.9*inch, 1.8*inch, 2.2*inch, 1.5*inch, 0.5*inch, 0.9*inch, 2.5*inch]
     
-    batch_table = Table(table_data, colWidths=col_widths, repeatRows=1)
-    batch_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), COLLEGE_PRIMARY),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (2, 1), (3, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9f9f9')]),
-        ('BOX', (0, 0), (-1, -1), 1.5, COLLEGE_SECONDARY),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(batch_table)
+    if fast_table is None:
+        fast_table = len(rows) >= FAST_TABLE_MIN_ROWS
+    if fast_table:
+        # Fixed-layout rows drawn straight onto each page; same look as the Table
+        elements.append(FastTable(header, rows, col_widths, theme.batch_fast_table_style))
+    else:
+        batch_table = BatchTable([header] + rows, colWidths=col_widths, repeatRows=1)
+        batch_table.setStyle(theme.batch_table_style)
+        elements.append(batch_table)
     
     # --- SIGNATURE BLOCKS ---
     elements.append(Spacer(1, 0.6*inch))
     
-    sign_style_left = ParagraphStyle('SignLeft', parent=styles['Normal'], fontSize=10, alignment=TA_LEFT)
-    sign_style_right = ParagraphStyle('SignRight', parent=styles['Normal'], fontSize=10, alignment=TA_RIGHT)
-    
-    sign_row = []
-    if hod_sign:
-        sign_row.append(Paragraph("<br/><br/>_____________________<br/><b>Head of Department</b>", sign_style_left))
-    else:
-        sign_row.append(Paragraph("", sign_style_left))
-        
-    if principal_sign:
-        sign_row.append(Paragraph("<br/><br/>_____________________<br/><b>Principal</b>", sign_style_right))
-    else:
-        sign_row.append(Paragraph("", sign_style_right))
-    
     if hod_sign or principal_sign:
-        sign_table = Table([sign_row], colWidths=[5*inch, 5*inch])
-        sign_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
+        sign_table = Table([theme.sign_row(hod_sign, principal_sign)], colWidths=[5*inch, 5*inch])
+        sign_table.setStyle(theme.sign_table_style)
         elements.append(sign_table)
     
     # --- FOOTER ---
     elements.append(Spacer(1, 0.4*inch))
-    footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, textColor=colors.gray, alignment=TA_CENTER)
-    elements.append(Paragraph(f"Generated on {datetime.now().strftime('%d %B %Y at %I:%M %p')} | Student Management System", footer_style))
+    elements.append(Paragraph(f"Generated on {datetime.now().strftime('%d %B %Y at %I:%M %p')} | Student Management System", theme.footer_style))
     
-    doc.build(elements)
-    return output_path
-
+    return elements
@@ -0,0 +1,220 @@
+"""
+Student photo thumbnail pipeline.
+
+Reports print the photo at 1.1 inch, so embedding a full-resolution phone
+picture only slows the build and bloats the PDF. Photos are re-encoded
+once into right-sized JPEG thumbnails under static/photo_thumbs and
+rebuilt when the source file's mtime changes. An in-memory index of
+which UMIS numbers have photos replaces per-report os.path.exists probes.
+
+Bulk pre-processing of the whole photo folder:
+
+    python -m utils.photo_cache [--dpi 150] [--workers 4]
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+PHOTO_DIR = os.path.join('static', 'student_photos')
+THUMB_DIR = os.path.join('static', 'photo_thumbs')
+PHOTO_EXTENSIONS = ('jpg', 'png')  # in order of preference
+
+# Printed size on the report and default thumbnail resolution
+PHOTO_SIZE_INCHES = 1.1
+THUMB_DPI = 150
+THUMB_QUALITY = 85
+
+# Re-check the photo folder for added/removed files at most this often (seconds)
+INDEX_REFRESH_INTERVAL = 2.0
+
+
+class PhotoIndex:
+    """{umis: (path, mtime)} for a photo folder, refreshed when the folder changes"""
+
+    def __init__(self, photo_dir=PHOTO_DIR):
+        self.photo_dir = photo_dir
+        self._photos = {}
+        self._dir_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        photos = {}
+        rank = {ext: idx for idx, ext in enumerate(PHOTO_EXTENSIONS)}
+        best = {}
+        try:
+            entries = list(os.scandir(self.photo_dir))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            umis, dot, ext = entry.name.rpartition('.')
+            ext = ext.lower()
+            if not dot or ext not in rank or not entry.is_file():
+                continue
+            if umis not in best or rank[ext] < best[umis]:
+                best[umis] = rank[ext]
+                photos[umis] = (entry.path, entry.stat().st_mtime)
+        return photos
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._checked_at < INDEX_REFRESH_INTERVAL:
+                return
+            self._checked_at = now
+            try:
+                dir_mtime = os.stat(self.photo_dir).st_mtime
+            except FileNotFoundError:
+                dir_mtime = None
+            if force or dir_mtime != self._dir_mtime:
+                self._photos = self._scan()
+                self._dir_mtime = dir_mtime
+
+    def lookup(self, umis):
+        """(path, mtime) of the student's photo, or None"""
+        self.refresh()
+        found = self._photos.get(umis)
+        if found is None:
+            return None
+        path, mtime = found
+        # A photo replaced in place does not touch the folder mtime
+        try:
+            current = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        if current != mtime:
+            found = self._photos[umis] = (path, current)
+        return found
+
+    def all(self):
+        self.refresh(force=True)
+        return dict(self._photos)
+
+
+_indexes = {}
+
+
+def get_photo_index(photo_dir=PHOTO_DIR):
+    index = _indexes.get(photo_dir)
+    if index is None:
+        index = _indexes[photo_dir] = PhotoIndex(photo_dir)
+    return index
+
+
+def find_student_photo(umis, photo_dir=PHOTO_DIR):
+    """(path, mtime) of the original photo, or None"""
+    return get_photo_index(photo_dir).lookup(umis)
+
+
+def thumbnail_path(umis, dpi=THUMB_DPI, thumb_dir=THUMB_DIR, quality=THUMB_QUALITY):
+    # Non-default qualities (e.g. the compact report profile) get their own file
+    suffix = '' if quality == THUMB_QUALITY else f'q{quality}'
+    return os.path.join(thumb_dir, f'{umis}_{dpi}{suffix}.jpg')
+
+
+def make_thumbnail(source_path, dest_path, dpi=THUMB_DPI, quality=THUMB_QUALITY):
+    """Resize a photo to PHOTO_SIZE_INCHES square at dpi and save it as JPEG"""
+    from PIL import Image as PILImage, ImageOps
+
+    pixels = int(round(PHOTO_SIZE_INCHES * dpi))
+    with PILImage.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Flatten transparency onto white, as it appears on the page
+            img = img.convert('RGBA')
+            background = PILImage.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        # The report stretches the photo into a square box, so do the same here
+        img = img.resize((pixels, pixels), PILImage.LANCZOS)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = f'{dest_path}.{os.getpid()}.tmp'
+        img.save(tmp_path, 'JPEG', quality=quality, optimize=True)
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+def get_photo_thumbnail(umis, dpi=THUMB_DPI, quality=THUMB_QUALITY, photo_dir=PHOTO_DIR, thumb_dir=THUMB_DIR):
+    """
+    Path of a report-sized thumbnail of the student's photo, building it
+    if missing or older than the source. Returns None if the student has
+    no photo, or the original photo if Pillow cannot process it.
+    """
+    found = find_student_photo(umis, photo_dir)
+    if found is None:
+        return None
+    source_path, source_mtime = found
+    thumb = thumbnail_path(umis, dpi, thumb_dir, quality)
+    try:
+        if os.stat(thumb).st_mtime >= source_mtime:
+            return thumb
+    except FileNotFoundError:
+        pass
+    try:
+        return make_thumbnail(source_path, thumb, dpi, quality)
+    except Exception as e:
+        print(f"Photo thumbnail error for {umis}: {e}")
+        return source_path
+
+
+def _process_one(job):
+    umis, source_path, thumb, dpi, quality = job
+    try:
+        make_thumbnail(source_path, thumb, dpi, quality)
+        return umis, None
+    except Exception as e:
+        return umis, str(e)
+
+
+def preprocess_all_photos(photo_dir=PHOTO_DIR, thumb_dir=THUMB_DIR, dpi=THUMB_DPI,
+                          quality=THUMB_QUALITY, workers=None, force=False):
+    """
+    Build thumbnails for every photo in photo_dir that lacks an up-to-date one.
+    Returns (built, skipped, errors) where errors is {umis: message}.
+    """
+    jobs = []
+    skipped = 0
+    for umis, (source_path, source_mtime) in get_photo_index(photo_dir).all().items():
+        thumb = thumbnail_path(umis, dpi, thumb_dir, quality)
+        if not force and os.path.exists(thumb) and os.path.getmtime(thumb) >= source_mtime:
+            skipped += 1
+            continue
+        jobs.append((umis, source_path, thumb, dpi, quality))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        results = [_process_one(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_process_one, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+    errors = {umis: error for umis, error in results if error}
+    return len(jobs) - len(errors), skipped, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-build report thumbnails for all student photos')
+    parser.add_argument('--photo-dir', default=PHOTO_DIR)
+    parser.add_argument('--thumb-dir', default=THUMB_DIR)
+    parser.add_argument('--dpi', type=int, default=THUMB_DPI)
+    parser.add_argument('--quality', type=int, default=THUMB_QUALITY)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='rebuild thumbnails that are already up to date')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    built, skipped, errors = preprocess_all_photos(
+        args.photo_dir, args.thumb_dir, args.dpi, args.quality, args.workers, args.force
+    )
+    print(f"Built {built} thumbnails, {skipped} already up to date, {len(errors)} errors "
+          f"in {time.perf_counter() - start:.1f}s")
+    for umis, error in sorted(errors.items()):
+        print(f"  {umis}: {error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Off-peak pre-rendering of student reports.
+
+A night job walks every student in UMIS order and renders the reports
+that are not in the report cache yet. The cache key hashes the whole
+report record (profile, attendance summary and log, marks and grades,
+photo, template version), so a student whose attendance, marks or
+profile changed since their last render is exactly a cache miss, and
+everyone else is skipped after a key computation. Daytime calls to
+generate_student_report_pdf(..., use_cache=True) then find the file.
+
+The run stops at the end of the night window or its time budget,
+whichever comes first (checked between chunks), and renders on a pool
+of low-priority worker processes (the CPU budget). A pass also ends once
+the report cache's file budget is filled (max_reports), since rendering
+more would evict its own output; for cohorts larger than that, raise the
+cache's max_files first (get_report_cache(<output_dir>/cache,
+max_files=...)). After each chunk the
+position is saved to a checkpoint file, so an interrupted run resumes
+at the next student; once a full pass is done the next run starts from
+the beginning.
+
+    scheduler = APScheduler(); scheduler.init_app(app); scheduler.start()
+    schedule_prerender(scheduler, window=('22:00', '05:30'),
+                       host_url='https://portal.example.edu/')
+
+host_url must be the one the report routes use, or the keys differ.
+"""
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from utils import metrics
+
+DEFAULT_WINDOW = ('22:00', '05:30')
+DEFAULT_CHUNK_SIZE = 200
+CHECKPOINT_NAME = 'prerender_checkpoint.json'
+JOB_ID = 'prerender_reports'
+
+
+# ===== Night window =====
+
+def _parse_time(text):
+    hours, minutes = text.split(':')
+    return int(hours), int(minutes)
+
+
+def window_bounds(window=DEFAULT_WINDOW, now=None):
+    """
+    (start, end) datetimes of the window that contains now, or of the next
+    one if now is outside it. Windows may wrap past midnight.
+    """
+    now = now or datetime.now()
+    (start_h, start_m), (end_h, end_m) = _parse_time(window[0]), _parse_time(window[1])
+    start = now.replace(hour=start_h, minute=start_m, second=0, microsecond=0)
+    end = now.replace(hour=end_h, minute=end_m, second=0, microsecond=0)
+    if end <= start:
+        # e.g. 22:00-05:30: either in the tail of yesterday's window or before tonight's
+        if now < end:
+            start -= timedelta(days=1)
+        else:
+            end += timedelta(days=1)
+    elif now >= end:
+        start += timedelta(days=1)
+        end += timedelta(days=1)
+    return start, end
+
+
+def in_window(window=DEFAULT_WINDOW, now=None):
+    now = now or datetime.now()
+    start, end = window_bounds(window, now)
+    return start <= now < end
+
+
+# ===== Checkpoint =====
+
+def checkpoint_path(output_dir='static/reports'):
+    return os.path.join(output_dir, 'cache', CHECKPOINT_NAME)
+
+
+def load_checkpoint(output_dir='static/reports'):
+    """Saved position of the current pass ({} when starting fresh)"""
+    try:
+        with open(checkpoint_path(output_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_checkpoint(output_dir, state):
+    path = checkpoint_path(output_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+# ===== Run =====
+
+def lower_process_priority():
+    """Pool initializer: run renders below normal priority (also used by utils.export_jobs)"""
+    try:
+        import psutil
+    except ImportError:
+        if hasattr(os, 'nice'):
+            os.nice(10)
+        return
+    process = psutil.Process()
+    if hasattr(psutil, 'BELOW_NORMAL_PRIORITY_CLASS'):
+        process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)  # Windows
+    else:
+        process.nice(10)
+
+
+def _next_students(after_umis, limit):
+    from models import Student
+    query = Student.query
+    if after_umis:
+        query = query.filter(Student.umis > after_umis)
+    return query.order_by(Student.umis).limit(limit).all()
+
+
+def run_prerender(output_dir='static/reports', host_url='http://127.0.0.1:5000/', until=None,
+                  max_seconds=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, max_reports=None):
+    """
+    Render the reports that are missing from the cache, resuming from the
+    checkpoint, until the pass is complete, `until` (datetime) passes or
+    max_seconds have elapsed. Runs inside the app context.
+    workers: render processes (default: half the CPUs).
+    max_reports: reports a pass may keep in the cache (default and upper
+                 bound: the cache's max_files).
+    Returns a summary dict of this run.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from utils.batch_reports import generate_department_reports
+    from utils.report_cache import get_report_cache
+
+    started = time.monotonic()
+    deadline = started + max_seconds if max_seconds else None
+    if until is not None:
+        remaining = (until - datetime.now()).total_seconds()
+        deadline = min(deadline, started + remaining) if deadline else started + remaining
+    workers = workers or max(1, (os.cpu_count() or 2) // 2)
+
+    state = load_checkpoint(output_dir)
+    if not state.get('last_umis'):
+        state = {'pass_started': datetime.now().isoformat(timespec='seconds'), 'last_umis': None,
+                 'rendered': 0, 'cached': 0, 'errors': 0}
+    run = {'rendered': 0, 'cached': 0, 'errors': 0, 'complete': False, 'stopped': None}
+
+    cache = get_report_cache(os.path.join(output_dir, 'cache'))
+    # Past the cache's file budget the pass would evict its own output
+    max_reports = min(max_reports or cache.max_files, cache.max_files)
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=lower_process_priority) if workers > 1 else None
+    try:
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                run['stopped'] = 'budget'
+                break
+            room = max_reports - state['rendered'] - state['cached']
+            if room <= 0:
+                run['complete'] = True
+                run['stopped'] = 'cache_budget'
+                break
+            students = _next_students(state['last_umis'], min(chunk_size, room))
+            if not students:
+                run['complete'] = True
+                break
+            with metrics.span('prerender.chunk'):
+                results = generate_department_reports(students, output_dir=output_dir, host_url=host_url,
+                                                      workers=workers, executor=pool)
+            for result in results:
+                outcome = 'errors' if result['error'] else 'cached' if result['cached'] else 'rendered'
+                run[outcome] += 1
+                state[outcome] += 1
+                metrics.incr('prerender_reports', result=outcome)
+            state['last_umis'] = students[-1].umis
+            state['updated_at'] = datetime.now().isoformat(timespec='seconds')
+            _save_checkpoint(output_dir, state)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if run['complete']:
+        # Next run starts a new pass from the first student
+        _save_checkpoint(output_dir, {'last_umis': None, 'last_pass': dict(
+            state, completed_at=datetime.now().isoformat(timespec='seconds'))})
+    run['seconds'] = time.monotonic() - started
+    return run
+
+
+# ===== Scheduling =====
+
+def _scheduled_run(app, window, options):
+    if not in_window(window):
+        return None
+    with app.app_context():
+        _, end = window_bounds(window)
+        return run_prerender(until=end, **options)
+
+
+def schedule_prerender(scheduler, app=None, window=DEFAULT_WINDOW, **options):
+    """
+    Add the nightly job to a flask_apscheduler APScheduler: it starts at
+    the window opening and runs run_prerender(**options) until the window
+    closes. If the app starts inside the window, a run starts right away.
+    """
+    app = app or scheduler.app
+    hour, minute = _parse_time(window[0])
+    scheduler.add_job(id=JOB_ID, func=_scheduled_run, args=(app, window, options), trigger='cron',
+                      hour=hour, minute=minute, max_instances=1, coalesce=True, replace_existing=True,
+                      misfire_grace_time=3600)
+    if in_window(window):
+        scheduler.add_job(id=f'{JOB_ID}_now', func=_scheduled_run, args=(app, window, options), trigger='date',
+                          max_instances=1, replace_existing=True)
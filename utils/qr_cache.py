@@ -0,0 +1,145 @@
+"""
+Memoized QR verification codes.
+
+The QR on a student report only depends on the host URL, UMIS and the
+student's verification token (utils.verification), so the encoded symbol
+is built once into a Drawing of plain rectangles and kept in an LRU cache
+keyed by (host_url, umis, token, QR_CACHE_VERSION). Rendering a cached
+Drawing does no QR encoding; prewarm_* fill the cache ahead of time.
+
+The cache lives in each process: prewarming in the web process does not
+help the pool workers of utils.batch_reports, which encode their own.
+"""
+import copy
+import threading
+from collections import OrderedDict
+
+# Bump when the drawing built below changes, so cached drawings are rebuilt
+QR_CACHE_VERSION = 1
+# Smallest QR symbol version (size) to encode; longer URLs get a larger symbol
+QR_SYMBOL_VERSION = 2
+QR_CACHE_SIZE = 4096
+
+
+def verification_url(host_url, umis, token=None):
+    if token:
+        return f"{host_url}verify/{umis}?t={token}"
+    return f"{host_url}verify/{umis}"
+
+
+def build_qr_drawing(host_url, umis, token=None):
+    """Encode the verification QR and freeze it into a 60x60 Drawing"""
+    # Imported here so importing the cache does not load the barcode package
+    from reportlab.graphics.barcode import qr
+    from reportlab.graphics.shapes import Drawing
+
+    # 2. QR Code Generation (Linked to Verification URL)
+    qr_code = qr.QrCodeWidget(verification_url(host_url, umis, token))
+    # barWidth/barHeight are the size of the whole symbol: fill the 60x60 slot so it scans
+    qr_code.barWidth = 60
+    qr_code.barHeight = 60
+    qr_code.qrVersion = QR_SYMBOL_VERSION
+
+    d_qr = Drawing(60, 60)
+    # Keep the encoded shapes rather than the widget so drawing never re-encodes
+    d_qr.add(qr_code.draw())
+    return d_qr
+
+
+class QrCache:
+    """Thread-safe LRU of prebuilt QR Drawings"""
+
+    def __init__(self, max_size=QR_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._drawings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, host_url, umis, version=QR_CACHE_VERSION, token=None):
+        """A copy of the cached Drawing, encoding it on a miss"""
+        key = (host_url, umis, token, version)
+        with self._lock:
+            drawing = self._drawings.get(key)
+            if drawing is not None:
+                self._drawings.move_to_end(key)
+                self.hits += 1
+                return copy.copy(drawing)
+            self.misses += 1
+
+        drawing = build_qr_drawing(host_url, umis, token)
+        self._store(key, drawing)
+        return copy.copy(drawing)
+
+    def _store(self, key, drawing):
+        with self._lock:
+            self._drawings[key] = drawing
+            self._drawings.move_to_end(key)
+            while len(self._drawings) > self.max_size:
+                self._drawings.popitem(last=False)
+                self.evictions += 1
+
+    def prewarm(self, umis_list, host_url, version=QR_CACHE_VERSION, tokens=None):
+        """
+        Encode QR codes for every UMIS not already cached; returns how many
+        were built. tokens: {umis: verification token}.
+        """
+        built = 0
+        tokens = tokens or {}
+        for umis in umis_list:
+            token = tokens.get(umis)
+            key = (host_url, umis, token, version)
+            with self._lock:
+                if key in self._drawings:
+                    continue
+            self._store(key, build_qr_drawing(host_url, umis, token))
+            built += 1
+        return built
+
+    def clear(self):
+        with self._lock:
+            self._drawings.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._drawings),
+                'max_size': self.max_size,
+            }
+
+
+_qr_cache = QrCache()
+
+
+def get_qr_cache():
+    """The process-wide QR cache"""
+    return _qr_cache
+
+
+def get_qr_drawing(host_url, umis, version=QR_CACHE_VERSION, token=None):
+    return _qr_cache.get(host_url, umis, version, token)
+
+
+def prewarm_qr_codes(umis_list, host_url='http://127.0.0.1:5000/', tokens=None):
+    return _qr_cache.prewarm(umis_list, host_url, tokens=tokens)
+
+
+def prewarm_department_qr_codes(department_id, year=None, host_url='http://127.0.0.1:5000/'):
+    """
+    Pre-generate QR codes for a whole department (optionally one year) in
+    this process's cache; at most the cache's max_size are kept.
+    """
+    from models import db, Student
+    query = db.session.query(Student.umis).filter(Student.department_id == department_id)
+    if year:
+        query = query.filter(Student.current_year == year)
+    # Encoding more than fit would only evict the first ones again
+    umis_list = [umis for (umis,) in query.order_by(Student.umis).limit(_qr_cache.max_size)]
+    # Students without a token yet get theirs (and their QR) with their first report
+    from utils.verification import fetch_verification_tokens
+    tokens = {umis: token for umis, (token, _) in fetch_verification_tokens(umis_list).items()}
+    return prewarm_qr_codes(umis_list, host_url, tokens)
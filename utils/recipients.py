@@ -0,0 +1,158 @@
+"""
+Recipient planning for parent broadcasts.
+
+Normalizes and validates a cohort's phone numbers to E.164 in one pass
+(results are memoized), groups reports by unique recipient so siblings
+sharing a parents_num produce one message carrying all their PDFs, and
+prints the plan (unique recipients, invalid numbers, estimated send
+time) before anything is sent.
+"""
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+
+DEFAULT_COUNTRY_CODE = '91'
+
+# Rough per-recipient cost of each transport, in seconds
+SEND_COST_SECONDS = {
+    # sendwhatmsg_instantly wait (25s) + focus wait (5s) + paste wait (3s) + typing/tab handling
+    'desktop': {'text': 18.0, 'pdf': 35.0, 'extra_pdf': 3.0},
+    # one HTTP round trip per document at the default 20 msg/s rate limit
+    'cloud': {'text': 0.05, 'pdf': 0.05, 'extra_pdf': 0.05},
+    'fake': {'text': 0.0, 'pdf': 0.0, 'extra_pdf': 0.0},
+}
+
+_STRIP_CHARS = str.maketrans('', '', ' -().\t/')
+
+
+@lru_cache(maxsize=65536)
+def normalize_phone_number(phone_number, default_country_code=DEFAULT_COUNTRY_CODE):
+    """
+    E.164 form ('+919876543210') of a phone number, or None if it is not
+    a plausible number. Bare 10-digit numbers get the default country
+    code; a leading 0 trunk prefix or 00 international prefix is handled.
+    """
+    if not phone_number:
+        return None
+    number = str(phone_number).strip().translate(_STRIP_CHARS)
+    if number.startswith('00'):
+        number = '+' + number[2:]
+    if number.startswith('+'):
+        digits = number[1:]
+    else:
+        digits = number.lstrip('0') if len(number) == 11 and number.startswith('0') else number
+        if len(digits) == 10:
+            digits = default_country_code + digits
+        elif not (digits.startswith(default_country_code) and len(digits) == len(default_country_code) + 10):
+            return None
+    if not digits.isdigit() or not 8 <= len(digits) <= 15:
+        return None
+    if digits.startswith('91') and (len(digits) != 12 or digits[2] not in '6789'):
+        # Indian mobile numbers: 10 digits starting with 6-9
+        return None
+    return '+' + digits
+
+
+def normalize_phone_numbers(phone_numbers, default_country_code=DEFAULT_COUNTRY_CODE):
+    """{raw: E.164 or None} for a whole cohort"""
+    return {raw: normalize_phone_number(raw, default_country_code) for raw in set(phone_numbers)}
+
+
+def default_message(children):
+    """Message sent with a parent's reports; children is a list of report dicts"""
+    names = ', '.join(child['name'] for child in children)
+    noun = 'reports' if len(children) > 1 else 'report'
+    if not any(child.get('pdf_path') for child in children):
+        return f"Dear Parent, the academic {noun} for {names} is now available. - Sethupathy Government Arts College"
+    return f"Dear Parent, please find attached the academic {noun} for {names}. - Sethupathy Government Arts College"
+
+
+class BroadcastPlan:
+    """Reports grouped by unique recipient, plus the numbers that failed validation"""
+
+    def __init__(self, transport_name='desktop'):
+        self.transport_name = transport_name
+        self.recipients = OrderedDict()  # E.164 number -> [report dicts]
+        self.invalid = []  # report dicts whose number did not validate
+
+    @property
+    def report_count(self):
+        return sum(len(reports) for reports in self.recipients.values())
+
+    def estimated_seconds(self):
+        cost = SEND_COST_SECONDS.get(self.transport_name, SEND_COST_SECONDS['desktop'])
+        total = 0.0
+        for reports in self.recipients.values():
+            pdfs = [r for r in reports if r.get('pdf_path')]
+            if pdfs:
+                total += cost['pdf'] + cost['extra_pdf'] * (len(pdfs) - 1)
+            else:
+                total += cost['text']
+        return total
+
+    def summary(self):
+        seconds = self.estimated_seconds()
+        lines = [
+            f"Broadcast plan ({self.transport_name} transport)",
+            f"  Reports:            {self.report_count + len(self.invalid)}",
+            f"  Unique recipients:  {len(self.recipients)}",
+            f"  Coalesced siblings: {self.report_count - len(self.recipients)}",
+            f"  Invalid numbers:    {len(self.invalid)}",
+            f"  Estimated time:     {int(seconds // 60)}m {int(seconds % 60)}s",
+        ]
+        for report in self.invalid:
+            lines.append(f"    - {report.get('umis', '?')} {report.get('name', '')}: {report.get('parents_num')!r}")
+        return '\n'.join(lines)
+
+    def print_summary(self):
+        print(self.summary())
+
+
+def plan_parent_broadcast(reports, transport_name='desktop', default_country_code=DEFAULT_COUNTRY_CODE):
+    """
+    reports: iterable of dicts with 'umis', 'name', 'parents_num' and
+    optionally 'pdf_path'. Returns a BroadcastPlan.
+    """
+    reports = list(reports)
+    numbers = normalize_phone_numbers((r.get('parents_num') for r in reports), default_country_code)
+    plan = BroadcastPlan(transport_name)
+    for report in reports:
+        number = numbers.get(report.get('parents_num'))
+        if number is None:
+            plan.invalid.append(report)
+        else:
+            plan.recipients.setdefault(number, []).append(report)
+    return plan
+
+
+def send_parent_broadcast(plan, transport=None, queue=None, message_builder=default_message, dry_run=False,
+                          broadcast_id=None):
+    """
+    Print the plan, then send one message per recipient with all of its
+    PDFs, either directly through a transport or via a WhatsAppQueue.
+    Queued jobs get idempotency keys, so submitting the same broadcast again
+    sends nothing twice: per number, the PDF paths, or for text-only
+    messages broadcast_id (default: a hash of the message).
+    Returns [(number, success, message or job id)].
+    """
+    plan.print_summary()
+    if dry_run:
+        return []
+    results = []
+    for number, children in plan.recipients.items():
+        message = message_builder(children)
+        pdf_paths = [child['pdf_path'] for child in children if child.get('pdf_path')]
+        if queue is not None:
+            if pdf_paths:
+                key = 'broadcast:' + number + ':' + '|'.join(sorted(pdf_paths))
+                job_id = queue.enqueue_pdfs(number, message, pdf_paths, idempotency_key=key)
+            else:
+                text_id = broadcast_id or hashlib.sha256(message.encode('utf-8')).hexdigest()
+                key = 'broadcast:' + number + ':text:' + text_id
+                job_id = queue.enqueue_text(number, message, idempotency_key=key)
+            results.append((number, True, job_id))
+        elif pdf_paths:
+            results.append((number,) + tuple(transport.send_pdfs(number, message, pdf_paths)))
+        else:
+            results.append((number,) + tuple(transport.send_text(number, message)))
+    return results
@@ -0,0 +1,297 @@
+"""
+Content-addressed cache for generated report PDFs.
+
+Reports are stored under <root>/<first two hex digits of key>/ and
+tracked in <root>/index.json. The key is a SHA-256 of everything that
+goes into the PDF (student fields, attendance summary, subjects, host URL
+and template version), so an unchanged student is served the existing
+file. Entries are evicted least-recently-used once the cache exceeds
+its byte or file budget, except those used in the last
+EVICT_GRACE_SECONDS.
+
+Several processes (web workers, pool workers, the night pre-render) can
+share one cache directory. Each process keeps its own view of the index
+plus the changes it has not written yet (new entries, removals, access
+times). A sync merges those into index.json under a file lock, evicts
+over the merged view and writes it back, so no process drops another's
+entries. Syncs are batched (every INDEX_FLUSH_EVERY changes or
+INDEX_FLUSH_SECONDS, and at exit), and a miss re-reads index.json when it
+changed on disk, so reports cached by another process are found.
+"""
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+DEFAULT_MAX_FILES = 10000
+
+# Pending index changes are written back to index.json every N changes,
+# or on the first change after this many seconds
+INDEX_FLUSH_EVERY = 50
+INDEX_FLUSH_SECONDS = 5.0
+
+# Entries used this recently are not evicted, even over budget: the caller
+# that was just handed the path may not have sent the file yet
+EVICT_GRACE_SECONDS = 60.0
+
+
+def report_cache_key(record, template_version, **extra):
+    """SHA-256 hex digest of a report record plus anything else that affects the output"""
+    payload = {'record': record, 'template_version': template_version, 'extra': extra}
+    blob = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on path across processes (held for one index sync)"""
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class ReportCache:
+    """Sharded on-disk PDF cache with an LRU index and a size budget"""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES, max_files=DEFAULT_MAX_FILES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.index_path = os.path.join(root, 'index.json')
+        self.lock_path = os.path.join(root, 'index.lock')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> {'path', 'size', 'last_access'}, oldest first
+        self._total_bytes = 0
+        # Changes not yet merged into index.json
+        self._added = {}  # key -> entry
+        self._removed = set()
+        self._touched = {}  # key -> last_access
+        self._index_stamp = None  # (mtime_ns, size) of index.json when last read or written
+        self._synced_at = 0.0
+        os.makedirs(root, exist_ok=True)
+        with self._lock:
+            self._reload()
+
+    # ===== INDEX =====
+
+    def _stat_index(self):
+        try:
+            st = os.stat(self.index_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _merge(self, entries):
+        """Apply this process's pending changes to entries read from disk and make them the current view"""
+        for key in self._removed:
+            entries.pop(key, None)
+        entries.update(self._added)
+        for key, last_access in self._touched.items():
+            entry = entries.get(key)
+            if entry is not None and entry.get('last_access', 0) < last_access:
+                entry['last_access'] = last_access
+        self._entries = OrderedDict(sorted(entries.items(), key=lambda item: item[1].get('last_access', 0)))
+        self._total_bytes = sum(entry['size'] for entry in self._entries.values())
+
+    def _reload(self):
+        # Caller holds the lock. index.json is replaced atomically, so no file lock is needed to read it.
+        self._index_stamp = self._stat_index()
+        self._merge(self._read_index())
+
+    def _pending(self):
+        return len(self._added) + len(self._removed) + len(self._touched)
+
+    def _sync(self):
+        """Merge pending changes into index.json under the file lock, evicting over budget (caller holds the lock)"""
+        with _file_lock(self.lock_path):
+            self._merge(self._read_index())
+            self._evict()
+            tmp_path = f'{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.index_path)
+            self._index_stamp = self._stat_index()
+        self._added.clear()
+        self._removed.clear()
+        self._touched.clear()
+        self._synced_at = time.monotonic()
+
+    def _maybe_sync(self):
+        if self._pending() >= INDEX_FLUSH_EVERY or time.monotonic() - self._synced_at >= INDEX_FLUSH_SECONDS:
+            self._sync()
+
+    def flush(self):
+        """Write pending changes to index.json"""
+        with self._lock:
+            if self._pending():
+                self._sync()
+
+    # ===== LOOKUP / STORE =====
+
+    def path_for(self, key, name=None):
+        """Path a key is (or would be) stored at"""
+        entry = self._entries.get(key)
+        if entry:
+            return os.path.join(self.root, entry['path'])
+        return os.path.join(self.root, key[:2], name or f'{key}.pdf')
+
+    def get(self, key):
+        """Cached file path for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._stat_index() != self._index_stamp:
+                # Another process wrote the index since we read it
+                self._reload()
+                entry = self._entries.get(key)
+            if entry is not None:
+                path = os.path.join(self.root, entry['path'])
+                if os.path.exists(path):
+                    entry['last_access'] = time.time()
+                    self._entries.move_to_end(key)
+                    self._touched[key] = entry['last_access']
+                    self.hits += 1
+                    # Other processes see the access (and its grace window) once synced
+                    self._maybe_sync()
+                    return path
+                # File removed behind our back
+                self._total_bytes -= entry['size']
+                del self._entries[key]
+                self._added.pop(key, None)
+                self._touched.pop(key, None)
+                self._removed.add(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, built_path, name=None, save_index=True):
+        """
+        Move a freshly built file into the cache and return its cached path.
+        The index is synced in batches; bulk callers pass save_index=False
+        and call flush() once at the end.
+        """
+        relative = os.path.join(key[:2], name or f'{key}.pdf')
+        final_path = os.path.join(self.root, relative)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(built_path, final_path)
+        size = os.path.getsize(final_path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._total_bytes -= old['size']
+            entry = {'path': relative, 'size': size, 'last_access': time.time()}
+            self._entries[key] = entry
+            self._total_bytes += size
+            self._added[key] = entry
+            self._removed.discard(key)
+            if save_index:
+                self._maybe_sync()
+        return final_path
+
+    def get_or_build(self, key, build, name=None):
+        """
+        Return the cached path for key, or call build(tmp_path) to write the
+        file and cache it.
+        """
+        path = self.get(key)
+        if path:
+            return path
+        tmp_path = os.path.join(self.root, f'.{key}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            build(tmp_path)
+            return self.put(key, tmp_path, name)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict(self):
+        # Caller holds both locks (see _sync). The newest entry is never evicted,
+        # and entries are oldest first, so eviction stops at the first recent one.
+        recent = time.time() - EVICT_GRACE_SECONDS
+        while len(self._entries) > 1 and (
+            self._total_bytes > self.max_bytes or len(self._entries) > self.max_files
+        ):
+            if next(iter(self._entries.values())).get('last_access', 0) > recent:
+                break
+            key, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry['size']
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.root, entry['path']))
+            except OSError:
+                pass
+
+    def set_limits(self, max_bytes=None, max_files=None):
+        """Change the byte and/or file budget, evicting at once if the cache is now over it"""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_files is not None:
+                self.max_files = max_files
+            if self._total_bytes > self.max_bytes or len(self._entries) > self.max_files:
+                self._sync()
+
+    def stats(self):
+        """Counters and current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'files': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'max_files': self.max_files,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_report_cache(root='static/reports/cache', max_bytes=None, max_files=None):
+    """
+    Process-wide ReportCache for a directory. max_bytes / max_files set its
+    budget (default DEFAULT_MAX_BYTES / DEFAULT_MAX_FILES when the cache is
+    created); passing them again later changes the budget of the existing
+    cache, while None keeps it.
+    """
+    with _caches_lock:
+        cache = _caches.get(os.path.abspath(root))
+        if cache is None:
+            cache = _caches[os.path.abspath(root)] = ReportCache(root, max_bytes or DEFAULT_MAX_BYTES,
+                                                                 max_files or DEFAULT_MAX_FILES)
+            # Entries added since the last sync would otherwise be orphaned files
+            atexit.register(cache.flush)
+            return cache
+    if (max_bytes is not None and max_bytes != cache.max_bytes) or (
+            max_files is not None and max_files != cache.max_files):
+        cache.set_limits(max_bytes, max_files)
+    return cache
@@ -0,0 +1,289 @@
+"""
+Report data loader.
+
+Fetches everything the student report needs for a whole cohort in a few
+set-based queries and hands the renderer plain, compact per-student
+records (dicts of str/int/date/tuples, no ORM objects). Attendance counts
+come from the attendance_summary table; only the newest rows for the log
+section are read from Attendance itself. Once utils.attendance_index has
+been initialised, both come from that in-memory index instead. Subjects
+come from the cached utils.subject_catalog. Grades for the whole cohort
+are computed in one vectorized pass by utils.grading.
+"""
+from collections import defaultdict
+
+from utils import metrics
+from utils.attendance_summary import fetch_attendance_logs, fetch_attendance_summaries
+
+# Rows shown in the "Detailed Attendance Log" section of the report
+ATTENDANCE_LOG_LIMIT = 20
+
+# Keep IN (...) lists below SQLite's bound-parameter limit
+QUERY_CHUNK_SIZE = 500
+
+
+def _chunks(items, size=QUERY_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _student_query():
+    """Student query with the department loaded in the same SELECT (records read its name)"""
+    from sqlalchemy.orm import joinedload
+    from models import Student
+    return Student.query.options(joinedload(Student.department))
+
+
+def select_students(department_id=None, year=None):
+    """Students matching the department/year filter (None means all)"""
+    from models import Student
+    query = _student_query()
+    if department_id:
+        query = query.filter_by(department_id=department_id)
+    if year:
+        query = query.filter_by(current_year=year)
+    return query.order_by(Student.umis).all()
+
+
+def iter_student_chunks(department_id=None, year=None, chunk_size=QUERY_CHUNK_SIZE):
+    """
+    Students matching the filter in UMIS order, as lists of at most
+    chunk_size. Each chunk is its own keyset query, so only one chunk of
+    students is in memory at a time.
+    """
+    from models import Student
+    after_umis = None
+    while True:
+        query = _student_query()
+        if department_id:
+            query = query.filter_by(department_id=department_id)
+        if year:
+            query = query.filter_by(current_year=year)
+        if after_umis is not None:
+            query = query.filter(Student.umis > after_umis)
+        students = query.order_by(Student.umis).limit(chunk_size).all()
+        if not students:
+            return
+        yield students
+        if len(students) < chunk_size:
+            return
+        after_umis = students[-1].umis
+
+
+def fetch_subject_lists(keys):
+    """
+    {(department_id, year): ((code, name), ...)} for the given keys, from
+    the subject catalog. Students sharing a department and year share one
+    tuple.
+    """
+    from utils.subject_catalog import get_subject_catalog
+    return get_subject_catalog().subject_lists({key for key in keys if key[0] and key[1]})
+
+
+def fetch_subject_rows(department_ids):
+    """
+    (id, code, name, department_id, year, credits) for every subject of the
+    given departments, ordered by id, from the subject catalog. Subjects
+    without a credits column or value count as utils.grading.DEFAULT_CREDITS.
+    """
+    from utils.subject_catalog import get_subject_catalog
+    return get_subject_catalog().subject_rows(department_ids)
+
+
+def fetch_marks(umis_list):
+    """(umis, subject_id, marks_obtained, max_marks) rows for the given students"""
+    from models import db, Marks
+    rows = []
+    for chunk in _chunks(list(umis_list)):
+        rows.extend(db.session.query(
+            Marks.student_umis, Marks.subject_id, Marks.marks_obtained, Marks.max_marks
+        ).filter(Marks.student_umis.in_(chunk)))
+    return rows
+
+
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def build_academic_records(students, subject_rows, mark_rows, scale=None):
+    """
+    Grade a cohort in one pass (scale: a utils.grading.GradeScale, default
+    the app's). Returns one dict per student with the
+    current year's subject rows
+        (code, name, credits, marks, max_marks, grade, points, reappear)
+    (marks/grade/points are None until marks are entered), the SGPA for
+    the current year, the CGPA over all years up to it, credits attempted
+    and earned, and the re-appear count.
+    """
+    import numpy as np
+    from utils.grading import compute_grades, get_grade_scale, optional_float
+
+    column = {row[0]: j for j, row in enumerate(subject_rows)}
+    position = {s.umis: i for i, s in enumerate(students)}
+    marks = np.full((len(students), len(subject_rows)), np.nan)
+    max_marks = np.full(marks.shape, 100.0)
+    for umis, subject_id, obtained, maximum in mark_rows:
+        i, j = position.get(umis), column.get(subject_id)
+        if i is None or j is None or obtained is None:
+            continue
+        marks[i, j] = obtained
+        if maximum:
+            max_marks[i, j] = maximum
+
+    credits = np.array([row[5] for row in subject_rows], dtype=float)
+    result = compute_grades(marks, max_marks, credits, scale or get_grade_scale())
+
+    subject_dept = np.array([row[3] or -1 for row in subject_rows], dtype=np.int64)
+    subject_year = np.array([row[4] or 0 for row in subject_rows], dtype=np.int64)
+    student_dept = np.array([s.department_id or -2 for s in students], dtype=np.int64)
+    student_year = np.array([s.current_year or 0 for s in students], dtype=np.int64)
+    same_dept = subject_dept[None, :] == student_dept[:, None]
+    term_mask = same_dept & (subject_year[None, :] == student_year[:, None])
+    history_mask = same_dept & (subject_year[None, :] <= student_year[:, None])
+
+    sgpa = result.gpa(term_mask)
+    cgpa = result.gpa(history_mask)
+    attempted = result.credits_attempted(history_mask)
+    earned = result.credits_earned(history_mask)
+    reappear_count = result.reappear_count(history_mask)
+    letters = result.letters()
+
+    term_columns = defaultdict(list)
+    for j, row in enumerate(subject_rows):
+        term_columns[(row[3], row[4])].append(j)
+
+    academics = []
+    for i, s in enumerate(students):
+        rows = []
+        for j in term_columns.get((s.department_id, s.current_year), ()):
+            graded = bool(result.graded[i, j])
+            rows.append((
+                subject_rows[j][1],
+                subject_rows[j][2],
+                _number(credits[j]),
+                _number(marks[i, j]) if graded else None,
+                _number(max_marks[i, j]),
+                letters[i, j] if graded else None,
+                _number(result.points[i, j]) if graded else None,
+                bool(result.reappear[i, j]),
+            ))
+        academics.append({
+            'subjects': tuple(rows),
+            'sgpa': optional_float(sgpa[i]),
+            'cgpa': optional_float(cgpa[i]),
+            'credits_attempted': _number(attempted[i]),
+            'credits_earned': _number(earned[i]),
+            'reappear_count': int(reappear_count[i]),
+        })
+    return academics
+
+
+def summarize_attendance(rows):
+    """Summary dict (same shape as utils.attendance_summary) for (date, status) rows"""
+    present = absent = leave = 0
+    for _, status in rows:
+        if status == 'Present':
+            present += 1
+        elif status == 'Absent':
+            absent += 1
+        elif status == 'Leave':
+            leave += 1
+    total = len(rows)
+    return {
+        'total': total,
+        'present': present,
+        'absent': absent,
+        'leave': leave,
+        'percentage': (present / total * 100) if total > 0 else 0,
+    }
+
+
+def build_report_record(student, attendance, attendance_log, subjects, academics=None, verification_token=None):
+    """
+    Assemble one compact report record.
+    attendance: summary dict ('total', 'present', 'absent', 'leave', 'percentage').
+    attendance_log: newest-first (date, status) pairs, at most ATTENDANCE_LOG_LIMIT.
+    subjects: tuple of (code, name) pairs.
+    academics: this student's entry from build_academic_records (None if not graded).
+    verification_token: the student's utils.verification token for the QR and footer.
+    """
+    return {
+        'umis': student.umis,
+        'name': student.name,
+        'email': student.email,
+        'phone': student.phone,
+        'department_id': student.department_id,
+        'department': student.department.name if student.department else None,
+        'current_year': student.current_year,
+        'parents_num': student.parents_num,
+        'attendance': attendance,
+        'attendance_log': tuple(attendance_log[:ATTENDANCE_LOG_LIMIT]),
+        'subjects': subjects,
+        'academics': academics,
+        'verification_token': verification_token,
+    }
+
+
+def load_report_records(students, attendance_log=True, verification=True, errors=None, scale=None):
+    """
+    Report records for a list of students, in the same order.
+    attendance_log / verification: set False to leave out the attendance
+    log and the verification token (and skip their queries), e.g. for
+    data exports.
+    errors: a dict to collect per-student failures in ({umis: message});
+            those students get None instead of a record. Without it the
+            first failure is raised.
+    scale: GradeScale for the grades (default: the app's, see
+           utils.grading.get_grade_scale). The grades are part of the
+           record, so report cache keys change with the scale.
+    """
+    students = list(students)
+    umis_list = [s.umis for s in students]
+    from utils.attendance_index import get_attendance_index
+    with metrics.span('report.query'):
+        index = get_attendance_index()
+        logs = {}
+        if index is not None:
+            index.refresh()
+            summaries = index.summaries(umis_list)
+            if attendance_log:
+                logs = index.logs(umis_list, limit=ATTENDANCE_LOG_LIMIT)
+        else:
+            summaries = fetch_attendance_summaries(umis_list)
+            if attendance_log:
+                logs = fetch_attendance_logs(umis_list, limit=ATTENDANCE_LOG_LIMIT)
+        subjects = fetch_subject_lists((s.department_id, s.current_year) for s in students)
+        subject_rows = fetch_subject_rows(s.department_id for s in students)
+        mark_rows = fetch_marks(umis_list)
+    with metrics.span('report.grading'):
+        academics = build_academic_records(students, subject_rows, mark_rows, scale)
+    records = []
+    for idx, s in enumerate(students):
+        try:
+            records.append(build_report_record(
+                s,
+                summaries[s.umis],
+                logs.get(s.umis, ()),
+                subjects.get((s.department_id, s.current_year), ()),
+                academics[idx],
+            ))
+        except Exception as e:
+            if errors is None:
+                raise
+            errors[s.umis] = str(e)
+            records.append(None)
+    if not verification:
+        return records
+    from utils.verification import issue_verification_tokens
+    built = [record for record in records if record is not None]
+    with metrics.span('report.tokens'):
+        tokens = issue_verification_tokens(built)
+    for record in built:
+        record['verification_token'] = tokens[record['umis']]
+    return records
+
+
+def load_report_record(student):
+    """Report record for a single student (same queries as the cohort path)"""
+    return load_report_records([student])[0]
@@ -0,0 +1,413 @@
+"""
+Report theme registry.
+
+Paragraph/table styles and the constant flowables of the student and
+batch reports are compiled once per process on first use and shared by
+every build. Static flowables are handed out as deep copies that share
+only their (read-only) styles, so layout state set during one build,
+including that of the paragraphs inside table cells, never reaches
+another build on the same or another thread.
+"""
+import copy
+import threading
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import Table, TableStyle, Paragraph
+
+from utils.fast_table import FastTableStyle
+
+# Custom colors for the college theme
+COLLEGE_PRIMARY = colors.HexColor('#1a237e')  # Deep blue
+COLLEGE_SECONDARY = colors.HexColor('#0d47a1')  # Medium blue
+COLLEGE_ACCENT = colors.HexColor('#ffd700')  # Gold
+COLLEGE_LIGHT = colors.HexColor('#e8eaf6')  # Light blue
+COLLEGE_SUCCESS = colors.HexColor('#2e7d32')  # Green
+COLLEGE_DANGER = colors.HexColor('#c62828')  # Red
+COLLEGE_WARNING = colors.HexColor('#f57c00')  # Orange
+
+
+def _share_styles(value, memo):
+    """Record the paragraph styles (and their parents) used by value in a deepcopy memo"""
+    if isinstance(value, Paragraph):
+        style = value.style
+        while style is not None and id(style) not in memo:
+            memo[id(style)] = style
+            style = getattr(style, 'parent', None)
+    elif isinstance(value, Table):
+        for row in value._cellvalues:
+            for cell in row:
+                _share_styles(cell, memo)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _share_styles(item, memo)
+
+
+def _fresh_copy(flowable):
+    """Copy of a constant flowable for one build: everything but its styles is copied"""
+    memo = {}
+    _share_styles(flowable, memo)
+    return copy.deepcopy(flowable, memo)
+
+
+class StudentReportTheme:
+    """Styles and constant pieces of generate_student_report_pdf"""
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.styles = styles
+
+        # ===== CUSTOM STYLES =====
+
+        # College name style
+        self.college_name_style = ParagraphStyle(
+            'CollegeName',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor=COLLEGE_PRIMARY,
+            spaceAfter=4,
+            alignment=TA_LEFT, # Changed to Left for layout with photo
+            fontName='Helvetica-Bold',
+            leading=22
+        )
+
+        # College subtitle style
+        self.college_subtitle_style = ParagraphStyle(
+            'CollegeSubtitle',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=COLLEGE_SECONDARY,
+            spaceAfter=8,
+            alignment=TA_LEFT,
+            fontName='Helvetica',
+            leading=11
+        )
+
+        # Report title style
+        self.report_title_style = ParagraphStyle(
+            'ReportTitle',
+            parent=styles['Heading1'],
+            fontSize=16,
+            textColor=colors.white,
+            spaceAfter=20,
+            spaceBefore=10,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold',
+            leading=20
+        )
+
+        # Section heading style
+        self.heading_style = ParagraphStyle(
+            'SectionHeading',
+            parent=styles['Heading2'],
+            fontSize=13,
+            textColor=COLLEGE_PRIMARY,
+            spaceAfter=10,
+            spaceBefore=15,
+            fontName='Helvetica-Bold',
+            borderWidth=0,
+            borderColor=COLLEGE_ACCENT,
+            borderPadding=5,
+            leftIndent=0,
+            leading=16
+        )
+
+        self.gpa_style = ParagraphStyle('GPA', parent=styles['Normal'], fontSize=10, alignment=TA_CENTER, textColor=COLLEGE_PRIMARY)
+
+        # Compendium table of contents entries
+        self.toc_style = ParagraphStyle('CompendiumTOC', parent=styles['Normal'], fontSize=9, leading=12, leftIndent=10)
+        self.no_photo_style = ParagraphStyle('NoPhoto', parent=styles['Normal'], alignment=TA_CENTER, fontSize=8)
+
+        # Footer text with disclaimer
+        self.footer_style = ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#546e7a'),
+            alignment=TA_CENTER,
+            leading=10
+        )
+
+        # ===== TABLE STYLES =====
+
+        self.header_table_style = TableStyle([
+            # Center Column (Text): Deep Blue
+            ('BACKGROUND', (1, 0), (1, 0), COLLEGE_PRIMARY),
+
+            # Side Columns (Photo & QR): White for contrast
+            ('BACKGROUND', (0, 0), (0, 0), colors.white),
+            ('BACKGROUND', (2, 0), (2, 0), colors.white),
+
+            # Alignment
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'), # All content centered horizontally in cells
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+
+            # Padding
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('LEFTPADDING', (0, 0), (-1, -1), 4),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+
+            # Borders: Box around the whole thing?
+            ('BOX', (0, 0), (-1, -1), 2, COLLEGE_PRIMARY),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey), # Inner grid
+        ])
+
+        self.student_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), COLLEGE_LIGHT),
+            ('BACKGROUND', (1, 0), (1, -1), colors.white),
+            ('TEXTCOLOR', (0, 0), (0, -1), COLLEGE_PRIMARY),
+            ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#b0bec5')),
+            ('BOX', (0, 0), (-1, -1), 2, COLLEGE_SECONDARY),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+
+        # One summary table style per attendance status colour
+        self.summary_table_styles = {
+            pct_color.hexval(): self._summary_table_style(pct_color)
+            for pct_color in (COLLEGE_SUCCESS, COLLEGE_WARNING, COLLEGE_DANGER)
+        }
+
+        self.chart_table_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+
+        self.acad_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), COLLEGE_SECONDARY),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('ALIGN', (1, 0), (1, -1), 'LEFT'), # Subject Name Left Aligned
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#eeeeee')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+            ('BOX', (0, 0), (-1, -1), 1, COLLEGE_SECONDARY),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ])
+
+        # Attendance log rows add per-status TEXTCOLOR commands on top of these
+        self.attendance_table_commands = (
+            ('BACKGROUND', (0, 0), (-1, 0), COLLEGE_PRIMARY),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#b0bec5')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
+            ('BOX', (0, 0), (-1, -1), 2, COLLEGE_SECONDARY),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+        )
+        self.attendance_status_colors = {
+            'Present': COLLEGE_SUCCESS,
+            'Absent': COLLEGE_DANGER,
+            'Leave': COLLEGE_WARNING,
+        }
+
+        # ===== STATIC FLOWABLES =====
+
+        self._college_heading = [
+            Paragraph('<b>SETHUPATHY GOVERNMENT ARTS COLLEGE</b>', ParagraphStyle('H_Title', parent=self.college_name_style, textColor=colors.white)),
+            Paragraph('<i>(Autonomous) | Affiliated to Madurai Kamaraj University</i><br/>Ramanathapuram - 623 501, Tamil Nadu', ParagraphStyle('H_Sub', parent=self.college_subtitle_style, textColor=colors.HexColor('#e0e0e0')))
+        ]
+        self._no_photo = Paragraph("<br/><br/><b>NO PHOTO</b>", self.no_photo_style)
+
+        # Decorative line
+        self._line_table = Table([['']], colWidths=[6.5*inch])
+        self._line_table.setStyle(TableStyle([
+            ('LINEABOVE', (0, 0), (-1, 0), 3, COLLEGE_ACCENT),
+            ('LINEBELOW', (0, 0), (-1, 0), 1, COLLEGE_SECONDARY),
+        ]))
+
+        # Report title banner
+        self._report_title_table = Table([[
+            Paragraph('STUDENT ACADEMIC REPORT', self.report_title_style)
+        ]], colWidths=[6.5*inch])
+        self._report_title_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), COLLEGE_SECONDARY),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('ROUNDEDCORNERS', [5, 5, 5, 5]),
+        ]))
+
+        # Decorative line before footer
+        self._footer_line_table = Table([['']], colWidths=[6.5*inch])
+        self._footer_line_table.setStyle(TableStyle([
+            ('LINEABOVE', (0, 0), (-1, 0), 2, COLLEGE_ACCENT),
+        ]))
+
+        self._headings = {
+            text: Paragraph(text, self.heading_style)
+            for text in (
+                "📋 STUDENT INFORMATION",
+                "📊 ATTENDANCE SUMMARY & TRENDS",
+                "📚 ACADEMIC SUBJECTS & PERFORMANCE",
+                "📅 DETAILED ATTENDANCE LOG",
+            )
+        }
+        self._no_chart = Paragraph("(No data for visual chart)", styles['Normal'])
+        self._chart_caption = Paragraph("<b>Visual Representation</b><br/>Attendance Distribution", styles['Normal'])
+        self._no_subjects = Paragraph("No subject enrollment records found for this academic year.", styles['Italic'])
+
+    @staticmethod
+    def _summary_table_style(pct_color):
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), COLLEGE_PRIMARY),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('BACKGROUND', (0, 1), (0, 1), colors.HexColor('#e3f2fd')),
+            ('BACKGROUND', (1, 1), (1, 1), colors.HexColor('#e8f5e9')),
+            ('BACKGROUND', (2, 1), (2, 1), colors.HexColor('#ffebee')),
+            ('BACKGROUND', (3, 1), (3, 1), colors.HexColor('#fff3e0')),
+            ('BACKGROUND', (4, 1), (4, 1), pct_color),
+            ('BACKGROUND', (5, 1), (5, 1), pct_color),
+            ('TEXTCOLOR', (0, 1), (3, 1), colors.black),
+            ('TEXTCOLOR', (4, 1), (5, 1), colors.white),
+            ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+            ('GRID', (0, 0), (-1, -1), 1.5, colors.white),
+            ('BOX', (0, 0), (-1, -1), 2, COLLEGE_SECONDARY),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+        ])
+
+    def summary_table_style(self, pct_color):
+        return self.summary_table_styles[pct_color.hexval()]
+
+    # Fresh copies of the constant flowables for one build
+
+    def college_heading(self):
+        return [_fresh_copy(p) for p in self._college_heading]
+
+    def no_photo(self):
+        return _fresh_copy(self._no_photo)
+
+    def line_table(self):
+        return _fresh_copy(self._line_table)
+
+    def report_title_table(self):
+        return _fresh_copy(self._report_title_table)
+
+    def footer_line_table(self):
+        return _fresh_copy(self._footer_line_table)
+
+    def heading(self, text):
+        return _fresh_copy(self._headings[text])
+
+    def no_chart(self):
+        return _fresh_copy(self._no_chart)
+
+    def chart_caption(self):
+        return _fresh_copy(self._chart_caption)
+
+    def no_subjects(self):
+        return _fresh_copy(self._no_subjects)
+
+
+class BatchReportTheme:
+    """Styles and constant pieces of generate_batch_report_pdf"""
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.styles = styles
+
+        # --- HEADER ---
+        self.header_style = ParagraphStyle('Header', parent=styles['Heading1'], fontSize=16, textColor=COLLEGE_PRIMARY, alignment=TA_CENTER, spaceAfter=4)
+        self.sub_header_style = ParagraphStyle('SubHeader', parent=styles['Normal'], fontSize=10, textColor=colors.HexColor('#555555'), alignment=TA_CENTER, spaceAfter=15)
+        self.title_style = ParagraphStyle('Title', parent=styles['Heading2'], alignment=TA_CENTER, textColor=COLLEGE_SECONDARY)
+
+        self.batch_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), COLLEGE_PRIMARY),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('ALIGN', (2, 1), (3, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9f9f9')]),
+            ('BOX', (0, 0), (-1, -1), 1.5, COLLEGE_SECONDARY),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ])
+        # The same look for the FastTable used on large cohorts
+        self.batch_fast_table_style = FastTableStyle(
+            font='Helvetica', font_size=8, text_color=colors.black,
+            header_font='Helvetica-Bold', header_font_size=9, header_text_color=colors.white,
+            header_background=COLLEGE_PRIMARY,
+            row_backgrounds=(colors.white, colors.HexColor('#f9f9f9')),
+            top_padding=6, bottom_padding=6,
+            align='CENTER', column_align={2: 'LEFT', 3: 'LEFT'},
+            grid_width=0.5, grid_color=colors.HexColor('#cccccc'),
+            box_width=1.5, box_color=COLLEGE_SECONDARY,
+        )
+
+        # --- SIGNATURE BLOCKS ---
+        self.sign_style_left = ParagraphStyle('SignLeft', parent=styles['Normal'], fontSize=10, alignment=TA_LEFT)
+        self.sign_style_right = ParagraphStyle('SignRight', parent=styles['Normal'], fontSize=10, alignment=TA_RIGHT)
+        self.sign_table_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+
+        # --- FOOTER ---
+        self.footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, textColor=colors.gray, alignment=TA_CENTER)
+
+        self._college_header = [
+            Paragraph("<b>SETHUPATHY GOVERNMENT ARTS COLLEGE</b>", self.header_style),
+            Paragraph("Ramanathapuram - 623501 | (Autonomous)", self.sub_header_style),
+        ]
+        self._hod_sign = Paragraph("<br/><br/>_____________________<br/><b>Head of Department</b>", self.sign_style_left)
+        self._principal_sign = Paragraph("<br/><br/>_____________________<br/><b>Principal</b>", self.sign_style_right)
+        self._blank_sign_left = Paragraph("", self.sign_style_left)
+        self._blank_sign_right = Paragraph("", self.sign_style_right)
+
+    def college_header(self):
+        return [_fresh_copy(p) for p in self._college_header]
+
+    def sign_row(self, hod_sign, principal_sign):
+        return [
+            _fresh_copy(self._hod_sign if hod_sign else self._blank_sign_left),
+            _fresh_copy(self._principal_sign if principal_sign else self._blank_sign_right),
+        ]
+
+
+_THEME_CLASSES = {
+    'student': StudentReportTheme,
+    'batch': BatchReportTheme,
+}
+_themes = {}
+_themes_lock = threading.Lock()
+
+
+def get_theme(name):
+    """Compiled theme for 'student' or 'batch', built on first use"""
+    theme = _themes.get(name)
+    if theme is None:
+        with _themes_lock:
+            theme = _themes.get(name)
+            if theme is None:
+                theme = _themes[name] = _THEME_CLASSES[name]()
+    return theme
+
+
+def clear_themes():
+    """Drop compiled themes (e.g. after registering new fonts)"""
+    with _themes_lock:
+        _themes.clear()
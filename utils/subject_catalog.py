@@ -0,0 +1,193 @@
+"""
+Subject catalog cache.
+
+The curriculum is small and changes rarely, yet every report, export and
+dashboard used to query Subject for the student's department and year.
+The catalog loads the whole Subject table in one query and indexes it by
+department, (department, year) and (department, year, semester), serving
+shared immutable tuples, so a cohort of any size costs one curriculum
+query per process instead of one per student:
+
+    term_subjects(student.department_id, student.current_year)
+    # (SubjectEntry(id, code, name, department_id, year, semester, credits), ...)
+
+Subject mapper events drop the catalog when subjects are added, edited
+or deleted (again once the session commits), and the next lookup
+reloads it. Bulk Query.update()/delete() bypass the events; call
+invalidate_subject_catalog() after those. Other worker processes do not
+see the events, so a catalog is also reloaded after CATALOG_TTL seconds.
+
+Within a Flask request every lookup uses the catalog the request first
+saw (kept on flask.g), so a page never mixes two versions. Call
+init_subject_catalog(app) once at startup to install the hooks and add
+term_subjects() to the Jinja globals for the dashboard template.
+"""
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from utils import metrics
+
+CATALOG_TTL = 10 * 60  # seconds
+
+# Fields of the rows served by the catalog (semester is None if the model has no such column)
+SubjectEntry = namedtuple('SubjectEntry', 'id code name department_id year semester credits')
+
+_catalog = None
+_catalog_lock = threading.Lock()
+_hooks_installed = False
+
+# session.info key marking a session that flushed Subject changes
+_DIRTY_KEY = 'subject_catalog_dirty'
+
+
+class SubjectCatalog:
+    """Immutable snapshot of the Subject table, indexed for report and dashboard lookups"""
+
+    def __init__(self, entries):
+        self.entries = tuple(entries)
+        self.loaded_at = time.monotonic()
+        by_department = defaultdict(list)
+        by_class = defaultdict(list)
+        by_term = defaultdict(list)
+        for entry in self.entries:
+            by_department[entry.department_id].append(entry)
+            by_class[(entry.department_id, entry.year)].append(entry)
+            by_term[(entry.department_id, entry.year, entry.semester)].append(entry)
+        self._by_department = {key: tuple(value) for key, value in by_department.items()}
+        self._by_class = {key: tuple(value) for key, value in by_class.items()}
+        self._by_term = {key: tuple(value) for key, value in by_term.items()}
+        # (code, name) pairs per (department_id, year), the shape of report records
+        self._pairs = {key: tuple((e.code, e.name) for e in value) for key, value in self._by_class.items()}
+
+    @classmethod
+    def load(cls):
+        """Read the whole Subject table (inside the app context)"""
+        from models import db, Subject
+        from utils.grading import DEFAULT_CREDITS
+        semester = getattr(Subject, 'semester', None)
+        credits = getattr(Subject, 'credits', None)
+        optional = [column for column in (semester, credits) if column is not None]
+        query = db.session.query(Subject.id, Subject.code, Subject.name, Subject.department_id, Subject.year,
+                                 *optional).order_by(Subject.id)
+        entries = []
+        with metrics.span('subject_catalog.load'):
+            for row in query:
+                extra = iter(row[5:])
+                entry_semester = next(extra) if semester is not None else None
+                entry_credits = next(extra) if credits is not None else None
+                entries.append(SubjectEntry(*row[:5], entry_semester, entry_credits or DEFAULT_CREDITS))
+        metrics.incr('subject_catalog_loads')
+        return cls(entries)
+
+    def subjects(self, department_id, year=None, semester=None):
+        """
+        Subjects of a department, optionally of one year and semester,
+        ordered by id. Returns a shared tuple of SubjectEntry.
+        """
+        if year is None:
+            return self._by_department.get(department_id, ())
+        if semester is None:
+            return self._by_class.get((department_id, year), ())
+        return self._by_term.get((department_id, year, semester), ())
+
+    def subject_lists(self, keys):
+        """{(department_id, year): ((code, name), ...)} for the keys that have subjects"""
+        lists = {}
+        for key in keys:
+            pairs = self._pairs.get(key)
+            if pairs:
+                lists[key] = pairs
+        return lists
+
+    def subject_rows(self, department_ids):
+        """(id, code, name, department_id, year, credits) of the given departments' subjects, by id"""
+        department_ids = {dept for dept in department_ids if dept}
+        return tuple(
+            (e.id, e.code, e.name, e.department_id, e.year, e.credits)
+            for e in self.entries if e.department_id in department_ids
+        )
+
+
+def _current_catalog():
+    """The process-wide catalog, (re)loaded if it was invalidated or is older than CATALOG_TTL"""
+    global _catalog
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - catalog.loaded_at < CATALOG_TTL:
+        return catalog
+    install_subject_catalog_hooks()
+    with _catalog_lock:
+        if _catalog is None or time.monotonic() - _catalog.loaded_at >= CATALOG_TTL:
+            _catalog = SubjectCatalog.load()
+        return _catalog
+
+
+def get_subject_catalog():
+    """
+    The subject catalog (inside the app context). Within a request the
+    same snapshot is returned for the whole request.
+    """
+    from flask import g, has_request_context
+    if not has_request_context():
+        return _current_catalog()
+    catalog = g.get('_subject_catalog')
+    if catalog is None:
+        catalog = g._subject_catalog = _current_catalog()
+    return catalog
+
+
+def term_subjects(department_id, year, semester=None):
+    """Subjects of a department and year (and semester), as SubjectEntry tuples"""
+    return get_subject_catalog().subjects(department_id, year, semester)
+
+
+def invalidate_subject_catalog():
+    """Drop the process-wide catalog; the next lookup reloads it"""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+
+# ===== Keeping the catalog in step with Subject =====
+
+def _subject_changed(mapper, connection, target):
+    invalidate_subject_catalog()
+    from sqlalchemy.orm import object_session
+    session = object_session(target)
+    if session is not None:
+        # A lookup from another session before the commit would reload the old rows
+        session.info[_DIRTY_KEY] = True
+
+
+def _after_commit(session):
+    if session.info.pop(_DIRTY_KEY, False):
+        invalidate_subject_catalog()
+
+
+def install_subject_catalog_hooks():
+    """Register the Subject mapper and session commit events (idempotent)"""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from models import Subject
+    event.listen(Subject, 'after_insert', _subject_changed)
+    event.listen(Subject, 'after_update', _subject_changed)
+    event.listen(Subject, 'after_delete', _subject_changed)
+    event.listen(Session, 'after_commit', _after_commit)
+    _hooks_installed = True
+
+
+def init_subject_catalog(app=None):
+    """
+    Install the hooks, load the catalog and expose term_subjects() to the
+    app's templates (inside the app context). Returns the catalog.
+    """
+    if app is None:
+        from flask import current_app
+        app = current_app
+    install_subject_catalog_hooks()
+    app.jinja_env.globals['term_subjects'] = term_subjects
+    invalidate_subject_catalog()
+    return _current_catalog()
@@ -0,0 +1,381 @@
+"""
+Signed report verification tokens.
+
+Every report carries a token for its student in the QR URL
+({host_url}verify/{umis}?t={token}) and in the footer. A token is a
+random nonce plus a truncated HMAC-SHA256 of "umis.nonce", so the verify
+endpoint rejects forged or mistyped tokens with one HMAC and no lookup.
+Tokens are persisted in the report_verification table; a student keeps
+the same token until it is revoked, so QR codes and cached PDFs stay
+valid across regenerations. New tokens are written in their own
+transaction (never the caller's session), with insert-or-ignore against
+a unique index on each student's active token, and then read back, so
+two first renders of the same student agree on one token.
+
+Valid tokens resolve through an in-process LRU with a TTL that is filled
+when tokens are issued, so the scans that follow a report run are
+answered without touching the database. A miss reads the token row and
+the student in one query. Student updates and deletes (mapper events)
+evict that student's entries. Revoking evicts them in this process only:
+other worker processes accept a revoked token until their cached entry
+expires, at most VERIFY_CACHE_TTL seconds later.
+
+    # verify route in the app
+    result = verify_report(umis, request.args.get('t'))
+    if result is None:
+        abort(404)
+    return render_template('verify_student.html', student=result)
+
+The HMAC key is app.config['VERIFICATION_SECRET'], falling back to the
+Flask SECRET_KEY; call init_verification() once at app startup (inside
+the app context).
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from types import SimpleNamespace
+
+from utils import metrics
+
+NONCE_BYTES = 4
+SIGNATURE_BYTES = 8
+
+VERIFY_CACHE_SIZE = 20000
+VERIFY_CACHE_TTL = 5 * 60  # seconds; also the longest a revoked token stays valid in other processes
+
+# Keep IN (...) lists below SQLite's bound-parameter limit
+QUERY_CHUNK_SIZE = 500
+
+# Backends with partial indexes, which the one-active-token-per-student index needs
+PARTIAL_INDEX_DIALECTS = ('sqlite', 'postgresql')
+ACTIVE_INDEX_NAME = 'uq_report_verification_active'
+
+_table = None
+_active_index = None
+_table_ready = False
+_hooks_installed = False
+_secret = None
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _secret_key():
+    global _secret
+    if _secret is None:
+        from flask import current_app
+        secret = current_app.config.get('VERIFICATION_SECRET') or current_app.config.get('SECRET_KEY')
+        if not secret:
+            raise RuntimeError("Set VERIFICATION_SECRET or SECRET_KEY to sign report verification tokens")
+        _secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+    return _secret
+
+
+def _signature(umis, nonce):
+    return hmac.new(_secret_key(), f"{umis}.{_b64(nonce)}".encode('utf-8'), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def make_token(umis, nonce=None):
+    """A new signed token for umis (16 URL-safe characters)"""
+    nonce = os.urandom(NONCE_BYTES) if nonce is None else nonce
+    return _b64(nonce + _signature(umis, nonce))
+
+
+def token_is_signed(umis, token):
+    """Constant-time HMAC check of a token against umis (no lookup)"""
+    try:
+        raw = _unb64(token)
+    except (ValueError, TypeError):
+        return False
+    if len(raw) != NONCE_BYTES + SIGNATURE_BYTES:
+        return False
+    nonce, signature = raw[:NONCE_BYTES], raw[NONCE_BYTES:]
+    return hmac.compare_digest(signature, _signature(umis, nonce))
+
+
+def verification_table():
+    """The report_verification Table, declared on the app's metadata once"""
+    global _table
+    if _table is None:
+        from models import db
+        _table = db.Table(
+            'report_verification',
+            db.Column('token', db.String(32), primary_key=True),
+            db.Column('student_umis', db.String(50), nullable=False, index=True),
+            db.Column('issued_at', db.DateTime, nullable=False),
+            db.Column('revoked_at', db.DateTime),
+            extend_existing=True,
+        )
+    return _table
+
+
+def active_token_index():
+    """Unique index on student_umis over unrevoked tokens (created only on PARTIAL_INDEX_DIALECTS)"""
+    global _active_index
+    if _active_index is None:
+        from models import db
+        t = verification_table()
+        active = t.c.revoked_at.is_(None)
+        _active_index = db.Index(ACTIVE_INDEX_NAME, t.c.student_umis, unique=True,
+                                 sqlite_where=active, postgresql_where=active)
+    return _active_index
+
+
+def _insert_ignore(connection):
+    """INSERT into report_verification that skips rows hitting the active-token index"""
+    t = verification_table()
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(t).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return t.insert().prefix_with('OR IGNORE')
+    return t.insert()
+
+
+def _session_holds_write_lock():
+    """True if the app session has uncommitted writes on a SQLite connection"""
+    from models import db
+    session = db.session()
+    if db.engine.dialect.name != 'sqlite' or not session.in_transaction():
+        return False
+    return getattr(session.connection().connection.dbapi_connection, 'in_transaction', False)
+
+
+class VerificationCache:
+    """Thread-safe LRU of token -> verified student details, with a TTL"""
+
+    def __init__(self, max_size=VERIFY_CACHE_SIZE, ttl=VERIFY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # token -> (expires, details)
+        self._by_umis = {}  # umis -> set of tokens
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return entry[1]
+                self._drop(token)
+            self.misses += 1
+            return None
+
+    def put(self, token, details):
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl, details)
+            self._entries.move_to_end(token)
+            self._by_umis.setdefault(details.umis, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, token):
+        _, details = self._entries.pop(token)
+        tokens = self._by_umis.get(details.umis)
+        if tokens:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_umis[details.umis]
+
+    def invalidate(self, umis):
+        """Forget every cached token of a student"""
+        with self._lock:
+            for token in list(self._by_umis.get(umis, ())):
+                self._drop(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_umis.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'max_size': self.max_size}
+
+
+_cache = VerificationCache()
+
+
+def get_verification_cache():
+    """The process-wide verification cache"""
+    return _cache
+
+
+def _details(umis, name, department, current_year, issued_at):
+    # Same attributes the verify_student template reads from a Student
+    return SimpleNamespace(umis=umis, name=name, department=SimpleNamespace(name=department) if department else None,
+                           current_year=current_year, issued_at=issued_at)
+
+
+def fetch_verification_tokens(umis_list, connection=None):
+    """
+    {umis: (token, issued_at)} of the active token of each student that
+    has one. connection: read on it instead of the app session.
+    """
+    from models import db
+    _ensure_ready()
+    t = verification_table()
+    umis_list = list(umis_list)
+    executor = connection if connection is not None else db.session
+    active = {}
+    for start in range(0, len(umis_list), QUERY_CHUNK_SIZE):
+        chunk = umis_list[start:start + QUERY_CHUNK_SIZE]
+        rows = executor.execute(
+            t.select().where(t.c.student_umis.in_(chunk), t.c.revoked_at.is_(None)).order_by(t.c.issued_at)
+        )
+        for row in rows:
+            active[row.student_umis] = (row.token, row.issued_at)
+    return active
+
+
+def issue_verification_tokens(records):
+    """
+    {umis: token} for utils.report_data records, reusing each student's
+    active token and creating the missing ones. Fills the verification
+    cache from the records so the first scans are hits.
+    New tokens are committed on a connection of their own; the caller's
+    session is left alone (on SQLite, if the session already holds the
+    write lock, they go into a savepoint of its transaction instead).
+    """
+    from models import db
+    records = list(records)
+    umis_list = [r['umis'] for r in records]
+    active = fetch_verification_tokens(umis_list)
+
+    missing = [umis for umis in dict.fromkeys(umis_list) if umis not in active]
+    if missing:
+        now = datetime.now()
+        new_rows = [{'token': make_token(umis), 'student_umis': umis, 'issued_at': now} for umis in missing]
+        if _session_holds_write_lock():
+            # SQLite has one writer, and it is the caller's transaction: a second connection would wait for it.
+            # Insert in a savepoint instead; the tokens commit or roll back with the caller's changes.
+            with db.session.begin_nested():
+                connection = db.session.connection()
+                connection.execute(_insert_ignore(connection), new_rows)
+                active.update(fetch_verification_tokens(missing, connection))
+        else:
+            with db.engine.begin() as connection:
+                connection.execute(_insert_ignore(connection), new_rows)
+                # A concurrent render may have won the insert: use whichever token is stored
+                active.update(fetch_verification_tokens(missing, connection))
+    tokens = {umis: token for umis, (token, _) in active.items()}
+    issued = {umis: issued_at for umis, (_, issued_at) in active.items()}
+
+    for record in records:
+        umis = record['umis']
+        _cache.put(tokens[umis], _details(umis, record['name'], record['department'], record['current_year'],
+                                          issued[umis]))
+    return tokens
+
+
+def verify_report(umis, token):
+    """
+    Details of the student a valid, unrevoked token was issued to (name,
+    umis, department.name, current_year, issued_at), or None.
+    """
+    if not token or not token_is_signed(umis, token):
+        metrics.incr('verify_lookups', result='invalid')
+        return None
+    details = _cache.get(token)
+    if details is not None:
+        metrics.incr('verify_lookups', result='hit')
+        return details if details.umis == umis else None
+
+    metrics.incr('verify_lookups', result='miss')
+    from sqlalchemy import select
+    from models import db, Student
+    _ensure_ready()
+    t = verification_table()
+    row = db.session.execute(
+        select(Student, t.c.issued_at).join(t, t.c.student_umis == Student.umis)
+        .where(t.c.token == token, t.c.student_umis == umis, t.c.revoked_at.is_(None))
+    ).first()
+    if row is None:
+        return None
+    student, issued_at = row
+    details = _details(student.umis, student.name, student.department.name if student.department else None,
+                       student.current_year, issued_at)
+    _cache.put(token, details)
+    return details
+
+
+def revoke_verification_tokens(umis):
+    """
+    Revoke a student's tokens (their next report gets a new one); returns
+    how many were revoked. Other processes see it within VERIFY_CACHE_TTL.
+    """
+    from models import db
+    _ensure_ready()
+    t = verification_table()
+    with db.engine.begin() as connection:
+        result = connection.execute(
+            t.update().where(t.c.student_umis == umis, t.c.revoked_at.is_(None)).values(revoked_at=datetime.now())
+        )
+    _cache.invalidate(umis)
+    return result.rowcount
+
+
+def _student_changed(mapper, connection, target):
+    _cache.invalidate(target.umis)
+
+
+def install_verification_hooks():
+    """Register the Student mapper events that evict cached details (idempotent)"""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    from sqlalchemy import event
+    from models import Student
+    event.listen(Student, 'after_update', _student_changed)
+    event.listen(Student, 'after_delete', _student_changed)
+    _hooks_installed = True
+
+
+def _create_active_index(connection):
+    """Create the active-token index, first revoking all but the newest active token of each student"""
+    from sqlalchemy import and_, exists, inspect, or_
+    if any(index['name'] == ACTIVE_INDEX_NAME for index in inspect(connection).get_indexes('report_verification')):
+        return
+    t = verification_table()
+    newer = t.alias('newer')
+    connection.execute(t.update().where(
+        t.c.revoked_at.is_(None),
+        exists().where(
+            newer.c.student_umis == t.c.student_umis,
+            newer.c.revoked_at.is_(None),
+            or_(newer.c.issued_at > t.c.issued_at, and_(newer.c.issued_at == t.c.issued_at, newer.c.token > t.c.token)),
+        ),
+    ).values(revoked_at=datetime.now()))
+    active_token_index().create(bind=connection)
+
+
+def init_verification():
+    """Create the token table and its active-token index and install the Student hooks"""
+    global _table_ready
+    from models import db
+    with db.engine.begin() as connection:
+        verification_table().create(bind=connection, checkfirst=True)
+        if connection.dialect.name in PARTIAL_INDEX_DIALECTS:
+            _create_active_index(connection)
+    _table_ready = True
+    install_verification_hooks()
+
+
+def _ensure_ready():
+    if not _table_ready:
+        init_verification()
@@ -0,0 +1,269 @@
+"""
+Headless HTTP transport for WhatsApp (Cloud-API style).
+
+Unlike the desktop automation in utils.whatsapp_sender this needs no GUI
+session and runs on Linux. It keeps a pool of keep-alive connections,
+uploads each PDF once and reuses the returned media id, and can send to
+many recipients concurrently under a token-bucket rate limit.
+
+    transport = CloudApiTransport(phone_number_id, access_token)
+    transport.send_bulk(parent_numbers, message, pdf_path)
+
+utils.whatsapp_stub_server provides a local stand-in for benchmarking.
+"""
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from utils.recipients import normalize_phone_number
+from utils.whatsapp_transport import WhatsAppTransport
+
+DEFAULT_BASE_URL = 'https://graph.facebook.com/v19.0'
+DEFAULT_POOL_SIZE = 16
+DEFAULT_RATE = 20.0  # messages per second
+DEFAULT_TIMEOUT = 30
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1.0):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HttpConnectionPool:
+    """A small pool of persistent http.client connections to one host"""
+
+    def __init__(self, base_url, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        with self._lock:
+            self.connections_opened += 1
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Send a request on a pooled connection; returns (status, parsed JSON
+        or text). Only a reused keep-alive connection that the server had
+        already closed is retried, on the next connection; any other
+        failure, timeouts included, is raised to the caller, since the
+        request may have been delivered.
+        """
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn = self._new_connection()
+                reused = False
+            sent = False
+            try:
+                conn.request(method, self.base_path + path, body=body, headers=headers or {})
+                sent = True
+                response = conn.getresponse()
+                payload = response.read()
+            except (http.client.HTTPException, OSError) as exc:
+                conn.close()
+                # An idle connection the server has closed fails on send, or is closed with no response at all
+                stale = isinstance(exc, http.client.RemoteDisconnected) or (
+                    not sent and isinstance(exc, (BrokenPipeError, ConnectionResetError)))
+                if reused and stale:
+                    continue
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                try:
+                    self._idle.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+            try:
+                data = json.loads(payload) if payload else {}
+            except ValueError:
+                data = payload.decode('utf-8', 'replace')
+            return response.status, data
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def to_wa_id(phone_number):
+    """Digits-only international number as the Cloud API expects it, or None if invalid"""
+    number = normalize_phone_number(phone_number)
+    return number[1:] if number else None
+
+
+def _error_text(status, data):
+    if isinstance(data, dict) and 'error' in data:
+        error = data['error']
+        return error.get('message', str(error)) if isinstance(error, dict) else str(error)
+    return f"HTTP {status}"
+
+
+class CloudApiTransport(WhatsAppTransport):
+    """WhatsApp Cloud-API backend with pooled connections and media id reuse"""
+
+    name = 'cloud'
+
+    def __init__(self, phone_number_id, access_token, base_url=DEFAULT_BASE_URL,
+                 pool_size=DEFAULT_POOL_SIZE, rate=DEFAULT_RATE, burst=None, timeout=DEFAULT_TIMEOUT):
+        self.phone_number_id = phone_number_id
+        self.access_token = access_token
+        self.pool = HttpConnectionPool(base_url, pool_size, timeout)
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = pool_size
+        self.uploads = 0
+        self._media_ids = {}  # (abs path, mtime, size) -> media id
+        self._upload_locks = {}
+        self._media_lock = threading.Lock()
+
+    def _headers(self, content_type='application/json'):
+        return {
+            'Authorization': f'Bearer {self.access_token}',
+            'Content-Type': content_type,
+            'Connection': 'keep-alive',
+        }
+
+    # ===== MEDIA =====
+
+    def upload_media(self, pdf_path):
+        """Upload a PDF once and return its media id (cached by path, mtime and size)"""
+        stat = os.stat(pdf_path)
+        key = (os.path.abspath(pdf_path), stat.st_mtime, stat.st_size)
+        with self._media_lock:
+            media_id = self._media_ids.get(key)
+            if media_id:
+                return media_id
+            lock = self._upload_locks.setdefault(key, threading.Lock())
+
+        # Concurrent senders of the same file wait for a single upload
+        with lock:
+            with self._media_lock:
+                media_id = self._media_ids.get(key)
+            if media_id:
+                return media_id
+
+            boundary = uuid.uuid4().hex
+            with open(pdf_path, 'rb') as f:
+                content = f.read()
+            filename = os.path.basename(pdf_path)
+            body = b''.join([
+                f'--{boundary}\r\nContent-Disposition: form-data; name="messaging_product"\r\n\r\nwhatsapp\r\n'.encode(),
+                f'--{boundary}\r\nContent-Disposition: form-data; name="type"\r\n\r\napplication/pdf\r\n'.encode(),
+                f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                f'Content-Type: application/pdf\r\n\r\n'.encode(),
+                content,
+                f'\r\n--{boundary}--\r\n'.encode(),
+            ])
+            status, data = self.pool.request(
+                'POST', f'/{self.phone_number_id}/media', body,
+                self._headers(f'multipart/form-data; boundary={boundary}'),
+            )
+            if status >= 300 or not isinstance(data, dict) or 'id' not in data:
+                raise RuntimeError(f"Media upload failed: {_error_text(status, data)}")
+            with self._media_lock:
+                self._media_ids[key] = data['id']
+                self._upload_locks.pop(key, None)
+                self.uploads += 1
+            return data['id']
+
+    # ===== MESSAGES =====
+
+    def _post_message(self, payload):
+        self.bucket.acquire()
+        status, data = self.pool.request(
+            'POST', f'/{self.phone_number_id}/messages', json.dumps(payload).encode('utf-8'), self._headers()
+        )
+        if status >= 300:
+            return False, _error_text(status, data)
+        return True, "Message sent"
+
+    def send_text(self, phone_number, message):
+        wa_id = to_wa_id(phone_number)
+        if not wa_id:
+            return False, "Invalid phone number"
+        try:
+            return self._post_message({
+                'messaging_product': 'whatsapp',
+                'to': wa_id,
+                'type': 'text',
+                'text': {'body': message},
+            })
+        except Exception as e:
+            return False, str(e)
+
+    def send_pdf(self, phone_number, message, pdf_path):
+        wa_id = to_wa_id(phone_number)
+        if not wa_id:
+            return False, "Invalid phone number"
+        if not os.path.exists(pdf_path):
+            return False, "PDF file not found"
+        try:
+            media_id = self.upload_media(pdf_path)
+            return self._post_message({
+                'messaging_product': 'whatsapp',
+                'to': wa_id,
+                'type': 'document',
+                'document': {'id': media_id, 'filename': os.path.basename(pdf_path), 'caption': message},
+            })
+        except Exception as e:
+            return False, str(e)
+
+    def send_bulk(self, phone_numbers, message, pdf_path=None, max_workers=None):
+        """
+        Send the same message (and PDF) to many recipients concurrently.
+        The PDF is uploaded once. Returns [(phone_number, success, message)]
+        in input order.
+        """
+        if pdf_path:
+            try:
+                self.upload_media(pdf_path)
+            except Exception as e:
+                return [(number, False, str(e)) for number in phone_numbers]
+
+        def send(number):
+            if pdf_path:
+                return (number,) + self.send_pdf(number, message, pdf_path)
+            return (number,) + self.send_text(number, message)
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_concurrency) as pool:
+            return list(pool.map(send, phone_numbers))
+
+    def close(self):
+        self.pool.close()
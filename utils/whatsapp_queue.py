@@ -0,0 +1,299 @@
+"""
+Persistent asynchronous WhatsApp delivery queue.
+
+Sending through utils.whatsapp_sender blocks for 10-30+ seconds per
+message, so web requests enqueue instead: enqueue_* returns a job id
+immediately, the job is stored in a local SQLite database, and a pool of
+worker threads drains it through a pluggable transport
+(utils.whatsapp_transport) with retries and exponential backoff.
+
+    queue = get_whatsapp_queue()
+    job_id = queue.enqueue_pdf(student.parents_num, message, pdf_path,
+                               idempotency_key=f'report:{student.umis}:{pdf_path}')
+    queue.status(job_id)['status']  # 'queued' / 'sending' / 'sent' / 'failed'
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.whatsapp_transport import DesktopTransport
+
+DEFAULT_QUEUE_PATH = os.path.join('instance', 'whatsapp_queue.db')
+
+QUEUED = 'queued'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+
+# How long an idle worker sleeps before polling the store again
+POLL_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS whatsapp_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT UNIQUE,
+    kind TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    message TEXT NOT NULL,
+    pdf_path TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_whatsapp_jobs_ready ON whatsapp_jobs (status, next_attempt_at);
+"""
+
+_COLUMNS = (
+    'id', 'idempotency_key', 'kind', 'recipient', 'message', 'pdf_path', 'status', 'attempts',
+    'max_attempts', 'next_attempt_at', 'last_error', 'result', 'created_at', 'updated_at',
+)
+
+
+def backoff_delay(attempts, base=BACKOFF_BASE_SECONDS, maximum=BACKOFF_MAX_SECONDS):
+    """Seconds to wait after the given number of failed attempts (with +/-20% jitter)"""
+    delay = min(maximum, base * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class WhatsAppQueue:
+    """SQLite-backed job store plus a worker pool that delivers through a transport"""
+
+    def __init__(self, db_path=DEFAULT_QUEUE_PATH, transport=None, workers=None,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, backoff_base=BACKOFF_BASE_SECONDS,
+                 backoff_max=BACKOFF_MAX_SECONDS):
+        self.db_path = db_path
+        self.transport = transport or DesktopTransport()
+        limit = getattr(self.transport, 'max_concurrency', 1)
+        self.workers = max(1, min(workers or limit, limit))
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads = []
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            yield conn
+        finally:
+            conn.close()
+
+    # ===== PRODUCER API =====
+
+    def enqueue(self, kind, recipient, message, pdf_path=None, idempotency_key=None, max_attempts=None):
+        """
+        Store a job and return its id without sending anything.
+        If idempotency_key was used before, the existing job's id is returned.
+        """
+        if kind not in ('text', 'pdf', 'pdfs', 'group'):
+            raise ValueError(f"Unknown WhatsApp job kind: {kind}")
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                'INSERT OR IGNORE INTO whatsapp_jobs (idempotency_key, kind, recipient, message, pdf_path, '
+                'status, max_attempts, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (idempotency_key, kind, recipient, message, pdf_path, QUEUED,
+                 max_attempts or self.max_attempts, now, now, now),
+            )
+            if cur.rowcount:
+                job_id = cur.lastrowid
+            else:
+                job_id = conn.execute(
+                    'SELECT id FROM whatsapp_jobs WHERE idempotency_key = ?', (idempotency_key,)
+                ).fetchone()[0]
+        self._wakeup.set()
+        return job_id
+
+    def enqueue_text(self, phone_number, message, idempotency_key=None):
+        return self.enqueue('text', phone_number, message, idempotency_key=idempotency_key)
+
+    def enqueue_pdf(self, phone_number, message, pdf_path, idempotency_key=None):
+        return self.enqueue('pdf', phone_number, message, pdf_path=pdf_path, idempotency_key=idempotency_key)
+
+    def enqueue_pdfs(self, phone_number, message, pdf_paths, idempotency_key=None):
+        """One message carrying several PDFs (e.g. siblings' reports to a shared parent number)"""
+        return self.enqueue('pdfs', phone_number, message, pdf_path=json.dumps(list(pdf_paths)),
+                            idempotency_key=idempotency_key)
+
+    def enqueue_group(self, group_id, message, idempotency_key=None):
+        return self.enqueue('group', group_id, message, idempotency_key=idempotency_key)
+
+    # ===== STATUS =====
+
+    def status(self, job_id):
+        """Job as a dict, or None if unknown"""
+        with self._connect() as conn:
+            row = conn.execute(f'SELECT {", ".join(_COLUMNS)} FROM whatsapp_jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def stats(self):
+        """{status: count}"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) FROM whatsapp_jobs GROUP BY status').fetchall()
+        counts = {QUEUED: 0, SENDING: 0, SENT: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def retry(self, job_id):
+        """Put a failed job back in the queue with a fresh attempt budget"""
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                'UPDATE whatsapp_jobs SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? '
+                'WHERE id = ? AND status = ?',
+                (QUEUED, now, now, job_id, FAILED),
+            )
+        self._wakeup.set()
+        return cur.rowcount == 1
+
+    def recover(self):
+        """Requeue jobs left in 'sending' by a process that died mid-send"""
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                'UPDATE whatsapp_jobs SET status = ?, next_attempt_at = ?, updated_at = ? WHERE status = ?',
+                (QUEUED, now, now, SENDING),
+            )
+        return cur.rowcount
+
+    # ===== WORKER SIDE =====
+
+    def _claim(self):
+        """Atomically move the oldest ready job to 'sending' and return it"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    f'SELECT {", ".join(_COLUMNS)} FROM whatsapp_jobs WHERE status = ? AND next_attempt_at <= ? '
+                    'ORDER BY next_attempt_at, id LIMIT 1',
+                    (QUEUED, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+                job = dict(zip(_COLUMNS, row))
+                conn.execute(
+                    'UPDATE whatsapp_jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?',
+                    (SENDING, now, job['id']),
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        job['attempts'] += 1
+        return job
+
+    def _deliver(self, job):
+        try:
+            if job['kind'] == 'pdf':
+                return self.transport.send_pdf(job['recipient'], job['message'], job['pdf_path'])
+            if job['kind'] == 'pdfs':
+                return self.transport.send_pdfs(job['recipient'], job['message'], json.loads(job['pdf_path']))
+            if job['kind'] == 'group':
+                return self.transport.send_group(job['recipient'], job['message'])
+            return self.transport.send_text(job['recipient'], job['message'])
+        except Exception as e:
+            return False, str(e)
+
+    def _finish(self, job, success, result):
+        now = time.time()
+        with self._connect() as conn:
+            if success:
+                conn.execute(
+                    'UPDATE whatsapp_jobs SET status = ?, result = ?, last_error = NULL, updated_at = ? WHERE id = ?',
+                    (SENT, result, now, job['id']),
+                )
+            elif job['attempts'] >= job['max_attempts']:
+                conn.execute(
+                    'UPDATE whatsapp_jobs SET status = ?, last_error = ?, updated_at = ? WHERE id = ?',
+                    (FAILED, result, now, job['id']),
+                )
+            else:
+                retry_at = now + backoff_delay(job['attempts'], self.backoff_base, self.backoff_max)
+                conn.execute(
+                    'UPDATE whatsapp_jobs SET status = ?, last_error = ?, next_attempt_at = ?, updated_at = ? '
+                    'WHERE id = ?',
+                    (QUEUED, result, retry_at, now, job['id']),
+                )
+
+    def process_one(self):
+        """Claim and deliver a single ready job. Returns False if none was ready."""
+        job = self._claim()
+        if job is None:
+            return False
+        success, result = self._deliver(job)
+        self._finish(job, success, result)
+        return True
+
+    def drain(self):
+        """Deliver ready jobs in the calling thread until none are left; returns the count"""
+        processed = 0
+        while self.process_one():
+            processed += 1
+        return processed
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.process_one():
+                    continue
+            except Exception as e:
+                print(f"WhatsApp queue worker error: {e}")
+            self._wakeup.wait(POLL_INTERVAL)
+            self._wakeup.clear()
+
+    def start(self):
+        """Start the worker threads (requeues jobs interrupted by a previous crash)"""
+        if self._threads:
+            return
+        self.recover()
+        self._stop.clear()
+        for idx in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'whatsapp-queue-{idx}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Ask workers to exit after their current job and wait for them"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.transport.close()
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_whatsapp_queue(db_path=DEFAULT_QUEUE_PATH, transport=None, start=True):
+    """Process-wide queue (desktop transport unless another is given on first call)"""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = WhatsAppQueue(db_path, transport)
+            if start:
+                _default_queue.start()
+        return _default_queue
@@ -1,11 +1,13 @@
 # import pywhatkit  <-- MOVED INSIDE FUNCTION TO PREVENT STARTUP HANG
+# pyautogui, win32clipboard and ctypes.windll are imported inside the functions
+# too: they start GUI automation on import and do not exist off Windows
 import time
 import os
 import platform
-import pyautogui
-import win32clipboard
-from ctypes import windll, Structure, c_int, c_uint, c_char, byref, sizeof, POINTER
-from ctypes.wintypes import HWND, UINT, DWORD, BOOL, HANDLE
+import functools
+from ctypes import Structure, c_int, c_uint, c_char, byref, sizeof, POINTER
+
+from utils import metrics
 
 # Struct for DROPFILES (standard Windows structure for file clipboard)
 class DROPFILES(Structure):
@@ -21,16 +23,26 @@ def copy_file_to_clipboard(filepath):
     """
     Copies a file to the Windows clipboard so it can be pasted.
     """
+    return copy_files_to_clipboard([filepath])
+
+def copy_files_to_clipboard(filepaths):
+    """
+    Copies one or more files to the Windows clipboard so they can be pasted
+    together in a single Ctrl+V.
+    """
     try:
-        if not os.path.exists(filepath):
+        import win32clipboard # Lazy import
+        from ctypes import windll
+
+        if not filepaths or not all(os.path.exists(p) for p in filepaths):
             return False
 
-        # Prepare the file path (must be absolute)
-        filepath = os.path.abspath(filepath)
+        # Prepare the file paths (must be absolute)
+        filepaths = [os.path.abspath(p) for p in filepaths]
         
-        # Create buffer for the path (wide char + double null terminator)
+        # Create buffer for the paths (wide char, each null terminated, plus a final null)
         # 2 bytes per char for wide chars
-        files_data = filepath.encode("utf-16le") + b"\0\0"  # Double null terminator
+        files_data = b"".join(p.encode("utf-16le") + b"\0\0" for p in filepaths) + b"\0\0"
         
         # Prepare DROPFILES structure
         dropfiles = DROPFILES()
@@ -72,14 +84,27 @@ def copy_file_to_clipboard(filepath):
         return False
 
 def format_phone_number(phone_number):
-    """Format phone number to international format."""
-    if not phone_number:
-        return None
-    clean_number = phone_number.replace(" ", "").replace("-", "")
-    if not clean_number.startswith("+"):
-        clean_number = "+91" + clean_number
-    return clean_number
+    """Format phone number to international (E.164) format; None if invalid."""
+    from utils.recipients import normalize_phone_number
+    return normalize_phone_number(phone_number)
+
+def _instrumented(kind):
+    """Time a send as the 'whatsapp.send' span and count it by result"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled():
+                return fn(*args, **kwargs)
+            with metrics.span('whatsapp.send', kind=kind):
+                success, result = fn(*args, **kwargs)
+            metrics.incr('whatsapp_sends', kind=kind, result='ok' if success else 'failed')
+            if not success:
+                metrics.incr('whatsapp_failures', kind=kind)
+            return success, result
+        return wrapper
+    return decorator
 
+@_instrumented('text')
 def send_whatsapp_message(phone_number, message):
     """Send a text message via WhatsApp Web/Desktop."""
     try:
@@ -90,17 +115,20 @@ def send_whatsapp_message(phone_number, message):
         
         # Send text
         import pywhatkit # Lazy import
-        pywhatkit.sendwhatmsg_instantly(formatted_num, message, 15, True, 3)
+        with metrics.span('whatsapp.open_chat', kind='text'):
+            pywhatkit.sendwhatmsg_instantly(formatted_num, message, 15, True, 3)
         return True, "Message sent"
     except Exception as e:
         return False, str(e)
 
+@_instrumented('pdf')
 def send_whatsapp_with_pdf(phone_number, message, pdf_path):
     """
     Send a WhatsApp message AND attach the PDF automatically via Clipboard Paste.
     """
     try:
         import pywhatkit # Lazy import
+        import pyautogui
         formatted_num = format_phone_number(phone_number)
         if not formatted_num:
             return False, "Invalid phone number"
@@ -113,15 +141,19 @@ def send_whatsapp_with_pdf(phone_number, message, pdf_path):
         # 1. Open WhatsApp and send the text message first
         # INCREASED WAIT TIME to 20 seconds to allow slow connections/browser to load
         # tab_close=False prevents the tab from closing, so we can paste the file
-        pywhatkit.sendwhatmsg_instantly(formatted_num, message, 25, False, 3)
+        with metrics.span('whatsapp.open_chat', kind='pdf'):
+            pywhatkit.sendwhatmsg_instantly(formatted_num, message, 25, False, 3)
         
         # 2. Wait a moment for the text message to completely send and focus to remain
         # The function above waits 25s, types, sends. Then returns.
         # We wait a bit more to be sure UI is ready for the next action.
-        time.sleep(5) 
+        with metrics.span('whatsapp.wait', kind='pdf'):
+            time.sleep(5) 
         
         # 3. Copy file to clipboard
-        if copy_file_to_clipboard(pdf_path):
+        with metrics.span('whatsapp.clipboard', kind='pdf'):
+            copied = copy_file_to_clipboard(pdf_path)
+        if copied:
             print("File copied to clipboard. Pasting...")
             
             # 4. Paste the file (Ctrl + V)
@@ -130,7 +162,8 @@ def send_whatsapp_with_pdf(phone_number, message, pdf_path):
             pyautogui.hotkey('ctrl', 'v')
             
             # 5. Wait for the attachment preview to load (Important: large files take longer)
-            time.sleep(3)
+            with metrics.span('whatsapp.attach_wait', kind='pdf'):
+                time.sleep(3)
             
             # 6. Press Enter to send the attachment
             pyautogui.press('enter')
@@ -143,6 +176,50 @@ def send_whatsapp_with_pdf(phone_number, message, pdf_path):
         return False, str(e)
 
 
+@_instrumented('pdfs')
+def send_whatsapp_with_pdfs(phone_number, message, pdf_paths):
+    """
+    Send one WhatsApp message with several PDFs attached in a single paste,
+    e.g. all of a parent's children's reports in one chat session.
+    """
+    try:
+        import pywhatkit # Lazy import
+        import pyautogui
+        formatted_num = format_phone_number(phone_number)
+        if not formatted_num:
+            return False, "Invalid phone number"
+
+        missing = [p for p in pdf_paths if not os.path.exists(p)]
+        if missing:
+            return False, f"PDF file not found: {missing[0]}"
+            
+        print(f"Sending WhatsApp with {len(pdf_paths)} PDF(s) to {formatted_num}...")
+        
+        # Same sequence as send_whatsapp_with_pdf, but every file goes on the clipboard at once
+        with metrics.span('whatsapp.open_chat', kind='pdfs'):
+            pywhatkit.sendwhatmsg_instantly(formatted_num, message, 25, False, 3)
+        with metrics.span('whatsapp.wait', kind='pdfs'):
+            time.sleep(5) 
+        
+        with metrics.span('whatsapp.clipboard', kind='pdfs'):
+            copied = copy_files_to_clipboard(pdf_paths)
+        if copied:
+            pyautogui.hotkey('ctrl', 'v')
+            
+            # Larger previews take longer; allow a little extra per additional file
+            with metrics.span('whatsapp.attach_wait', kind='pdfs'):
+                time.sleep(3 + len(pdf_paths) - 1)
+            pyautogui.press('enter')
+            
+            return True, f"Message and {len(pdf_paths)} PDF(s) sent successfully (Tab left open)"
+        else:
+            return True, "Message sent, but failed to copy PDFs to clipboard. Please attach manually."
+        
+    except Exception as e:
+        return False, str(e)
+
+
+@_instrumented('group')
 def send_group_message(group_id, message):
     """
     Send a message to a WhatsApp Group FAST using clipboard paste.
@@ -182,10 +259,11 @@ def send_group_message(group_id, message):
         # We need to open WhatsApp Web and let user navigate OR use a saved group link.
         
         # For now, let's open WhatsApp Web. User can manually navigate if link doesn't work.
-        webbrowser.open("https://web.whatsapp.com")
-        
-        # Wait for WhatsApp Web to load (adjust based on speed)
-        time.sleep(10) # 10 seconds to load and let user navigate to group if needed
+        with metrics.span('whatsapp.open_chat', kind='group'):
+            webbrowser.open("https://web.whatsapp.com")
+            
+            # Wait for WhatsApp Web to load (adjust based on speed)
+            time.sleep(10) # 10 seconds to load and let user navigate to group if needed
         
         # Paste from clipboard
         pyautogui.hotkey('ctrl', 'v')
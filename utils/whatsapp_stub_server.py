@@ -0,0 +1,105 @@
+"""
+Local stand-in for the WhatsApp Cloud API, for offline benchmarks of
+utils.whatsapp_cloud. Accepts media uploads and message posts, answers
+with fake ids after an optional latency, and counts what it received.
+
+    python -m utils.whatsapp_stub_server --port 8765 --latency 0.05
+
+or in-process:
+
+    server, base_url = start_stub_server(latency=0.05)
+    ...
+    server.shutdown()
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if server.latency:
+            time.sleep(server.latency)
+
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._reply(401, {'error': {'message': 'Missing access token'}})
+
+        if self.path.endswith('/media'):
+            with server.lock:
+                server.counts['media'] += 1
+                server.counts['media_bytes'] += len(body)
+            return self._reply(200, {'id': f'media-{next(server.ids)}'})
+
+        if self.path.endswith('/messages'):
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                return self._reply(400, {'error': {'message': 'Invalid JSON'}})
+            with server.lock:
+                server.counts['messages'] += 1
+                server.recipients.add(payload.get('to'))
+            return self._reply(200, {'messages': [{'id': f'wamid.{next(server.ids)}'}]})
+
+        self._reply(404, {'error': {'message': f'Unknown endpoint {self.path}'}})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.counts = {'media': 0, 'media_bytes': 0, 'messages': 0}
+        self.recipients = set()
+
+
+def start_stub_server(host='127.0.0.1', port=0, latency=0.0):
+    """Run a stub server in a background thread; returns (server, base_url)"""
+    server = StubServer((host, port), latency)
+    thread = threading.Thread(target=server.serve_forever, name='whatsapp-stub', daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}/v19.0'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local WhatsApp Cloud API stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each reply')
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), args.latency)
+    print(f"WhatsApp stub listening on http://{args.host}:{args.port}/v19.0")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Received: {server.counts}")
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
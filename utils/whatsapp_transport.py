@@ -0,0 +1,102 @@
+"""
+Pluggable WhatsApp transports.
+
+A transport delivers one message (optionally with a PDF attachment) and
+returns (success, message) like the functions in utils.whatsapp_sender.
+The delivery queue only talks to this interface, so the desktop
+automation can be swapped for another backend or a fake in tests.
+"""
+import threading
+from abc import ABC, abstractmethod
+
+
+class WhatsAppTransport(ABC):
+    """Base class: subclasses implement send_text and send_pdf"""
+
+    name = 'base'
+
+    @abstractmethod
+    def send_text(self, phone_number, message):
+        """Send a text message; returns (success, message)"""
+
+    @abstractmethod
+    def send_pdf(self, phone_number, message, pdf_path):
+        """Send a PDF with a caption; returns (success, message)"""
+
+    def send_pdfs(self, phone_number, message, pdf_paths):
+        """Several PDFs to one recipient; the message goes with the first one"""
+        for idx, pdf_path in enumerate(pdf_paths):
+            success, result = self.send_pdf(phone_number, message if idx == 0 else '', pdf_path)
+            if not success:
+                return False, result
+        return True, f"Message and {len(pdf_paths)} PDF(s) sent"
+
+    def send_group(self, group_id, message):
+        return False, f"{self.name} transport does not support group messages"
+
+    def close(self):
+        pass
+
+
+class DesktopTransport(WhatsAppTransport):
+    """WhatsApp Web/Desktop automation via pywhatkit and pyautogui (Windows only)"""
+
+    name = 'desktop'
+    # Only one browser session can be driven at a time
+    max_concurrency = 1
+
+    def send_text(self, phone_number, message):
+        from utils.whatsapp_sender import send_whatsapp_message
+        return send_whatsapp_message(phone_number, message)
+
+    def send_pdf(self, phone_number, message, pdf_path):
+        from utils.whatsapp_sender import send_whatsapp_with_pdf
+        return send_whatsapp_with_pdf(phone_number, message, pdf_path)
+
+    def send_pdfs(self, phone_number, message, pdf_paths):
+        # All files go on the clipboard together, so one chat session sends them all
+        from utils.whatsapp_sender import send_whatsapp_with_pdfs
+        return send_whatsapp_with_pdfs(phone_number, message, pdf_paths)
+
+    def send_group(self, group_id, message):
+        from utils.whatsapp_sender import send_group_message
+        return send_group_message(group_id, message)
+
+
+class FakeTransport(WhatsAppTransport):
+    """
+    Records sends in memory instead of delivering them.
+    fail_times: {phone_number: n} makes the first n sends to that number fail.
+    """
+
+    name = 'fake'
+    max_concurrency = 8
+
+    def __init__(self, fail_times=None, delay=0.0):
+        self.sent = []
+        self.fail_times = dict(fail_times or {})
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def _send(self, kind, recipient, message, pdf_path=None):
+        if self.delay:
+            import time
+            time.sleep(self.delay)
+        with self._lock:
+            if self.fail_times.get(recipient, 0) > 0:
+                self.fail_times[recipient] -= 1
+                return False, "Simulated failure"
+            self.sent.append({'kind': kind, 'to': recipient, 'message': message, 'pdf_path': pdf_path})
+        return True, "Message sent"
+
+    def send_text(self, phone_number, message):
+        return self._send('text', phone_number, message)
+
+    def send_pdf(self, phone_number, message, pdf_path):
+        return self._send('pdf', phone_number, message, pdf_path)
+
+    def send_pdfs(self, phone_number, message, pdf_paths):
+        return self._send('pdfs', phone_number, message, list(pdf_paths))
+
+    def send_group(self, group_id, message):
+        return self._send('group', group_id, message)